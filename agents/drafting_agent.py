@@ -2,17 +2,60 @@
 Drafting Agent for synthesizing research into coherent answers
 """
 import logging
-from typing import List, Dict, Any
-from dotenv import load_dotenv
-import os
-# Load environment variables from .env file if present
-load_dotenv()
-from langchain_google_genai import ChatGoogleGenerativeAI
+import re
+from typing import List, Dict, Any, Iterator, Optional, Tuple
 
 import config
+from utils.context_packer import MinHasher, pack_findings
+from utils.resilience import get_upstream
+from utils.schema import Finding
+from utils.tracing import span, text_bytes
+from utils.usage import UsageTracker, llm_token_counts
 
 logger = logging.getLogger(__name__)
 
+_CITATION_RE = re.compile(r"\[(\d+)\]")
+_HEADER_RE = re.compile(r"^(#{1,5}) ", re.MULTILINE)
+_TOP_HEADER_RE = re.compile(r"^# ", re.MULTILINE)
+_FENCE_RE = re.compile(r"^ {0,3}(`{3,}|~{3,})")
+_INLINE_CODE_RE = re.compile(r"(`+)[^\n]+?\1")
+
+
+def _split_fences(text: str) -> List[Tuple[bool, str]]:
+    """Split markdown into (is_prose, text) runs, fenced code blocks being the non-prose ones"""
+    runs = []
+    current = []
+    fence = None
+    for line in text.splitlines(keepends=True):
+        match = _FENCE_RE.match(line)
+        if fence is None and match:
+            if current:
+                runs.append((True, "".join(current)))
+            current, fence = [line], match.group(1)
+            continue
+        current.append(line)
+        if fence is not None and match and match.group(1)[0] == fence[0] \
+                and len(match.group(1)) >= len(fence) and not line.strip().strip(fence[0]):
+            runs.append((False, "".join(current)))
+            current, fence = [], None
+    if current:
+        # An unclosed fence runs to the end of the text
+        runs.append((fence is None, "".join(current)))
+    return runs
+
+
+def _sub_outside_inline_code(pattern: re.Pattern, repl, text: str) -> str:
+    """Apply a substitution to text, leaving inline code spans untouched"""
+    parts = []
+    last = 0
+    for match in _INLINE_CODE_RE.finditer(text):
+        parts.append(pattern.sub(repl, text[last:match.start()]))
+        parts.append(match.group())
+        last = match.end()
+    parts.append(pattern.sub(repl, text[last:]))
+    return "".join(parts)
+
+
 class DraftingAgent:
     """
     Agent responsible for synthesizing research findings
@@ -21,12 +64,19 @@ class DraftingAgent:
     
     def __init__(self):
         """Initialize the drafting agent with appropriate LLM"""
+        # Imported here so the Gemini/LangChain stack only loads when an agent is built
+        from langchain_google_genai import ChatGoogleGenerativeAI
+
         self.llm = ChatGoogleGenerativeAI(
             model="gemini-1.5-pro",
             temperature=config.DEFAULT_TEMPERATURE,
-            google_api_key=os.getenv("GOOGLE_API_KEY"),
+            google_api_key=config.GOOGLE_API_KEY,
+            # Retries happen in get_upstream("llm"), where the breaker and rate limiter see every attempt
+            max_retries=0,
         )
         self.prompt = self._get_prompt()
+        self.section_prompt = self._get_section_prompt()
+        self.hasher = MinHasher(num_perm=config.DRAFT_MINHASH_PERMUTATIONS)
         
     def _get_prompt(self) -> str:
         """Create prompt template for the drafting agent"""
@@ -35,7 +85,7 @@ Your task is to analyze the provided research findings and create a coherent ans
 The answer should:
 1. Be well-organized with clear sections and headers
 2. Synthesize information from multiple sources
-3. Cite sources appropriately
+3. Cite sources appropriately using their bracketed IDs, e.g. [1]
 4. Prioritize factual accuracy
 5. Be comprehensive yet concise
 6. Use Markdown formatting for better readability
@@ -51,13 +101,65 @@ Please draft a comprehensive answer based on these findings. Use markdown format
 
         return prompt
     
-    def draft_answer(self, query: str, findings: List[Dict[str, Any]]) -> str:
+    def _get_section_prompt(self) -> str:
+        """Create prompt template for drafting one section of a pipelined answer"""
+        prompt = """You are an expert drafting agent writing one section of a larger answer to a research question.
+Other sections are written separately from other findings, so cover only the focus below.
+The section should:
+1. Start with a level-2 Markdown header naming its topic
+2. Synthesize the provided findings rather than listing them
+3. Cite sources using their bracketed IDs, e.g. [1]
+4. Prioritize factual accuracy and stay concise
+
+Original Query: {query}
+
+Section Focus: {focus}
+
+Research Findings:
+{findings}
+
+Please draft this section using only these findings. Use markdown formatting."""
+
+        return prompt
+
+    def _pack(self, query: str, findings: List[Finding], token_budget: int,
+              usage: Optional[UsageTracker] = None) -> Dict[str, Any]:
+        """Pack the findings into a token budget, recording the context savings"""
+        packed = pack_findings(
+            query,
+            findings,
+            token_budget=token_budget,
+            dedup_threshold=config.DRAFT_DEDUP_THRESHOLD,
+            hasher=self.hasher,
+        )
+        logger.info(
+            f"Packed {packed['kept']} of {len(findings)} findings "
+            f"({packed['dropped_duplicates']} near-duplicates, {packed['dropped_budget']} over budget): "
+            f"~{packed['tokens_before']} -> ~{packed['tokens_after']} tokens"
+        )
+        if usage is not None:
+            usage.add("context_tokens_before", packed["tokens_before"])
+            usage.add("context_tokens_after", packed["tokens_after"])
+        return packed
+
+    def _build_prompt(self, query: str, findings: List[Finding],
+                      usage: Optional[UsageTracker] = None) -> str:
+        """Pack the findings into the token budget and format the drafting prompt"""
+        packed = self._pack(query, findings, config.DRAFT_CONTEXT_TOKEN_BUDGET, usage)
+        return self.prompt.format(
+            query=query,
+            findings=packed["text"]
+        )
+
+    def draft_answer(self, query: str, findings: List[Finding],
+                     usage: Optional[UsageTracker] = None) -> str:
         """
         Draft a comprehensive answer based on research findings
         
         Args:
             query: The original research question
             findings: List of research findings with source information
+            usage: Optional tracker for upstream calls and tokens
             
         Returns:
             A comprehensive answer in markdown format
@@ -65,22 +167,14 @@ Please draft a comprehensive answer based on these findings. Use markdown format
         logger.info(f"Drafting answer for query: {query}")
         
         try:
-            # Format findings for the prompt
-            findings_text = ""
-            for i, finding in enumerate(findings, 1):
-                findings_text += f"Finding {i}:\n"
-                findings_text += f"Title: {finding.get('title', 'Untitled')}\n"
-                findings_text += f"Content: {finding.get('content', '')}\n"
-                findings_text += f"Source URL: {finding.get('source_url', '')}\n"
-                findings_text += f"Source Title: {finding.get('source_title', 'Unknown')}\n\n"
-            
             # Invoke the LLM
-            response = self.llm.invoke(
-                self.prompt.format(
-                    query=query,
-                    findings=findings_text
-                )
-            )
+            prompt = self._build_prompt(query, findings, usage)
+            with span("drafting_llm") as stage:
+                response = get_upstream("llm").call(self.llm.invoke, prompt)
+                stage.payload_bytes = text_bytes(prompt)
+                stage.tokens = sum(llm_token_counts(prompt, response))
+            if usage is not None:
+                usage.record_llm(prompt, response)
             
             # Extract the answer content
             answer = response.content
@@ -91,3 +185,134 @@ Please draft a comprehensive answer based on these findings. Use markdown format
         except Exception as e:
             logger.error(f"Error during drafting: {str(e)}")
             raise RuntimeError(f"Drafting failed: {str(e)}")
+
+    def stream_answer(self, query: str, findings: List[Finding],
+                      usage: Optional[UsageTracker] = None) -> Iterator[str]:
+        """
+        Draft an answer, yielding text chunks as the LLM streams them
+        
+        Args:
+            query: The original research question
+            findings: List of research findings with source information
+            usage: Optional tracker for upstream calls and tokens
+            
+        Yields:
+            Consecutive pieces of the markdown answer
+        """
+        logger.info(f"Streaming draft for query: {query}")
+        
+        try:
+            prompt = self._build_prompt(query, findings, usage)
+            response = None
+            with span("drafting_llm") as stage:
+                stage.payload_bytes = text_bytes(prompt)
+                for chunk in get_upstream("llm").stream(self.llm.stream, prompt):
+                    response = chunk if response is None else response + chunk
+                    if chunk.content:
+                        yield chunk.content
+                if response is not None:
+                    stage.tokens = sum(llm_token_counts(prompt, response))
+            
+            if usage is not None and response is not None:
+                usage.record_llm(prompt, response)
+            
+            logger.info("Successfully streamed draft")
+            
+        except Exception as e:
+            logger.error(f"Error during drafting: {str(e)}")
+            raise RuntimeError(f"Drafting failed: {str(e)}")
+
+    def draft_section(self, query: str, focus: str, findings: List[Finding],
+                      usage: Optional[UsageTracker] = None) -> Tuple[str, Dict[int, str]]:
+        """
+        Draft the section of an answer covering one research sub-query
+        
+        Args:
+            query: The original research question
+            focus: The sub-query whose findings the section covers
+            findings: Findings for this section
+            usage: Optional tracker for upstream calls and tokens
+            
+        Returns:
+            Tuple of (section markdown, citation ID to source URL), the IDs
+            being local to this section until ``assemble_sections`` renumbers them
+        """
+        logger.info(f"Drafting section '{focus}' from {len(findings)} findings")
+        
+        try:
+            packed = self._pack(focus, findings, config.DRAFT_SECTION_TOKEN_BUDGET, usage)
+            prompt = self.section_prompt.format(query=query, focus=focus, findings=packed["text"])
+            with span("drafting_section_llm") as stage:
+                response = get_upstream("llm").call(self.llm.invoke, prompt)
+                stage.payload_bytes = text_bytes(prompt)
+                stage.tokens = sum(llm_token_counts(prompt, response))
+            if usage is not None:
+                usage.record_llm(prompt, response)
+            
+            citations = {citation: url for url, citation in packed["citations"].items()}
+            return response.content, citations
+            
+        except Exception as e:
+            logger.error(f"Error during section drafting: {str(e)}")
+            raise RuntimeError(f"Drafting failed: {str(e)}")
+
+
+def assemble_sections(query: str, sections: List[Tuple[str, str, Dict[int, str]]],
+                      findings: List[Finding], title: bool = True) -> str:
+    """
+    Join separately drafted sections into one answer, without another LLM call
+    
+    Each section's local citation IDs are renumbered into one shared sequence
+    (a source cited by several sections keeps a single ID) and the cited
+    sources are listed at the end. Headers are demoted below the answer's
+    title when a section uses top-level ones, and sections without a header
+    get one named after their focus (consecutive sections with the same focus
+    share it). Code blocks and inline code are left
+    as written, as are bracketed numbers that aren't the section's citations.
+    
+    Args:
+        query: The original research question
+        sections: Tuples of (focus, section markdown, local citation ID to URL)
+        findings: All findings, used to title the cited sources
+        title: Start with the query as a top-level title; pass False when
+            the caller adds its own (as ``save_draft`` does)
+        
+    Returns:
+        The assembled answer in markdown format
+    """
+    titles = {}
+    for finding in findings:
+        if finding.source_url and finding.source_url not in titles:
+            titles[finding.source_url] = finding.source_title or finding.title or finding.source_url
+    
+    ids: Dict[str, int] = {}
+    
+    def renumber(citations: Dict[int, str]):
+        def replace(match):
+            url = citations.get(int(match.group(1)))
+            if url is None:
+                return match.group()  # not a source this section was given
+            if url not in ids:
+                ids[url] = len(ids) + 1
+            return f"[{ids[url]}]"
+        return replace
+    
+    parts = [f"# {query}"] if title else []
+    previous_focus = None
+    for focus, text, citations in sections:
+        runs = [
+            (prose, _sub_outside_inline_code(_CITATION_RE, renumber(citations), run) if prose else run)
+            for prose, run in _split_fences(text.strip())
+        ]
+        if any(prose and _TOP_HEADER_RE.search(run) for prose, run in runs):
+            runs = [(prose, _HEADER_RE.sub(r"#\1 ", run) if prose else run) for prose, run in runs]
+        text = "".join(run for _, run in runs)
+        if not re.match(r"#{1,6} ", text) and focus != previous_focus:
+            text = f"## {focus}\n\n{text}"
+        previous_focus = focus
+        parts.append(text)
+    
+    if ids:
+        sources = "\n".join(f"- [{citation}] {titles.get(url, url)} - {url}" for url, citation in ids.items())
+        parts.append(f"## Sources\n\n{sources}")
+    return "\n\n".join(parts) + "\n"
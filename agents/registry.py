@@ -0,0 +1,156 @@
+"""
+Process-wide registry of agent instances shared across requests
+"""
+import logging
+import os
+import threading
+import time
+from typing import Any, Callable, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+
+def _build_research_agent():
+    from agents.research_agent import ResearchAgent
+    return ResearchAgent()
+
+
+def _build_drafting_agent():
+    from agents.drafting_agent import DraftingAgent
+    return DraftingAgent()
+
+
+class AgentRegistry:
+    """
+    Builds each agent (and its LLM client) once per worker process.
+
+    Agents hold no per-request state, so one instance per process is handed
+    out to all request threads. Instances created before a ``fork()`` (for
+    example under ``gunicorn --preload``) are rebuilt in the child so gRPC
+    and HTTP channels are never shared between processes.
+    """
+
+    def __init__(self):
+        self._factories: Dict[str, Callable[[], Any]] = {
+            "research": _build_research_agent,
+            "drafting": _build_drafting_agent,
+        }
+        self._instances: Dict[str, Any] = {}
+        self._construction_seconds: Dict[str, float] = {}
+        self._reuses: Dict[str, int] = {}
+        self._locks: Dict[str, threading.Lock] = {}
+        self._lock = threading.Lock()
+        self._pid = os.getpid()
+
+    def register_factory(self, name: str, factory: Callable[[], Any]) -> None:
+        """
+        Replace the factory used to build an agent and drop any cached instance
+
+        Args:
+            name: Agent name ("research" or "drafting")
+            factory: Zero-argument callable returning the agent
+        """
+        with self._lock:
+            self._factories[name] = factory
+            self._instances.pop(name, None)
+            self._construction_seconds.pop(name, None)
+            self._reuses.pop(name, None)
+
+    def get(self, name: str) -> Any:
+        """
+        Return the shared agent instance, building it on first use
+
+        Args:
+            name: Agent name ("research" or "drafting")
+
+        Returns:
+            The agent instance
+        """
+        self._check_fork()
+        instance = self._instances.get(name)
+        if instance is not None:
+            with self._lock:
+                self._reuses[name] = self._reuses.get(name, 0) + 1
+            return instance
+
+        with self._lock:
+            name_lock = self._locks.setdefault(name, threading.Lock())
+            factory = self._factories[name]
+
+        with name_lock:
+            instance = self._instances.get(name)
+            if instance is not None:
+                with self._lock:
+                    self._reuses[name] = self._reuses.get(name, 0) + 1
+                return instance
+
+            start = time.perf_counter()
+            instance = factory()
+            elapsed = time.perf_counter() - start
+            with self._lock:
+                self._instances[name] = instance
+                self._construction_seconds[name] = elapsed
+                self._reuses.setdefault(name, 0)
+            logger.info(f"Built {name} agent in {elapsed * 1000:.1f} ms")
+            return instance
+
+    def get_research_agent(self):
+        """Return the shared ResearchAgent"""
+        return self.get("research")
+
+    def get_drafting_agent(self):
+        """Return the shared DraftingAgent"""
+        return self.get("drafting")
+
+    def warm_up(self) -> None:
+        """Build all registered agents ahead of the first request"""
+        for name in list(self._factories):
+            if name not in self._instances:
+                self.get(name)
+
+    def _check_fork(self) -> None:
+        """Discard instances inherited from a parent process"""
+        if self._pid != os.getpid():
+            with self._lock:
+                if self._pid != os.getpid():
+                    self._instances.clear()
+                    self._construction_seconds.clear()
+                    self._reuses.clear()
+                    self._locks.clear()
+                    self._pid = os.getpid()
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        """
+        Report construction time and reuse savings per agent
+
+        Returns:
+            Mapping of agent name to construction_ms, reuses and saved_ms
+        """
+        with self._lock:
+            return {
+                name: {
+                    "construction_ms": round(seconds * 1000, 2),
+                    "reuses": self._reuses.get(name, 0),
+                    "saved_ms": round(seconds * self._reuses.get(name, 0) * 1000, 2),
+                }
+                for name, seconds in self._construction_seconds.items()
+            }
+
+
+_registry: Optional[AgentRegistry] = None
+_registry_lock = threading.Lock()
+
+
+def get_agent_registry() -> AgentRegistry:
+    """
+    Return the process-wide agent registry
+
+    Returns:
+        The shared AgentRegistry
+    """
+    global _registry
+    if _registry is None:
+        with _registry_lock:
+            if _registry is None:
+                _registry = AgentRegistry()
+    return _registry
@@ -1,36 +1,109 @@
 """
 Research Agent for gathering information from the web
 """
+import contextvars
+import hashlib
 import logging
-from typing import List, Dict, Any
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Dict, Any, Iterator, Optional
+from urllib.parse import urlsplit, urlunsplit
 import json
-import os
 
-from langchain_google_genai import ChatGoogleGenerativeAI
-
-from utils.tavily_tools import search_tavily
+from utils.json_stream import JSONArrayStreamParser
+from utils.local_index import get_local_index
+from utils.resilience import get_upstream
+from utils.tavily_tools import search_tavily, search_tavily_results
+from utils.schema import Finding, SearchResponse, SearchResult
+from utils.singleflight import get_singleflight
+from utils.text_utils import normalize_query
+from utils.tracing import record_span, span, text_bytes
+from utils.usage import UsageTracker, llm_token_counts
 import config
-from dotenv import load_dotenv
 
-# Load environment variables from .env file if present
-load_dotenv()
 logger = logging.getLogger(__name__)
 
+
+def _normalize_url(url: str) -> str:
+    """Normalize a URL for de-duplication (case of scheme/host, fragment, trailing slash)"""
+    if not url:
+        return ""
+    parts = urlsplit(url.strip())
+    path = parts.path.rstrip("/")
+    return urlunsplit((parts.scheme.lower(), parts.netloc.lower(), path, parts.query, ""))
+
+
+def merge_search_results(responses: List[SearchResponse]) -> List[SearchResult]:
+    """
+    Merge several search responses, de-duplicating by URL
+
+    Args:
+        responses: Search responses to merge
+
+    Returns:
+        Merged results ordered by score, keeping the best-scored copy of each URL
+    """
+    merged: Dict[str, SearchResult] = {}
+    unkeyed = []
+    for response in responses:
+        for result in response.results:
+            key = _normalize_url(result.url)
+            if not key:
+                unkeyed.append(result)
+                continue
+            existing = merged.get(key)
+            if existing is None or result.score > existing.score:
+                merged[key] = result
+
+    results = sorted(merged.values(), key=lambda r: r.score, reverse=True)
+    return results + unkeyed
+
+
+def combine_responses(query: str, queries: List[str], responses: List[SearchResponse]) -> SearchResponse:
+    """
+    Merge the responses of several searches for one research question
+
+    Args:
+        query: The research question the searches belong to
+        queries: The search queries that were run
+        responses: Their responses
+
+    Returns:
+        Search response with merged, de-duplicated results; its error is set
+        only when every search failed
+    """
+    merged = merge_search_results(responses)
+    total = sum(len(r.results) for r in responses)
+    logger.info(f"Merged {total} search results into {len(merged)} unique sources")
+    errors = [r.error for r in responses if r.error]
+    return SearchResponse(
+        query=query,
+        results=merged,
+        error="; ".join(errors) if errors and not merged else None,
+        sub_queries=queries,
+    )
+
+
 class ResearchAgent:
     """
     Agent responsible for gathering information from the web
     using Tavily and other search tools.
     """
-    
+
     def __init__(self):
         """Initialize the research agent with appropriate tools and LLM"""
+        # Imported here so the Gemini/LangChain stack only loads when an agent is built
+        from langchain_google_genai import ChatGoogleGenerativeAI
+
         # Initialize the LLM with Google Gemini
         self.llm = ChatGoogleGenerativeAI(
             model="gemini-1.5-Flash",
             temperature=0.2,
-            google_api_key=os.getenv("GOOGLE_API_KEY"),
+            google_api_key=config.GOOGLE_API_KEY,
+            # Retries happen in get_upstream("llm"), where the breaker and rate limiter see every attempt
+            max_retries=0,
         )
-        
+
         # Initialize tools - using a custom web search tool
         self.tools = [
             {
@@ -39,129 +112,373 @@ class ResearchAgent:
                 "func": search_tavily
             }
         ]
-        
+
         # Create the agent
         self.agent = self._create_agent()
-    
+
     def _create_agent(self):
         """Create a simplified research agent that calls the search tool"""
         return self.llm
-    
-    def research(self, query: str) -> List[Dict[str, Any]]:
+
+    def generate_sub_queries(self, query: str, max_queries: int,
+                             usage: Optional[UsageTracker] = None) -> List[str]:
+        """
+        Break a research question into focused search queries
+
+        Args:
+            query: The research question
+            max_queries: Maximum number of queries to return (including the original)
+            usage: Optional tracker for upstream calls and tokens
+
+        Returns:
+            List of search queries, starting with the original query
+        """
+        if max_queries <= 1:
+            return [query]
+
+        prompt = f"""
+        You are a research planner. Break the following research question into at most
+        {max_queries - 1} distinct, focused web search queries that together cover the topic.
+
+        Question: "{query}"
+
+        Your response should ONLY be a JSON array of strings.
+        """
+
+        try:
+            sub_queries = self._invoke_for_list(prompt, usage)
+        except Exception as e:
+            logger.warning(f"Failed to generate sub-queries, searching the original query only: {str(e)}")
+            sub_queries = []
+
+        return self._unique_queries([query] + sub_queries, max_queries)
+
+    def find_gaps(self, query: str, findings: List[Finding], max_queries: int,
+                  usage: Optional[UsageTracker] = None) -> List[str]:
+        """
+        Identify what the findings so far leave unanswered
+
+        Args:
+            query: The research question
+            findings: Findings collected so far
+            max_queries: Maximum number of follow-up queries to return
+            usage: Optional tracker for upstream calls and tokens
+
+        Returns:
+            Follow-up search queries, empty when the findings look complete
+        """
+        summary = ""
+        for i, finding in enumerate(findings, 1):
+            summary += f"{i}. {finding.title}: {finding.content[:300]}\n"
+
+        prompt = f"""
+        You are a research reviewer. The question "{query}" has been researched so far with
+        the findings listed below. Identify important aspects of the question that these
+        findings do not yet cover, and propose at most {max_queries} web search queries to fill them.
+
+        Findings so far:
+
+        {summary}
+
+        Your response should ONLY be a JSON array of strings. Return an empty array if the
+        findings already answer the question.
+        """
+
+        try:
+            gaps = self._invoke_for_list(prompt, usage)
+        except Exception as e:
+            logger.warning(f"Failed to identify research gaps: {str(e)}")
+            return []
+
+        return self._unique_queries(gaps, max_queries)
+
+    def _invoke_for_list(self, prompt: str, usage: Optional[UsageTracker]) -> List[Any]:
+        """Invoke the LLM and parse a JSON array from its response"""
+        with span("research_planning_llm") as stage:
+            response = get_upstream("llm").call(self.llm.invoke, prompt)
+            stage.payload_bytes = text_bytes(prompt)
+            stage.tokens = sum(llm_token_counts(prompt, response))
+        if usage is not None:
+            usage.record_llm(prompt, response)
+        response_text = response.content
+        start_idx = response_text.find('[')
+        end_idx = response_text.rfind(']')
+        if start_idx == -1 or end_idx == -1:
+            return []
+        return json.loads(response_text[start_idx:end_idx+1])
+
+    @staticmethod
+    def _unique_queries(queries: List[Any], max_queries: int) -> List[str]:
+        """Drop non-string and duplicate queries, keeping order"""
+        unique = []
+        seen = set()
+        for item in queries:
+            if not isinstance(item, str) or not item.strip() or item.strip().lower() in seen:
+                continue
+            seen.add(item.strip().lower())
+            unique.append(item.strip())
+            if len(unique) >= max_queries:
+                break
+        return unique
+
+    def search(self, query: str, fan_out: Optional[bool] = None,
+               usage: Optional[UsageTracker] = None) -> SearchResponse:
+        """
+        Search the web for a query, optionally fanning out into sub-queries
+
+        Args:
+            query: The research question
+            fan_out: Run concurrent sub-query searches (defaults to config.RESEARCH_FANOUT_ENABLED)
+            usage: Optional tracker for upstream calls and tokens
+
+        Returns:
+            Search response with merged, de-duplicated results
+        """
+        if fan_out is None:
+            fan_out = config.RESEARCH_FANOUT_ENABLED
+
+        if not fan_out:
+            if usage is not None:
+                usage.record_search()
+            return search_tavily_results(query)
+
+        queries = self.generate_sub_queries(query, config.RESEARCH_FANOUT_SUB_QUERIES, usage=usage)
+        logger.info(f"Fanning out research into {len(queries)} searches")
+        return self.search_many(query, queries, usage=usage)
+
+    def search_many(self, query: str, queries: List[str],
+                    usage: Optional[UsageTracker] = None) -> SearchResponse:
+        """
+        Run several searches concurrently and merge their results
+
+        Args:
+            query: The research question the searches belong to
+            queries: Search queries to run
+            usage: Optional tracker for upstream calls and tokens
+
+        Returns:
+            Search response with merged, de-duplicated results
+        """
+        workers = max(1, min(config.RESEARCH_FANOUT_MAX_WORKERS, len(queries)))
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="research-search") as pool:
+            # Each search runs in a copy of the caller's context so its spans reach the caller's trace
+            futures = [pool.submit(contextvars.copy_context().run, self.search_one, search_query, usage)
+                       for search_query in queries]
+            responses = [future.result() for future in futures]
+        return combine_responses(query, queries, responses)
+
+    def search_one(self, search_query: str, usage: Optional[UsageTracker] = None) -> SearchResponse:
+        """
+        Search one query, answering it from past findings when they cover it
+
+        Args:
+            search_query: The search query
+            usage: Optional tracker for upstream calls and tokens
+
+        Returns:
+            Search response for the query
+        """
+        # Queries already covered by past findings don't go to the web
+        local = self.local_lookup(search_query, usage=usage)
+        if local is not None:
+            return SearchResponse(
+                query=search_query,
+                results=[SearchResult(title=f.title, url=f.source_url, content=f.content, score=f.score)
+                         for f in local],
+            )
+        if usage is not None:
+            usage.record_search()
+        return search_tavily_results(search_query)
+
+    def research(self, query: str, fan_out: Optional[bool] = None,
+                 usage: Optional[UsageTracker] = None) -> List[Finding]:
         """
         Perform research on the given query
-        
+
         Args:
             query: The research question or topic
-            
+            fan_out: Run concurrent sub-query searches (defaults to config.RESEARCH_FANOUT_ENABLED)
+            usage: Optional tracker for upstream calls and tokens
+
         Returns:
             List of research findings with source information
         """
         logger.info(f"Starting research on query: {query}")
-        
+
+        local = self.local_lookup(query, usage=usage)
+        if local is not None:
+            return local
+
         try:
             # First, search for information using Tavily
-            search_results = search_tavily(query)
-            
-            # Process the search results
-            try:
-                results_dict = json.loads(search_results)
-                
-                # Format results for the LLM
-                context = "Search results:\n\n"
-                for i, result in enumerate(results_dict.get("results", [])):
-                    context += f"Result {i+1}:\n"
-                    context += f"Title: {result.get('title', 'No title')}\n"
-                    context += f"URL: {result.get('url', 'No URL')}\n"
-                    context += f"Content: {result.get('content', 'No content')}\n\n"
-                
-                # Now ask the LLM to synthesize the findings
-                prompt = f"""
-                You are a research expert. Based on the following search results about "{query}", 
-                create a comprehensive list of key findings. Format your response as a JSON object with an array
-                of 'findings', where each finding has the following structure:
-                
-                {{
-                    "content": "The detailed information and explanation of the finding",
-                    "source_url": "The URL where this information was found",
-                    "source_title": "The title of the source page"
-                }}
-                
-                Here are the search results:
-                
-                {context}
-                
-                Your response should ONLY be a valid JSON object with the 'findings' array.
-                """
-                
-                response = self.llm.invoke(prompt)
-                
-                # Extract the text content from the response
-                response_text = response.content
-                
-                # Try to parse JSON from the response
-                findings = []
-                start_idx = response_text.find('{')
-                end_idx = response_text.rfind('}')
-                
-                if start_idx != -1 and end_idx != -1:
-                    json_str = response_text[start_idx:end_idx+1]
-                    results_dict = json.loads(json_str)
-                    findings = results_dict.get('findings', [])
-                
-                # If no findings were parsed, attempt to parse the whole response
-                if not findings:
-                    try:
-                        results_dict = json.loads(response_text)
-                        findings = results_dict.get('findings', [])
-                    except:
-                        pass
-                
-                # If we still don't have findings, create them from the raw search results
-                if not findings:
-                    findings = []
-                    for result in results_dict.get("results", []):
-                        findings.append({
-                            "title": result.get("title", "Search Result"),
-                            "content": result.get("content", "No content available"),
-                            "source_url": result.get("url", ""),
-                            "source_title": result.get("title", "Search Result")
-                        })
-                
-                # Ensure all findings have required fields
-                for finding in findings:
-                    if "title" not in finding:
-                        finding["title"] = "Research Finding"
-                    if "source_url" not in finding and "source" in finding:
-                        finding["source_url"] = finding["source"]
-                    if "source_title" not in finding:
-                        finding["source_title"] = finding.get("title", "Research Source")
-                
-                logger.info(f"Research completed with {len(findings)} findings")
-                return findings
-                
-            except Exception as e:
-                logger.warning(f"Failed to parse search results: {str(e)}")
-                # Fallback to raw search results
-                results = []
-                try:
-                    results_dict = json.loads(search_results)
-                    for result in results_dict.get("results", []):
-                        results.append({
-                            "title": result.get("title", "Search Result"),
-                            "content": result.get("content", "No content available"),
-                            "source_url": result.get("url", ""),
-                            "source_title": result.get("title", "Search Result")
-                        })
-                except:
-                    results = [{
-                        "title": "Research Results",
-                        "content": search_results,
-                        "source_url": "",
-                        "source_title": "Search Results"
-                    }]
-                return results
-                
+            search_results = self.search(query, fan_out=fan_out, usage=usage)
+            if search_results.error and not search_results.results:
+                raise RuntimeError(search_results.error)
+            return self.synthesize(query, search_results, usage=usage)
         except Exception as e:
             logger.error(f"Error during research: {str(e)}")
             raise RuntimeError(f"Research failed: {str(e)}")
+
+    @staticmethod
+    def local_lookup(query: str, usage: Optional[UsageTracker] = None) -> Optional[List[Finding]]:
+        """
+        Look for past findings that already cover a query
+
+        Args:
+            query: The search query
+            usage: Optional tracker; counts avoided web searches as 'web_calls_avoided'
+
+        Returns:
+            Covering findings from the local index, or None when the web should be searched
+        """
+        index = get_local_index()
+        if index is None:
+            return None
+        try:
+            findings = index.lookup(query)
+        except Exception as e:
+            logger.warning(f"Local index lookup failed, searching the web: {str(e)}")
+            return None
+        if findings is not None and usage is not None:
+            usage.add("web_calls_avoided")
+        return findings
+
+    def synthesize(self, query: str, search_results: SearchResponse,
+                   usage: Optional[UsageTracker] = None) -> List[Finding]:
+        """
+        Turn search results into structured findings with the LLM
+
+        Args:
+            query: The research question or topic
+            search_results: Search response to synthesize
+            usage: Optional tracker for upstream calls and tokens
+
+        Returns:
+            List of research findings with source information
+        """
+        # Concurrent synthesis of the same results for the same question runs once
+        digest = hashlib.sha256(normalize_query(query).encode("utf-8"))
+        for result in search_results.results:
+            digest.update(f"\0{result.url}\0{result.title}\0{result.content}".encode("utf-8"))
+        return get_singleflight("synthesis").do(digest.hexdigest(), self._synthesize, query, search_results, usage)
+
+    def _synthesize(self, query: str, search_results: SearchResponse,
+                    usage: Optional[UsageTracker]) -> List[Finding]:
+        """Synthesize findings with the LLM, falling back to the raw search results"""
+        return list(self.iter_synthesis(query, search_results, usage=usage))
+
+    @staticmethod
+    def _synthesis_prompt(query: str, search_results: SearchResponse) -> str:
+        """Format the search results into the synthesis prompt"""
+        context = "Search results:\n\n"
+        for i, result in enumerate(search_results.results):
+            context += f"Result {i+1}:\n"
+            context += f"Title: {result.title or 'No title'}\n"
+            context += f"URL: {result.url or 'No URL'}\n"
+            context += f"Content: {result.content or 'No content'}\n\n"
+
+        return f"""
+            You are a research expert. Based on the following search results about "{query}",
+            create a comprehensive list of key findings. Format your response as a JSON object with an array
+            of 'findings', where each finding has the following structure:
+
+            {{
+                "content": "The detailed information and explanation of the finding",
+                "source_url": "The URL where this information was found",
+                "source_title": "The title of the source page"
+            }}
+
+            Here are the search results:
+
+            {context}
+
+            Your response should ONLY be a valid JSON object with the 'findings' array.
+            """
+
+    def iter_synthesis(self, query: str, search_results: SearchResponse,
+                       usage: Optional[UsageTracker] = None) -> Iterator[Finding]:
+        """
+        Synthesize findings with the LLM, yielding each one as soon as the model has written it
+
+        The response is streamed and parsed incrementally, so a malformed
+        finding is skipped rather than failing the response, and findings
+        written before a truncated response or a dropped stream are kept.
+        A complete but empty findings array is a valid answer and yields
+        nothing. Otherwise, when no finding could be parsed, the raw search
+        results are yielded instead; that fallback is logged and counted as
+        'synthesis_fallbacks' in ``usage``.
+
+        Args:
+            query: The research question or topic
+            search_results: Search response to synthesize
+            usage: Optional tracker for upstream calls and tokens
+
+        Yields:
+            Research findings with source information
+        """
+        prompt = self._synthesis_prompt(query, search_results)
+        parser = JSONArrayStreamParser("findings")
+        response = None
+        error = None
+        count = 0
+        # Parsing is interleaved with the stream, so its cost is summed per chunk
+        parse_seconds = 0.0
+        parsed_bytes = 0
+        try:
+            with span("research_synthesis_llm") as stage:
+                stage.payload_bytes = text_bytes(prompt)
+                try:
+                    for chunk in get_upstream("llm").stream(self.llm.stream, prompt):
+                        response = chunk if response is None else response + chunk
+                        parse_started = time.perf_counter()
+                        items = parser.feed(chunk.content)
+                        parse_seconds += time.perf_counter() - parse_started
+                        parsed_bytes += text_bytes(chunk.content)
+                        for item in items:
+                            count += 1
+                            yield Finding.from_dict(item)
+                finally:
+                    if response is not None:
+                        stage.tokens = sum(llm_token_counts(prompt, response))
+        except Exception as e:
+            error = e
+        finally:
+            record_span("json_extraction", parse_seconds, payload_bytes=parsed_bytes)
+        if usage is not None and response is not None:
+            usage.record_llm(prompt, response)
+
+        report = parser.close()
+        if report["malformed"]:
+            logger.warning(f"Skipped {report['malformed']} malformed findings in the synthesis response")
+            if usage is not None:
+                usage.add("synthesis_malformed_findings", report["malformed"])
+
+        if not count and error is None and report["found"] and not report["malformed"] and not report["truncated"]:
+            logger.info("Synthesis found nothing relevant in the search results")
+            return
+
+        if not count:
+            if error is not None:
+                reason = f"synthesis call failed: {str(error)}"
+            elif not report["found"]:
+                reason = "no findings array in the response"
+            else:
+                reason = "no valid findings in the response"
+            logger.warning(f"Using {len(search_results.results)} raw search results as findings ({reason})")
+            if usage is not None:
+                usage.add("synthesis_fallbacks")
+            yield from self._findings_from_search(search_results)
+            return
+
+        if error is not None or report["truncated"]:
+            cause = f"stream failed: {str(error)}" if error is not None else "output truncated"
+            logger.warning(f"Synthesis response was cut short ({cause}); kept {count} findings")
+            if usage is not None:
+                usage.add("synthesis_partial")
+
+        logger.info(f"Research completed with {count} findings")
+
+    @staticmethod
+    def _findings_from_search(search_results: SearchResponse) -> List[Finding]:
+        """Build findings directly from raw search results"""
+        return [Finding.from_search_result(result) for result in search_results.results]
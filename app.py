@@ -4,44 +4,100 @@ Flask web application for the Deep Research AI Agent System
 import os
 import logging
 import json
+import threading
 from datetime import datetime
-import markdown
-from flask import Flask, render_template, request, jsonify, session, redirect, url_for
+from flask import Flask, Response, render_template, request, jsonify, session, redirect, url_for, stream_with_context
 from markupsafe import Markup
-# from flask_sqlalchemy import SQLAlchemy
+from sqlalchemy import or_, select
 
-from workflows.research_workflow import run_research_workflow
+from workflows.research_workflow import (
+    RunQueryMismatchError, run_research_workflow, run_research_workflow_detailed, stream_research_workflow
+)
+from workflows.jobs import QueueFullError, get_job_queue
+from agents.registry import get_agent_registry
+from utils.singleflight import singleflight_stats
+from utils.semantic_cache import get_semantic_cache
+from utils.schema import findings_to_dicts
+from utils.result_store import get_result_store
+from utils.local_index import get_local_index
+from utils.resilience import resilience_stats
+from utils.write_behind import write_behind_stats
+from utils.archive import get_archive
+from utils.tracing import render_metrics, start_trace
+from utils.markdown_utils import IncrementalMarkdownRenderer, draft_html_path, get_render_cache, render_markdown
 from utils.file_utils import save_research_results, save_draft
 import config
-# from models import db, Research, Finding, Draft
+from models import db, Research, Finding as FindingRecord, Draft, save_research_run
 
 # Set up the Flask app
 app = Flask(__name__)
 app.secret_key = os.environ.get("SESSION_SECRET", os.urandom(24).hex())
 
-# Configure database (commented out)
-# app.config["SQLALCHEMY_DATABASE_URI"] = os.environ.get("DATABASE_URL")
-# app.config["SQLALCHEMY_ENGINE_OPTIONS"] = {
-#     "pool_recycle": 300,
-#     "pool_pre_ping": True,
-# }
-# app.config["SQLALCHEMY_TRACK_MODIFICATIONS"] = False
-
-# Initialize database (commented out)
-# db.init_app(app)
-
-# Create database tables (commented out)
-# with app.app_context():
-#     from sqlalchemy import inspect
-#     inspector = inspect(db.engine)
-#     existing_tables = inspector.get_table_names()
-#     if not all(table in existing_tables for table in ['researches', 'findings', 'drafts']):
-#         db.create_all()
+def _render_markdown(text, draft_file=None):
+    """Render a draft to HTML via the content-hash cache and its pre-rendered file"""
+    html_path = draft_html_path(draft_file) if draft_file else None
+    return Markup(render_markdown(text, html_path))
+
+def _engine_options(database_url):
+    """Connection pool settings for the configured database"""
+    options = {
+        "pool_recycle": config.DB_POOL_RECYCLE,
+        "pool_pre_ping": True,
+    }
+    if database_url.startswith("sqlite"):
+        options["connect_args"] = {"timeout": config.DB_POOL_TIMEOUT, "check_same_thread": False}
+        if database_url in ("sqlite://", "sqlite:///:memory:"):
+            # In-memory databases use a single-connection pool
+            return options
+    options.update({
+        "pool_size": config.DB_POOL_SIZE,
+        "max_overflow": config.DB_MAX_OVERFLOW,
+        "pool_timeout": config.DB_POOL_TIMEOUT,
+    })
+    return options
+
+# Configure database
+app.config["SQLALCHEMY_DATABASE_URI"] = config.DATABASE_URL
+app.config["SQLALCHEMY_ENGINE_OPTIONS"] = _engine_options(config.DATABASE_URL)
+app.config["SQLALCHEMY_TRACK_MODIFICATIONS"] = False
+
+# Initialize database
+db.init_app(app)
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+def _warm_agents():
+    """Build the agents so the first request doesn't pay for it"""
+    try:
+        get_agent_registry().warm_up()
+    except Exception as e:
+        logger.warning(f"Agent warm-up failed, agents will be built on first use: {str(e)}")
+
+_initialized = False
+_init_lock = threading.Lock()
+
+@app.before_request
+def _init_once():
+    """
+    Create the database tables and start agent warm-up on the first request
+
+    Done here rather than at import so importing the app (gunicorn worker
+    boot, the CLI, tests) touches neither the database nor the LLM stack.
+    """
+    global _initialized
+    if _initialized:
+        return
+    with _init_lock:
+        if _initialized:
+            return
+        db.create_all()
+        # Warm up in the background so this request doesn't wait for the LLM stack to import
+        if config.WARM_AGENTS_ON_STARTUP:
+            threading.Thread(target=_warm_agents, name="agent-warmup", daemon=True).start()
+        _initialized = True
+
 @app.route('/')
 def index():
     """Render the home page with the search form"""
@@ -62,93 +118,151 @@ def research():
         research_file = save_research_results(research_results, query, timestamp)
         draft_file = save_draft(draft_content, query, timestamp)
         
-        # Database interaction (commented out)
-        # research_entry = Research(query=query)
-        # db.session.add(research_entry)
-        # db.session.flush()
+        _persist_run(query, research_results, draft_content)
         
-        # for finding in research_results:
-        #     finding_entry = Finding(
-        #         research_id=research_entry.id,
-        #         title=finding.get('title', 'Untitled'),
-        #         content=finding.get('content', ''),
-        #         source_url=finding.get('source_url', ''),
-        #         source_title=finding.get('source_title', 'Unknown Source')
-        #     )
-        #     db.session.add(finding_entry)
-        
-        # draft_entry = Draft(
-        #     research_id=research_entry.id,
-        #     content=draft_content
-        # )
-        # db.session.add(draft_entry)
-        # db.session.commit()
-        
-        session['query'] = query
-        session['research_results'] = json.dumps(research_results)
-        session['draft'] = draft_content
-        session['research_file'] = research_file
-        session['draft_file'] = draft_file
-        # session['research_id'] = research_entry.id
-        session['research_id'] = "no_db"
+        result_id = get_result_store().save(query, research_results, draft_content, research_file, draft_file)
+        session['result_id'] = result_id
 
-        return redirect(url_for('results'))
+        return redirect(url_for('results_by_id', result_id=result_id))
 
     except Exception as e:
         logger.exception("Error in research workflow")
-        # db.session.rollback()
         return jsonify({'error': f'Research failed: {str(e)}'}), 500
 
 @app.route('/results')
 def results():
-    if 'query' not in session:
+    """Redirect to the latest result of this session"""
+    if 'result_id' not in session:
+        return redirect(url_for('index'))
+    return redirect(url_for('results_by_id', result_id=session['result_id']))
+
+@app.route('/results/<result_id>')
+def results_by_id(result_id):
+    """Render a stored research result"""
+    record = get_result_store().get(result_id)
+    if record is None:
         return redirect(url_for('index'))
-    
-    query = session.get('query')
-    research_results = json.loads(session.get('research_results', '[]'))
-    draft = session.get('draft', '')
-    research_file = session.get('research_file', '')
-    draft_file = session.get('draft_file', '')
-    research_id = session.get('research_id')
 
-    html_draft = Markup(markdown.markdown(draft, extensions=['tables', 'fenced_code']))
+    html_draft = _render_markdown(record['draft'], record['draft_file'])
 
     return render_template(
         'results.html',
-        query=query,
-        research_results=research_results,
+        query=record['query'],
+        research_results=record['findings'],
         draft=html_draft,
-        research_file=research_file,
-        draft_file=draft_file,
-        research_id=research_id
+        research_file=record['research_file'],
+        draft_file=record['draft_file']
     )
 
+def _persist_run(query, findings, draft_content):
+    """
+    Save a research run to the database
+
+    Runs in its own app context so it also works from job worker threads.
+
+    Returns:
+        The research ID, or None if the database write failed
+    """
+    with app.app_context():
+        try:
+            return save_research_run(query, findings, draft_content)
+        except Exception as e:
+            logger.error(f"Failed to save research run to the database: {str(e)}")
+            return None
+
+def _parse_cursor(cursor):
+    """Decode a /history cursor of the form '<created_at ISO>_<id>'"""
+    try:
+        created_at, research_id = cursor.rsplit('_', 1)
+        return datetime.fromisoformat(created_at), int(research_id)
+    except (AttributeError, ValueError):
+        return None
+
 @app.route('/history')
 def history():
-    """History route - disabled without DB"""
-    # research_entries = Research.query.order_by(Research.created_at.desc()).all()
-    research_entries = []  # Empty placeholder
-    return render_template('history.html', researches=research_entries)
+    """List past research runs, newest first, one keyset page at a time"""
+    page_size = min(request.args.get('limit', config.HISTORY_PAGE_SIZE, type=int), 500)
+    statement = (
+        select(Research.id, Research.query, Research.created_at)
+        .order_by(Research.created_at.desc(), Research.id.desc())
+        .limit(page_size + 1)
+    )
+    
+    cursor = _parse_cursor(request.args.get('cursor'))
+    if cursor is not None:
+        created_at, research_id = cursor
+        statement = statement.where(or_(
+            Research.created_at < created_at,
+            (Research.created_at == created_at) & (Research.id < research_id)
+        ))
+    
+    research_entries = db.session.execute(statement).all()
+    next_cursor = None
+    if len(research_entries) > page_size:
+        research_entries = research_entries[:page_size]
+        last = research_entries[-1]
+        next_cursor = f"{last.created_at.isoformat()}_{last.id}"
+    
+    return render_template('history.html', researches=research_entries, next_cursor=next_cursor)
 
 @app.route('/research/<int:research_id>')
 def view_research(research_id):
-    """Disabled detailed view without DB"""
-    # research = Research.query.get_or_404(research_id)
-    # findings = Finding.query.filter_by(research_id=research_id).all()
-    # draft = Draft.query.filter_by(research_id=research_id).first()
-    findings = []
-    draft = None
-    html_draft = None
+    """Show a research run saved in the database"""
+    research = db.get_or_404(Research, research_id)
+    findings = db.session.execute(
+        select(FindingRecord)
+        .where(FindingRecord.research_id == research_id)
+        .order_by(FindingRecord.id)
+    ).scalars().all()
+    draft = db.session.execute(
+        select(Draft).where(Draft.research_id == research_id)
+    ).scalars().first()
+    html_draft = _render_markdown(draft.content) if draft else None
 
     return render_template(
         'results.html',
-        query="(DB-disabled view)",
+        query=research.query,
         research_results=findings,
         draft=html_draft,
         research_id=research_id,
         from_database=True
     )
 
+def _run_and_save(query, use_cache=True, run_id=None):
+    """Run the workflow, save its output and build the API response payload"""
+    with start_trace() as trace:
+        result = run_research_workflow_detailed(query, use_cache=use_cache, run_id=run_id)
+        query = result['query']
+        research_results = result['findings']
+        draft_content = result['draft']
+        
+        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+        research_file = save_research_results(research_results, query, timestamp)
+        draft_file = save_draft(draft_content, query, timestamp)
+        result_id = get_result_store().save(query, research_results, draft_content, research_file, draft_file)
+        
+        research_id = _persist_run(query, research_results, draft_content)
+    
+    return {
+        'query': query,
+        'research_results': findings_to_dicts(research_results),
+        'draft': draft_content,
+        'research_file': research_file,
+        'draft_file': draft_file,
+        'research_id': research_id,
+        'result_id': result_id,
+        'research_trace': {
+            'iterations': result['iterations'],
+            'stop_reason': result['stop_reason'],
+            'usage': result['usage'],
+            'elapsed_ms': result['elapsed_ms'],
+            'cache': result['cache'],
+            'run_id': result.get('run_id'),
+            'pipeline': result.get('pipeline')
+        },
+        'timing': trace.breakdown()
+    }
+
 @app.route('/api/research', methods=['POST'])
 def api_research():
     data = request.json
@@ -158,51 +272,177 @@ def api_research():
         return jsonify({'error': 'No query provided'}), 400
     
     try:
-        research_results, draft_content = run_research_workflow(query)
-        
-        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        research_file = save_research_results(research_results, query, timestamp)
-        draft_file = save_draft(draft_content, query, timestamp)
-        
-        # research_entry = Research(query=query)
-        # db.session.add(research_entry)
-        # db.session.flush()
-        
-        # for finding in research_results:
-        #     finding_entry = Finding(
-        #         research_id=research_entry.id,
-        #         title=finding.get('title', 'Untitled'),
-        #         content=finding.get('content', ''),
-        #         source_url=finding.get('source_url', ''),
-        #         source_title=finding.get('source_title', 'Unknown Source')
-        #     )
-        #     db.session.add(finding_entry)
-        
-        # draft_entry = Draft(
-        #     research_id=research_entry.id,
-        #     content=draft_content
-        # )
-        # db.session.add(draft_entry)
-        # db.session.commit()
-        
-        return jsonify({
-            'query': query,
-            'research_results': research_results,
-            'draft': draft_content,
-            'research_file': research_file,
-            'draft_file': draft_file,
-            # 'research_id': research_entry.id
-            'research_id': "no_db"
-        })
+        # Passing the run_id of a failed request resumes it from its last checkpoint
+        return jsonify(_run_and_save(
+            query, use_cache=not data.get('bypass_cache', False), run_id=data.get('run_id')
+        ))
 
+    except RunQueryMismatchError as e:
+        return jsonify({'error': str(e)}), 409
     except Exception as e:
         logger.exception("Error in research workflow")
-        # db.session.rollback()
         return jsonify({'error': f'Research failed: {str(e)}'}), 500
 
+def _sse(event, data):
+    """Format one Server-Sent Event"""
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+@app.route('/api/research/stream', methods=['GET', 'POST'])
+def api_research_stream():
+    """Stream workflow stages and draft tokens as Server-Sent Events"""
+    if request.method == 'POST':
+        data = request.get_json(silent=True) or {}
+        query = data.get('query', '')
+        run_id = data.get('run_id')
+    else:
+        query = request.args.get('query', '')
+        run_id = request.args.get('run_id')
+    
+    if not query:
+        return jsonify({'error': 'No query provided'}), 400
+    
+    def generate():
+        # Open the stream immediately so clients and proxies see a first byte
+        yield ": stream opened\n\n"
+        findings = []
+        renderer = IncrementalMarkdownRenderer()
+        try:
+            for event, payload in stream_research_workflow(query, run_id=run_id):
+                if event == 'findings_ready':
+                    findings = payload['findings']
+                    payload = dict(payload, findings=findings_to_dicts(findings))
+                yield _sse(event, payload)
+                
+                if event == 'draft_token':
+                    html = renderer.feed(payload['text'])
+                    if html:
+                        yield _sse('draft_html', {'html': html})
+                
+                if event == 'draft_complete':
+                    # Whole-draft render goes into the cache, so save_draft and the results page reuse it
+                    yield _sse('draft_rendered', {'html': renderer.finish()})
+                    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+                    research_file = save_research_results(findings, query, timestamp)
+                    draft_file = save_draft(payload['draft'], query, timestamp)
+                    result_id = get_result_store().save(query, findings, payload['draft'], research_file, draft_file)
+                    research_id = _persist_run(query, findings, payload['draft'])
+                    yield _sse('done', {
+                        'query': query,
+                        'research_id': research_id,
+                        'result_id': result_id,
+                        'research_file': research_file,
+                        'draft_file': draft_file,
+                        'usage': payload['usage'],
+                        'elapsed_ms': payload['elapsed_ms'],
+                        'run_id': payload['run_id']
+                    })
+        except Exception as e:
+            logger.exception("Error in streamed research workflow")
+            yield _sse('error', {'error': f'Research failed: {str(e)}'})
+    
+    return Response(
+        stream_with_context(generate()),
+        mimetype='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    )
+
+@app.route('/api/jobs', methods=['POST'])
+def api_submit_job():
+    """Queue a research job and return its ID right away"""
+    data = request.get_json(silent=True) or {}
+    query = data.get('query', '')
+    
+    if not query:
+        return jsonify({'error': 'No query provided'}), 400
+    
+    try:
+        job_id = get_job_queue(_run_and_save).submit(query)
+    except QueueFullError:
+        response = jsonify({'error': 'Too many research jobs in progress, retry later'})
+        response.headers['Retry-After'] = str(config.JOB_RETRY_AFTER_SECONDS)
+        return response, 429
+    
+    return jsonify({
+        'job_id': job_id,
+        'status': 'queued',
+        'status_url': url_for('api_get_job', job_id=job_id)
+    }), 202
+
+@app.route('/api/jobs/<job_id>', methods=['GET'])
+def api_get_job(job_id):
+    """Report a job's status, and its result once finished"""
+    job = get_job_queue(_run_and_save).store.get(job_id)
+    if job is None:
+        return jsonify({'error': 'Job not found'}), 404
+    return jsonify(job)
+
+@app.route('/api/jobs/<job_id>', methods=['DELETE'])
+def api_cancel_job(job_id):
+    """Cancel a queued job, or discard the result of a running one"""
+    status = get_job_queue(_run_and_save).cancel(job_id)
+    if status is None:
+        return jsonify({'error': 'Job not found'}), 404
+    return jsonify({'job_id': job_id, 'status': status})
+
+@app.route('/api/stats/agents')
+def api_agent_stats():
+    """Report agent construction time and the time saved by reusing them"""
+    return jsonify(get_agent_registry().stats())
+
+@app.route('/api/stats/coalescing')
+def api_coalescing_stats():
+    """Report how many workflow, search and synthesis calls were deduplicated"""
+    return jsonify(singleflight_stats())
+
+@app.route('/api/stats/semantic-cache')
+def api_semantic_cache_stats():
+    """Report semantic cache hit, miss and eviction counters"""
+    cache = get_semantic_cache()
+    return jsonify(cache.stats() if cache is not None else {'enabled': False})
+
+@app.route('/api/stats/result-store')
+def api_result_store_stats():
+    """Report result store memory-tier and database hit counters"""
+    return jsonify(get_result_store().stats())
+
+@app.route('/api/stats/render-cache')
+def api_render_cache_stats():
+    """Report rendered-draft cache hits and renders"""
+    return jsonify(get_render_cache().stats())
+
+@app.route('/api/stats/write-behind')
+def api_write_behind_stats():
+    """Report write-behind queue depth and flush latency"""
+    return jsonify(write_behind_stats())
+
+@app.route('/api/stats/archive')
+def api_archive_stats():
+    """Report results archive size, dedup and compression ratios"""
+    archive = get_archive()
+    if archive is None:
+        return jsonify({'enabled': False})
+    return jsonify(dict(archive.stats(), enabled=True))
+
+@app.route('/api/stats/local-index')
+def api_local_index_stats():
+    """Report local index size, build time, query latency and avoided web searches"""
+    index = get_local_index()
+    return jsonify(index.stats() if index is not None else {'enabled': False})
+
+@app.route('/api/stats/resilience')
+def api_resilience_stats():
+    """Report retries, circuit breaker trips and time spent waiting per upstream"""
+    return jsonify(resilience_stats())
+
+@app.route('/metrics')
+def metrics():
+    """Expose per-stage duration, payload and token histograms for Prometheus"""
+    return Response(render_metrics(), mimetype='text/plain; version=0.0.4')
+
 @app.route('/main_app')
 def main_app_view():
     return "Server is running correctly!"
 
 if __name__ == "__main__":
+    config.validate()
     app.run(debug=True, host="0.0.0.0", port=5000, use_reloader=False)
@@ -2,10 +2,12 @@
 Flask application runner for the Deep Research AI Agent System
 """
 from app import app
+import config
 
 # This file exists specifically to run the Flask app with gunicorn
 # It imports the app object from app.py to be used by the server
 
 if __name__ == "__main__":
+    config.validate()
     # Run the Flask application directly (for development)
     app.run(debug=True, host="0.0.0.0", port=5000)
\ No newline at end of file
@@ -0,0 +1,3 @@
+"""
+Benchmarks for the Deep Research AI Agent System
+"""
@@ -0,0 +1,294 @@
+"""
+Offline end-to-end benchmark of the research pipeline against stand-in Tavily and LLM backends
+
+Drives the workflow (sequential and pipelined), the CLI batch runner and the
+Flask /api/research endpoint at several concurrency levels and writes latency
+percentiles, throughput and peak RSS to a JSON file.
+
+Usage:
+    python -m benchmarks.e2e_bench --modes workflow,api,cli --concurrency 1,4,16 --requests 32
+    python -m benchmarks.e2e_bench --modes workflow,pipeline --fan-out --concurrency 1,4
+    python -m benchmarks.e2e_bench --baseline results/bench/previous.json
+"""
+import argparse
+import json
+import os
+import platform
+import resource
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional
+
+from benchmarks.fake_llm import FakeChatModel
+from benchmarks.fake_tavily import FakeTavilyServer
+
+
+def percentile(sorted_values: List[float], pct: float) -> float:
+    """Nearest-rank percentile of an already sorted list"""
+    if not sorted_values:
+        return 0.0
+    rank = max(1, int(round(pct / 100 * len(sorted_values))))
+    return sorted_values[min(rank, len(sorted_values)) - 1]
+
+
+def peak_rss_mb() -> float:
+    """Peak resident set size of this process so far, in MiB"""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in kilobytes on Linux and bytes on macOS
+    return round(peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024, 1)
+
+
+def summarize(latencies: List[float], errors: int, wall_seconds: float) -> Dict[str, Any]:
+    """Summarize per-request latencies (in seconds) and the wall time of a run"""
+    latencies = sorted(latencies)
+    completed = len(latencies)
+    return {
+        "requests": completed + errors,
+        "errors": errors,
+        "p50_ms": round(percentile(latencies, 50) * 1000, 1),
+        "p95_ms": round(percentile(latencies, 95) * 1000, 1),
+        "p99_ms": round(percentile(latencies, 99) * 1000, 1),
+        "mean_ms": round(sum(latencies) / completed * 1000, 1) if completed else 0.0,
+        "throughput_rps": round(completed / wall_seconds, 3) if wall_seconds > 0 else 0.0,
+        "wall_s": round(wall_seconds, 3),
+        "peak_rss_mb": peak_rss_mb(),
+    }
+
+
+def _configure(args: argparse.Namespace, server: FakeTavilyServer, workdir: str) -> None:
+    """Point the application at the stand-in backends and a scratch directory"""
+    os.environ.update({
+        "TAVILY_API_KEY": "bench_tavily_api_key",
+        "GOOGLE_API_KEY": "bench_google_api_key",
+        "TAVILY_API_URL": server.url,
+        "MAX_RESEARCH_ITERATIONS": str(args.iterations),
+        "RESEARCH_FANOUT_ENABLED": "true" if args.fan_out else "false",
+        "SEARCH_CACHE_ENABLED": "false",
+        "SEMANTIC_CACHE_ENABLED": "false",
+        "LOCAL_INDEX_ENABLED": "false",
+        "WARM_AGENTS_ON_STARTUP": "false",
+        "TAVILY_RATE_LIMIT_PER_SECOND": "0",
+        "LLM_RATE_LIMIT_PER_SECOND": "0",
+        "RESULT_STORE_PATH": os.path.join(workdir, "results.db"),
+        "RESULTS_ARCHIVE_DIR": os.path.join(workdir, "archive"),
+        "JOB_STORE_PATH": os.path.join(workdir, "jobs.db"),
+        "WORKFLOW_CHECKPOINT_PATH": os.path.join(workdir, "checkpoints.db"),
+        "DATABASE_URL": f"sqlite:///{os.path.join(workdir, 'research.db')}",
+    })
+
+    import config
+    config.RESEARCH_RESULTS_DIR = os.path.join(workdir, "research")
+    config.DRAFT_RESULTS_DIR = os.path.join(workdir, "drafts")
+    os.makedirs(config.RESEARCH_RESULTS_DIR, exist_ok=True)
+    os.makedirs(config.DRAFT_RESULTS_DIR, exist_ok=True)
+
+    from agents.drafting_agent import DraftingAgent
+    from agents.registry import get_agent_registry
+    from agents.research_agent import ResearchAgent
+
+    def with_fake_llm(cls):
+        def build():
+            agent = cls()
+            agent.llm = FakeChatModel(
+                latency=args.llm_latency,
+                token_latency=args.llm_token_latency,
+                finding_size=args.finding_size,
+                draft_tokens=args.draft_tokens,
+                section_tokens=args.section_tokens,
+            )
+            return agent
+        return build
+
+    registry = get_agent_registry()
+    registry.register_factory("research", with_fake_llm(ResearchAgent))
+    registry.register_factory("drafting", with_fake_llm(DraftingAgent))
+
+
+def _run_concurrently(call: Callable[[str], None], queries: List[str], concurrency: int) -> Dict[str, Any]:
+    """Run one call per query from ``concurrency`` threads and time each one"""
+    latencies = []
+    errors = 0
+    lock = threading.Lock()
+
+    def timed(query):
+        nonlocal errors
+        start = time.perf_counter()
+        try:
+            call(query)
+        except Exception:
+            with lock:
+                errors += 1
+            return
+        elapsed = time.perf_counter() - start
+        with lock:
+            latencies.append(elapsed)
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        list(pool.map(timed, queries))
+    return summarize(latencies, errors, time.perf_counter() - start)
+
+
+def bench_workflow(queries: List[str], concurrency: int, workdir: str) -> Dict[str, Any]:
+    """Call the sequential (checkpointed) workflow directly"""
+    from workflows.research_workflow import run_research_workflow_detailed
+    return _run_concurrently(
+        lambda q: run_research_workflow_detailed(q, use_cache=False, pipelined=False), queries, concurrency
+    )
+
+
+def bench_pipeline(queries: List[str], concurrency: int, workdir: str) -> Dict[str, Any]:
+    """Call the pipelined workflow directly"""
+    from workflows.research_workflow import run_research_workflow_detailed
+    return _run_concurrently(
+        lambda q: run_research_workflow_detailed(q, use_cache=False, pipelined=True), queries, concurrency
+    )
+
+
+def bench_api(queries: List[str], concurrency: int, workdir: str) -> Dict[str, Any]:
+    """POST to /api/research on a threaded local server"""
+    import requests
+    from werkzeug.serving import make_server
+
+    import app as web_app
+
+    server = make_server("127.0.0.1", 0, web_app.app, threaded=True)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    url = f"http://127.0.0.1:{server.server_port}/api/research"
+    sessions = threading.local()
+
+    def post(query):
+        session = getattr(sessions, "session", None)
+        if session is None:
+            session = sessions.session = requests.Session()
+        response = session.post(url, json={"query": query, "bypass_cache": True}, timeout=300)
+        response.raise_for_status()
+
+    try:
+        return _run_concurrently(post, queries, concurrency)
+    finally:
+        server.shutdown()
+
+
+def bench_cli(queries: List[str], concurrency: int, workdir: str) -> Dict[str, Any]:
+    """Run the CLI batch runner and read per-query latency from its output"""
+    import cli
+
+    cli.get_console().quiet = True
+    output_path = os.path.join(workdir, f"cli_batch_{concurrency}_{time.time_ns()}.jsonl")
+    items = [{"id": query, "query": query} for query in queries]
+
+    start = time.perf_counter()
+    cli.run_batch(items, output_path, concurrency, use_cache=False)
+    wall = time.perf_counter() - start
+
+    latencies = []
+    errors = 0
+    with open(output_path, "r", encoding="utf-8") as f:
+        for line in f:
+            record = json.loads(line)
+            if record["status"] == "ok":
+                latencies.append(record["elapsed_ms"] / 1000)
+            else:
+                errors += 1
+    return summarize(latencies, errors, wall)
+
+
+MODES = {
+    "workflow": bench_workflow,
+    "pipeline": bench_pipeline,
+    "api": bench_api,
+    "cli": bench_cli,
+}
+
+
+def compare(report: Dict[str, Any], baseline_path: str) -> None:
+    """Print p95 latency and throughput changes against a previous report"""
+    with open(baseline_path, "r", encoding="utf-8") as f:
+        baseline = json.load(f)
+    previous = {(run["mode"], run["concurrency"]): run for run in baseline.get("runs", [])}
+    for run in report["runs"]:
+        old = previous.get((run["mode"], run["concurrency"]))
+        if old is None:
+            continue
+        p95 = (run["p95_ms"] - old["p95_ms"]) / old["p95_ms"] * 100 if old["p95_ms"] else 0.0
+        rps = (run["throughput_rps"] - old["throughput_rps"]) / old["throughput_rps"] * 100 if old["throughput_rps"] else 0.0
+        print(f"{run['mode']:>8} c={run['concurrency']:<3} p95 {p95:+.1f}%  throughput {rps:+.1f}%")
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description="Offline end-to-end research pipeline benchmark")
+    parser.add_argument("--modes", default="workflow,api,cli", help="Comma-separated: workflow, pipeline, api, cli")
+    parser.add_argument("--concurrency", default="1,4,16", help="Comma-separated concurrency levels")
+    parser.add_argument("--requests", type=int, default=16, help="Queries per mode and concurrency level")
+    parser.add_argument("--iterations", type=int, default=2, help="Research rounds per query")
+    parser.add_argument("--fan-out", action="store_true", help="Fan the sequential workflow out into sub-queries too")
+    parser.add_argument("--tavily-latency", type=float, default=0.05, help="Stand-in Tavily latency in seconds")
+    parser.add_argument("--tavily-results", type=int, default=5, help="Results per search")
+    parser.add_argument("--content-size", type=int, default=800, help="Characters per search result")
+    parser.add_argument("--llm-latency", type=float, default=0.2, help="Fixed LLM latency per call in seconds")
+    parser.add_argument("--llm-token-latency", type=float, default=0.002, help="LLM latency per output token in seconds")
+    parser.add_argument("--finding-size", type=int, default=400, help="Characters per synthesized finding")
+    parser.add_argument("--draft-tokens", type=int, default=600, help="Tokens per drafted answer")
+    parser.add_argument("--section-tokens", type=int, default=200, help="Tokens per drafted section (pipeline mode)")
+    parser.add_argument("--output", help="Report path (default: results/bench/e2e_<timestamp>.json)")
+    parser.add_argument("--baseline", help="Previous report to compare against")
+    args = parser.parse_args(argv)
+
+    modes = [mode.strip() for mode in args.modes.split(",") if mode.strip()]
+    unknown = [mode for mode in modes if mode not in MODES]
+    if unknown:
+        parser.error(f"Unknown modes: {', '.join(unknown)}")
+    levels = [int(level) for level in args.concurrency.split(",")]
+
+    server = FakeTavilyServer(
+        latency=args.tavily_latency,
+        num_results=args.tavily_results,
+        content_size=args.content_size,
+    ).start()
+    workdir = tempfile.mkdtemp(prefix="deepsearch_bench_")
+    _configure(args, server, workdir)
+
+    import logging
+    logging.disable(logging.WARNING)
+
+    runs = []
+    for mode in modes:
+        for level in levels:
+            queries = [f"benchmark {mode} c{level} question {i}" for i in range(args.requests)]
+            result = MODES[mode](queries, level, workdir)
+            result.update({"mode": mode, "concurrency": level})
+            runs.append(result)
+            print(f"{mode:>8} c={level:<3} p50 {result['p50_ms']:>8.1f} ms  p95 {result['p95_ms']:>8.1f} ms  "
+                  f"p99 {result['p99_ms']:>8.1f} ms  {result['throughput_rps']:>7.2f} req/s  "
+                  f"errors {result['errors']}  rss {result['peak_rss_mb']} MiB")
+    server.stop()
+
+    import config
+    report = {
+        "created_at": datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "params": vars(args),
+        "tavily_requests": server.requests,
+        "runs": runs,
+    }
+    output = args.output or os.path.join(
+        config.RESULTS_DIR, "bench", f"e2e_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json"
+    )
+    os.makedirs(os.path.dirname(output) or ".", exist_ok=True)
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    print(f"Report written to {output}")
+
+    if args.baseline:
+        compare(report, args.baseline)
+
+
+if __name__ == "__main__":
+    main()
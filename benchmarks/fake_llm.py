@@ -0,0 +1,89 @@
+"""
+Offline stand-in for the Gemini chat model used by the agents
+"""
+import json
+import re
+import time
+from typing import Iterator
+
+from langchain_core.messages import AIMessage, AIMessageChunk
+
+from utils.text_utils import estimate_tokens
+
+_URL_RE = re.compile(r"^URL: (\S+)", re.MULTILINE)
+
+
+class FakeChatModel:
+    """
+    Answers the agents' prompts with canned, well-formed responses.
+
+    Each call sleeps ``latency`` seconds plus ``token_latency`` per output
+    token, so slow generations cost proportionally more, like a real model.
+    Planner prompts get ``sub_queries`` search queries, reviewer prompts get
+    ``follow_ups`` gap queries, synthesis prompts get one finding of
+    ``finding_size`` characters per search result, section prompts get a
+    section of about ``section_tokens`` tokens, and anything else gets a
+    draft of about ``draft_tokens`` tokens.
+    """
+
+    def __init__(self, latency: float = 0.2, token_latency: float = 0.002, sub_queries: int = 3,
+                 follow_ups: int = 2, finding_size: int = 400, draft_tokens: int = 600,
+                 section_tokens: int = 200):
+        self.latency = latency
+        self.token_latency = token_latency
+        self.sub_queries = sub_queries
+        self.follow_ups = follow_ups
+        self.finding_size = finding_size
+        self.draft_tokens = draft_tokens
+        self.section_tokens = section_tokens
+
+    def _respond(self, prompt: str) -> str:
+        """Build the response text for a prompt"""
+        if "research planner" in prompt:
+            return json.dumps([f"aspect {i} of the question" for i in range(self.sub_queries)])
+        if "research reviewer" in prompt:
+            return json.dumps([f"follow-up {i} {len(prompt)}" for i in range(self.follow_ups)])
+        if "'findings'" in prompt:
+            filler = ("synthesized finding text " * (self.finding_size // 25 + 1))[:self.finding_size]
+            urls = _URL_RE.findall(prompt) or ["https://example.org/unknown"]
+            return json.dumps({
+                "findings": [
+                    {
+                        "title": f"Finding {i}",
+                        "content": f"{url} {filler}",
+                        "source_url": url,
+                        "source_title": f"Source {i}",
+                    }
+                    for i, url in enumerate(urls)
+                ]
+            })
+        if "one section of a larger answer" in prompt:
+            words = ["section"] * self.section_tokens
+            return "## Section\n\n" + " ".join(words) + " [1]"
+        words = ["draft"] * self.draft_tokens
+        return "# Answer\n\n" + " ".join(words) + " [1]"
+
+    def _message(self, prompt: str, content: str) -> AIMessage:
+        input_tokens = estimate_tokens(prompt)
+        output_tokens = estimate_tokens(content)
+        return AIMessage(content=content, usage_metadata={
+            "input_tokens": input_tokens,
+            "output_tokens": output_tokens,
+            "total_tokens": input_tokens + output_tokens,
+        })
+
+    def invoke(self, prompt: str) -> AIMessage:
+        """Return the whole response after the simulated generation time"""
+        content = self._respond(prompt)
+        time.sleep(self.latency + self.token_latency * estimate_tokens(content))
+        return self._message(prompt, content)
+
+    def stream(self, prompt: str) -> Iterator[AIMessageChunk]:
+        """Yield the response word by word at the simulated generation speed"""
+        content = self._respond(prompt)
+        time.sleep(self.latency)
+        words = content.split(" ")
+        for i, word in enumerate(words):
+            piece = word if i == len(words) - 1 else word + " "
+            time.sleep(self.token_latency * estimate_tokens(piece))
+            yield AIMessageChunk(content=piece)
@@ -0,0 +1,122 @@
+"""
+Local stand-in for the Tavily search API
+"""
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Optional
+
+
+class FakeTavilyServer:
+    """
+    Threaded HTTP/1.1 server answering Tavily-style search requests.
+
+    Responses are delayed by ``latency`` seconds and carry ``num_results``
+    results of ``content_size`` characters each. A share ``error_rate`` of
+    requests (and the next ones queued with ``fail_next``) get an error
+    status instead. The server counts requests and accepted TCP connections
+    so client pooling can be verified.
+    """
+
+    def __init__(self, latency: float = 0.05, num_results: int = 5, content_size: int = 500,
+                 error_rate: float = 0.0, host: str = "127.0.0.1", port: int = 0):
+        self.latency = latency
+        self.num_results = num_results
+        self.content_size = content_size
+        self.error_rate = error_rate
+        self.errors = 0
+        self._failures = []
+        self.requests = 0
+        self.connections = 0
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer((host, port), self._make_handler())
+        self._server.daemon_threads = True
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def url(self) -> str:
+        """URL of the search endpoint"""
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}/search"
+
+    def _make_handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+            disable_nagle_algorithm = True
+
+            def setup(self):
+                super().setup()
+                with server._lock:
+                    server.connections += 1
+
+            def do_POST(self):
+                length = int(self.headers.get("content-length", 0))
+                payload = json.loads(self.rfile.read(length) or b"{}")
+                with server._lock:
+                    server.requests += 1
+                    failure = server._failures.pop(0) if server._failures else None
+                    if failure is None and server.error_rate and random.random() < server.error_rate:
+                        failure = (503, None)
+                    if failure is not None:
+                        server.errors += 1
+                time.sleep(server.latency)
+                if failure is not None:
+                    self._send_error(*failure)
+                    return
+                body = json.dumps(server.build_response(payload.get("query", ""))).encode("utf-8")
+                self.send_response(200)
+                self.send_header("content-type", "application/json")
+                self.send_header("content-length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def _send_error(self, status, retry_after):
+                body = json.dumps({"error": "injected failure"}).encode("utf-8")
+                self.send_response(status)
+                self.send_header("content-type", "application/json")
+                self.send_header("content-length", str(len(body)))
+                if retry_after is not None:
+                    self.send_header("Retry-After", str(retry_after))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
+
+    def fail_next(self, count: int, status: int = 503, retry_after: Optional[float] = None) -> None:
+        """Answer the next ``count`` requests with an error status"""
+        with self._lock:
+            self._failures.extend([(status, retry_after)] * count)
+
+    def build_response(self, query: str) -> dict:
+        """Build a Tavily-shaped response for a query"""
+        filler = ("lorem ipsum dolor sit amet " * (self.content_size // 27 + 1))[:self.content_size]
+        return {
+            "query": query,
+            "results": [
+                {
+                    "title": f"{query} - source {i}",
+                    "url": f"https://example.org/{abs(hash(query)) % 10000}/{i}",
+                    "content": f"{query}: {filler}",
+                    "score": round(1.0 - i * 0.05, 2),
+                }
+                for i in range(self.num_results)
+            ],
+        }
+
+    def start(self) -> "FakeTavilyServer":
+        """Serve requests from a background thread"""
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        """Shut the server down"""
+        self._server.shutdown()
+        self._server.server_close()
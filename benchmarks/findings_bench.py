@@ -0,0 +1,83 @@
+"""
+Compare the legacy dict/JSON-string path for findings with the typed records and codec
+
+Usage:
+    python -m benchmarks.findings_bench --findings 5000
+"""
+import argparse
+import json
+import time
+import tracemalloc
+
+from utils import schema
+from utils.schema import Finding, SearchResponse
+
+
+def _tavily_payload(count: int) -> dict:
+    return {
+        "query": "benchmark",
+        "results": [
+            {
+                "title": f"Result {i}",
+                "url": f"https://example.org/{i}",
+                "content": "lorem ipsum dolor sit amet " * 20,
+                "score": 0.5,
+            }
+            for i in range(count)
+        ],
+    }
+
+
+def legacy_path(payload: dict) -> bytes:
+    """search_tavily -> json.dumps(indent=2) -> json.loads -> patched dicts -> pretty file dump"""
+    text = json.dumps(payload, indent=2)
+    results = json.loads(text)
+    findings = []
+    for result in results.get("results", []):
+        finding = {
+            "title": result.get("title", "Search Result"),
+            "content": result.get("content", "No content available"),
+            "source_url": result.get("url", ""),
+        }
+        if "source_title" not in finding:
+            finding["source_title"] = finding.get("title", "Research Source")
+        findings.append(finding)
+    return json.dumps({"query": "benchmark", "results": findings}, indent=2, ensure_ascii=False).encode("utf-8")
+
+
+def typed_path(payload: dict) -> bytes:
+    """SearchResponse -> Finding records -> compact codec"""
+    response = SearchResponse.from_dict(payload)
+    findings = [Finding.from_search_result(result) for result in response.results]
+    return schema.dumps({"query": "benchmark", "results": findings})
+
+
+def measure(fn, payload, repeat: int) -> dict:
+    tracemalloc.start()
+    start = time.perf_counter()
+    for _ in range(repeat):
+        output = fn(payload)
+    elapsed = (time.perf_counter() - start) / repeat
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {"ms": round(elapsed * 1000, 2), "peak_kib": round(peak / 1024, 1), "bytes": len(output)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Findings serialization benchmark")
+    parser.add_argument("--findings", type=int, default=5000, help="Number of findings")
+    parser.add_argument("--repeat", type=int, default=5, help="Repetitions per path")
+    args = parser.parse_args()
+
+    payload = _tavily_payload(args.findings)
+    report = {
+        "findings": args.findings,
+        "codec": "orjson" if schema.orjson is not None else "json",
+        "legacy": measure(legacy_path, payload, args.repeat),
+        "typed": measure(typed_path, payload, args.repeat),
+    }
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
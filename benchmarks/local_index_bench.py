@@ -0,0 +1,84 @@
+"""
+Measure local index build time, query latency and web-call avoidance on a synthetic corpus
+
+Usage:
+    python -m benchmarks.local_index_bench --runs 2000 --queries 500
+"""
+import argparse
+import json
+import os
+import random
+import statistics
+import tempfile
+import time
+
+
+def _write_corpus(directory: str, runs: int, findings_per_run: int, topics: list) -> None:
+    """Write synthetic research results files, one topic per run"""
+    from utils import schema
+    from utils.schema import Finding
+
+    rng = random.Random(7)
+    vocabulary = [f"word{i}" for i in range(5000)]
+    for run in range(runs):
+        topic = topics[run % len(topics)]
+        findings = [
+            Finding(
+                title=f"{topic} fact {i}",
+                content=f"{topic} " + " ".join(rng.choices(vocabulary, k=60)),
+                source_url=f"https://example.org/{run}/{i}",
+            )
+            for i in range(findings_per_run)
+        ]
+        with open(os.path.join(directory, f"run_{run}.json"), "wb") as f:
+            f.write(schema.dumps({"query": topic, "results": findings}))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Local index benchmark")
+    parser.add_argument("--runs", type=int, default=2000, help="Saved research runs in the corpus")
+    parser.add_argument("--findings", type=int, default=8, help="Findings per run")
+    parser.add_argument("--topics", type=int, default=200, help="Distinct topics in the corpus")
+    parser.add_argument("--queries", type=int, default=500, help="Queries to run")
+    parser.add_argument("--unseen", type=float, default=0.3, help="Share of queries about unseen topics")
+    args = parser.parse_args()
+
+    os.environ.setdefault("TAVILY_API_KEY", "bench_tavily_api_key")
+    os.environ.setdefault("GOOGLE_API_KEY", "bench_google_api_key")
+    import config
+    from utils.local_index import LocalIndex
+
+    topics = [f"topic{i} subject{i}" for i in range(args.topics)]
+    with tempfile.TemporaryDirectory() as directory:
+        _write_corpus(directory, args.runs, args.findings, topics)
+        index = LocalIndex(directory, dim=config.LOCAL_INDEX_DIM, alpha=config.LOCAL_INDEX_ALPHA)
+
+        start = time.perf_counter()
+        index.refresh()
+        build_ms = (time.perf_counter() - start) * 1000
+
+        rng = random.Random(11)
+        latencies = []
+        for i in range(args.queries):
+            if rng.random() < args.unseen:
+                query = f"what is unseen{i} thing{i}"
+            else:
+                query = f"tell me about {rng.choice(topics)}"
+            start = time.perf_counter()
+            index.lookup(query)
+            latencies.append((time.perf_counter() - start) * 1000)
+
+        latencies.sort()
+        stats = index.stats()
+        report = {
+            "findings": stats["findings"],
+            "build_ms": round(build_ms, 1),
+            "query_p50_ms": round(statistics.median(latencies), 3),
+            "query_p95_ms": round(latencies[int(len(latencies) * 0.95) - 1], 3),
+            "web_call_avoidance_rate": round(stats["web_call_avoidance_rate"], 3),
+        }
+        print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
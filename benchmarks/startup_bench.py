@@ -0,0 +1,163 @@
+"""
+Startup-time benchmark: cold import cost of the entry points, with a regression check
+
+Each entry point is imported in a fresh interpreter under ``python -X importtime``
+with no API keys set (configuration must not be validated at import) and agent
+warm-up disabled. Reports the median cumulative import time, the wall time of
+the whole process and the number of modules loaded, and fails when an entry
+point eagerly imports the LLM stack or is slower than a baseline report.
+
+Usage:
+    python -m benchmarks.startup_bench --runs 5
+    python -m benchmarks.startup_bench --baseline results/bench/startup_previous.json --max-regression 25
+"""
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+TARGETS = ("config", "cli", "app", "main")
+
+# Modules that must only load when they are actually used
+LAZY_MODULES = (
+    "langchain_google_genai",
+    "google.genai",
+    "langchain_core",
+    "markdown",
+    "rich.console",
+    "rich.markdown",
+    "pygments",
+)
+
+
+def parse_importtime(stderr: str, target: str) -> Tuple[float, List[str]]:
+    """
+    Read ``-X importtime`` output
+
+    Returns:
+        Cumulative import time of ``target`` in milliseconds, and every module imported
+    """
+    cumulative_us = 0
+    modules = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|", 2)
+        if not cumulative.strip().isdigit():
+            continue  # header line
+        module = name.strip()
+        modules.append(module)
+        if module == target and not name[1:].startswith(" "):
+            cumulative_us = int(cumulative)
+    return cumulative_us / 1000, modules
+
+
+def measure(target: str) -> Dict[str, Any]:
+    """Import one entry point in a fresh interpreter"""
+    env = {k: v for k, v in os.environ.items() if k not in ("TAVILY_API_KEY", "GOOGLE_API_KEY")}
+    env.update({"WARM_AGENTS_ON_STARTUP": "false", "PYTHONDONTWRITEBYTECODE": "1"})
+    start = time.perf_counter()
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {target}"],
+        cwd=ROOT, env=env, capture_output=True, text=True,
+    )
+    wall_ms = (time.perf_counter() - start) * 1000
+    if proc.returncode != 0:
+        raise RuntimeError(f"Importing {target} failed:\n{proc.stderr[-2000:]}")
+    import_ms, modules = parse_importtime(proc.stderr, target)
+    return {"import_ms": import_ms, "wall_ms": wall_ms, "modules": modules}
+
+
+def bench(target: str, runs: int) -> Dict[str, Any]:
+    """Median import and wall time of an entry point over several cold starts"""
+    samples = [measure(target) for _ in range(runs)]
+    modules = set(samples[-1]["modules"])
+    eager = [name for name in LAZY_MODULES if name in modules]
+    return {
+        "target": target,
+        "runs": runs,
+        "import_ms": round(statistics.median(s["import_ms"] for s in samples), 1),
+        "wall_ms": round(statistics.median(s["wall_ms"] for s in samples), 1),
+        "modules": len(modules),
+        "eager_lazy_modules": eager,
+    }
+
+
+def check(report: Dict[str, Any], baseline_path: Optional[str], max_regression: float, slack_ms: float) -> List[str]:
+    """
+    Compare a report with a baseline and the lazy-import rules
+
+    Returns:
+        Problems found (empty if none)
+    """
+    problems = []
+    for result in report["targets"]:
+        if result["eager_lazy_modules"]:
+            problems.append(f"{result['target']} eagerly imports {', '.join(result['eager_lazy_modules'])}")
+    if not baseline_path:
+        return problems
+
+    with open(baseline_path, "r", encoding="utf-8") as f:
+        baseline = {result["target"]: result for result in json.load(f).get("targets", [])}
+    for result in report["targets"]:
+        old = baseline.get(result["target"])
+        if old is None or not old["import_ms"]:
+            continue
+        change = (result["import_ms"] - old["import_ms"]) / old["import_ms"] * 100
+        print(f"{result['target']:>8} import {old['import_ms']:.1f} -> {result['import_ms']:.1f} ms ({change:+.1f}%)")
+        limit = old["import_ms"] * (1 + max_regression / 100) + slack_ms
+        if result["import_ms"] > limit:
+            problems.append(
+                f"{result['target']} import time regressed {change:+.1f}% "
+                f"({old['import_ms']:.1f} -> {result['import_ms']:.1f} ms)"
+            )
+    return problems
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description="Entry point cold-start benchmark")
+    parser.add_argument("--targets", default=",".join(TARGETS), help="Comma-separated modules to import")
+    parser.add_argument("--runs", type=int, default=5, help="Cold starts per target")
+    parser.add_argument("--baseline", help="Previous report to check for regressions")
+    parser.add_argument("--max-regression", type=float, default=25.0, help="Allowed import time increase in percent")
+    parser.add_argument("--slack-ms", type=float, default=10.0, help="Absolute noise allowance in milliseconds")
+    parser.add_argument("--output", help="Report path (default: results/bench/startup_<timestamp>.json)")
+    args = parser.parse_args(argv)
+
+    results = []
+    for target in [t.strip() for t in args.targets.split(",") if t.strip()]:
+        result = bench(target, args.runs)
+        results.append(result)
+        print(f"{target:>8} import {result['import_ms']:>8.1f} ms  process {result['wall_ms']:>8.1f} ms  "
+              f"{result['modules']} modules")
+
+    report = {
+        "created_at": datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "targets": results,
+    }
+    output = args.output or os.path.join(
+        ROOT, "results", "bench", f"startup_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json"
+    )
+    os.makedirs(os.path.dirname(output) or ".", exist_ok=True)
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    print(f"Report written to {output}")
+
+    problems = check(report, args.baseline, args.max_regression, args.slack_ms)
+    for problem in problems:
+        print(f"FAIL: {problem}")
+    if problems:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
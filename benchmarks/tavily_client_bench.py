@@ -0,0 +1,73 @@
+"""
+Measure Tavily client latency and connection reuse against a local stand-in server
+
+Usage:
+    python -m benchmarks.tavily_client_bench --requests 200 --concurrency 8
+"""
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from benchmarks.fake_tavily import FakeTavilyServer
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Tavily client benchmark")
+    parser.add_argument("--requests", type=int, default=200, help="Number of searches to run")
+    parser.add_argument("--concurrency", type=int, default=8, help="Concurrent callers")
+    parser.add_argument("--latency", type=float, default=0.01, help="Stand-in server latency in seconds")
+    args = parser.parse_args()
+
+    server = FakeTavilyServer(latency=args.latency).start()
+    os.environ.setdefault("TAVILY_API_KEY", "bench_tavily_api_key")
+    os.environ.setdefault("GOOGLE_API_KEY", "bench_google_api_key")
+    os.environ["TAVILY_API_URL"] = server.url
+    os.environ["SEARCH_CACHE_ENABLED"] = "false"
+
+    from utils.tavily_tools import asearch_tavily, get_tavily_client, search_tavily
+
+    def timed_search(i):
+        start = time.perf_counter()
+        search_tavily(f"benchmark query {i}")
+        return time.perf_counter() - start
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.concurrency) as pool:
+        latencies = list(pool.map(timed_search, range(args.requests)))
+    sync_elapsed = time.perf_counter() - start
+
+    async def run_async():
+        semaphore = asyncio.Semaphore(args.concurrency)
+
+        async def one(i):
+            async with semaphore:
+                await asearch_tavily(f"async benchmark query {i}")
+
+        await asyncio.gather(*(one(i) for i in range(args.requests)))
+
+    start = time.perf_counter()
+    asyncio.run(run_async())
+    async_elapsed = time.perf_counter() - start
+
+    latencies.sort()
+    report = {
+        "requests": args.requests,
+        "concurrency": args.concurrency,
+        "sync_elapsed_s": round(sync_elapsed, 3),
+        "async_elapsed_s": round(async_elapsed, 3),
+        "sync_p50_ms": round(statistics.median(latencies) * 1000, 2),
+        "sync_p95_ms": round(latencies[int(len(latencies) * 0.95) - 1] * 1000, 2),
+        "client": get_tavily_client().stats(),
+        "server_requests": server.requests,
+        "server_connections": server.connections,
+    }
+    server.stop()
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -5,24 +5,46 @@ import os
 import sys
 import logging
 import argparse
+import hashlib
 import json
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from datetime import datetime
-from rich.console import Console
-from rich.panel import Panel
-from rich.markdown import Markdown
-from rich.progress import Progress, SpinnerColumn, TextColumn
+from typing import Any, Dict, List, Set
 
-from workflows.research_workflow import run_research_workflow
+from workflows.research_workflow import (
+    resume_research_workflow, run_research_workflow, run_research_workflow_detailed
+)
 from utils.file_utils import save_research_results, save_draft
+from utils.schema import findings_to_dicts
+from utils.write_behind import flush_writes
 import config
 
-# Set up rich console
-console = Console()
 logger = logging.getLogger(__name__)
 
+_console = None
+
+def get_console():
+    """Return the shared rich console, importing rich only once output is needed"""
+    global _console
+    if _console is None:
+        from rich.console import Console
+        _console = Console()
+    return _console
+
+def _progress():
+    """Spinner shown while research runs"""
+    from rich.progress import Progress, SpinnerColumn, TextColumn
+    return Progress(
+        SpinnerColumn(),
+        TextColumn("[bold blue]{task.description}[/bold blue]"),
+        console=get_console()
+    )
+
 def display_welcome_message():
     """Display a welcome message to the user"""
-    console.print(Panel.fit(
+    from rich.panel import Panel
+    get_console().print(Panel.fit(
         "[bold blue]Deep Research AI Agent System[/bold blue]\n"
         "A multi-agent system for comprehensive research and answer drafting",
         title="Welcome",
@@ -31,18 +53,23 @@ def display_welcome_message():
 
 def get_user_query():
     """Get the research query from the user"""
+    console = get_console()
     console.print("\n[bold cyan]Enter your research query:[/bold cyan]")
     query = console.input("> ")
     return query
 
 def display_results(research_results, draft, query, research_file=None, draft_file=None):
     """Display the research results and draft to the user"""
+    # rich.markdown pulls in markdown-it and pygments; only load it to show a draft
+    from rich.markdown import Markdown
+    from rich.panel import Panel
+    console = get_console()
     # Display research results
     console.print("\n[bold green]Research Results:[/bold green]")
     for i, result in enumerate(research_results, 1):
-        console.print(f"[bold]{i}.[/bold] {result['title']}")
-        console.print(f"[dim]{result['content'][:200]}...[/dim]")
-        console.print(f"[blue]Source:[/blue] {result['source_url']}")
+        console.print(f"[bold]{i}.[/bold] {result.title}")
+        console.print(f"[dim]{result.content[:200]}...[/dim]")
+        console.print(f"[blue]Source:[/blue] {result.source_url}")
         console.print()
     
     # Display draft
@@ -55,32 +82,223 @@ def display_results(research_results, draft, query, research_file=None, draft_fi
     if draft_file:
         console.print(f"[dim]Draft saved to: {draft_file}[/dim]")
 
+def read_batch_queries(source) -> List[Dict[str, str]]:
+    """
+    Read batch queries from a text or JSONL stream
+
+    Each non-empty line is either a JSON object with a 'query' (and optional
+    'id') or a plain-text query. Lines starting with '#' are ignored, and
+    repeated IDs are only run once.
+
+    Args:
+        source: File-like object to read from
+
+    Returns:
+        List of {'id', 'query'} items in input order
+    """
+    items = []
+    seen = set()
+    for line_number, line in enumerate(source, 1):
+        line = line.strip()
+        if not line or line.startswith('#'):
+            continue
+        if line.startswith('{'):
+            try:
+                data = json.loads(line)
+            except json.JSONDecodeError as e:
+                logger.warning(f"Skipping invalid JSON on line {line_number}: {str(e)}")
+                continue
+            query = str(data.get('query', '')).strip()
+            item_id = str(data.get('id') or query)
+        else:
+            query = line
+            item_id = line
+        if not query or item_id in seen:
+            continue
+        seen.add(item_id)
+        items.append({'id': item_id, 'query': query})
+    return items
+
+def load_completed_ids(output_path: str) -> Set[str]:
+    """
+    Collect the IDs that already succeeded in a previous run of the batch
+
+    A line cut short by a crash is ignored, so its query runs again.
+
+    Args:
+        output_path: Path of the JSONL output file
+
+    Returns:
+        Set of completed query IDs
+    """
+    completed = set()
+    if not os.path.exists(output_path):
+        return completed
+    with open(output_path, 'r', encoding='utf-8') as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                continue
+            if record.get('status') == 'ok':
+                completed.add(record.get('id'))
+    return completed
+
+def _open_output(output_path: str):
+    """Open the JSONL output for appending, terminating a line left partial by a crash"""
+    directory = os.path.dirname(output_path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    output = open(output_path, 'a+', encoding='utf-8')
+    if output.tell() > 0:
+        output.seek(output.tell() - 1)
+        if output.read(1) != '\n':
+            output.write('\n')
+    return output
+
+def _batch_run_id(output_path: str, item_id: str, query: str) -> str:
+    """
+    Stable checkpoint ID for a batch query, so rerunning the batch resumes a failed run
+
+    The query is part of the ID, so editing an item's query starts a fresh run.
+    """
+    key = f"{os.path.abspath(output_path)}\n{query}"
+    digest = hashlib.sha1(key.encode('utf-8')).hexdigest()[:12]
+    return f"batch-{digest}-{item_id}"
+
+def _run_batch_item(item: Dict[str, str], use_cache: bool, save: bool, run_id: str = None) -> Dict[str, Any]:
+    """Run one batch query and build its output record"""
+    query = item['query']
+    try:
+        result = run_research_workflow_detailed(query, use_cache=use_cache, run_id=run_id)
+    except Exception as e:
+        logger.exception(f"Batch query failed: {query}")
+        return {'id': item['id'], 'query': query, 'status': 'error', 'error': str(e), 'run_id': run_id}
+
+    query = result['query']
+    record = {
+        'id': item['id'],
+        'query': query,
+        'status': 'ok',
+        'findings': findings_to_dicts(result['findings']),
+        'draft': result['draft'],
+        'iterations': result['iterations'],
+        'stop_reason': result['stop_reason'],
+        'usage': result['usage'],
+        'elapsed_ms': result['elapsed_ms'],
+        'cache': result['cache'],
+        'run_id': result.get('run_id'),
+    }
+    if save:
+        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+        record['research_file'] = save_research_results(result['findings'], query, timestamp)
+        record['draft_file'] = save_draft(result['draft'], query, timestamp)
+    return record
+
+def run_batch(items: List[Dict[str, str]], output_path: str, parallel: int,
+              use_cache: bool = True, save: bool = False) -> int:
+    """
+    Run batch queries concurrently, appending each result to a JSONL file as it finishes
+
+    Queries that already succeeded in ``output_path`` are skipped, so an
+    interrupted batch resumes where it stopped; queries that failed resume
+    from their last workflow checkpoint. All queries share the process-wide
+    agents and caches.
+
+    Args:
+        items: Queries from ``read_batch_queries``
+        output_path: Path of the JSONL output file
+        parallel: Maximum number of queries running at once
+        use_cache: Allow serving queries from the semantic cache
+        save: Also save research results and drafts to the results directory
+
+    Returns:
+        Number of queries that failed
+    """
+    console = get_console()
+    completed = load_completed_ids(output_path)
+    pending = [item for item in items if item['id'] not in completed]
+    if completed:
+        console.print(f"[dim]Resuming: {len(items) - len(pending)} of {len(items)} queries already done[/dim]")
+    if not pending:
+        return 0
+
+    failures = 0
+    write_lock = threading.Lock()
+    with _open_output(output_path) as output, _progress() as progress:
+        task = progress.add_task(f"[blue]Running {len(pending)} queries...", total=len(pending))
+        with ThreadPoolExecutor(max_workers=max(1, parallel), thread_name_prefix="batch") as pool:
+            futures = [pool.submit(_run_batch_item, item, use_cache, save, _batch_run_id(output_path, item['id'], item['query']))
+                       for item in pending]
+            for future in as_completed(futures):
+                record = future.result()
+                with write_lock:
+                    output.write(json.dumps(record, ensure_ascii=False) + '\n')
+                    output.flush()
+                    os.fsync(output.fileno())
+                if record['status'] != 'ok':
+                    failures += 1
+                    console.print(f"[red]Failed:[/red] {record['query']} ({record['error']})")
+                progress.advance(task)
+
+    return failures
+
 def run_cli():
     """Run the command-line interface"""
     parser = argparse.ArgumentParser(description="Deep Research AI Agent System")
     parser.add_argument("--query", type=str, help="Research query to process")
     parser.add_argument("--save", action="store_true", help="Save research results and draft")
+    parser.add_argument("--no-cache", action="store_true", help="Bypass the semantic query cache")
+    parser.add_argument("--batch", type=str, help="File of queries (one per line, or JSONL); '-' reads stdin")
+    parser.add_argument("--output", type=str, help="JSONL file for batch results (default: next to the batch file)")
+    parser.add_argument("--parallel", type=int, default=config.BATCH_PARALLELISM, help="Queries to run at once in batch mode")
+    parser.add_argument("--resume", type=str, metavar="RUN_ID", help="Resume a failed research run from its last checkpoint")
     args = parser.parse_args()
+    console = get_console()
+    
+    try:
+        config.validate()
+    except EnvironmentError as e:
+        console.print(f"[bold red]{str(e)}[/bold red]")
+        sys.exit(1)
     
     display_welcome_message()
     
-    # Get query from command line args or prompt
-    query = args.query if args.query else get_user_query()
+    if args.batch:
+        if args.batch == '-':
+            items = read_batch_queries(sys.stdin)
+            output_path = args.output or os.path.join(config.RESULTS_DIR, "batch", "stdin.jsonl")
+        else:
+            with open(args.batch, 'r', encoding='utf-8') as f:
+                items = read_batch_queries(f)
+            output_path = args.output or os.path.splitext(args.batch)[0] + ".results.jsonl"
+        
+        failures = run_batch(items, output_path, args.parallel, use_cache=not args.no_cache, save=args.save)
+        flush_writes()
+        console.print(f"\n[bold green]Batch finished:[/bold green] results in {output_path}")
+        if failures:
+            console.print(f"[bold red]{failures} queries failed; run the same command again to retry them[/bold red]")
+            sys.exit(1)
+        return
+    
+    # Get query from command line args or prompt (a resumed run already has one)
+    query = None if args.resume else (args.query if args.query else get_user_query())
     
-    if not query:
+    if not query and not args.resume:
         console.print("[bold red]No query provided. Exiting.[/bold red]")
         sys.exit(1)
     
     # Run the research workflow with progress indication
-    with Progress(
-        SpinnerColumn(),
-        TextColumn("[bold blue]{task.description}[/bold blue]"),
-        console=console
-    ) as progress:
+    with _progress() as progress:
         task = progress.add_task("[blue]Running research workflow...", total=None)
         
         try:
-            research_results, draft = run_research_workflow(query)
+            if args.resume:
+                result = resume_research_workflow(args.resume)
+                query = result['query']
+                research_results, draft = result['findings'], result['draft']
+            else:
+                research_results, draft = run_research_workflow(query, use_cache=not args.no_cache)
             progress.update(task, completed=True, description="[green]Research completed!")
         except Exception as e:
             progress.update(task, completed=True, description="[red]Research failed!")
@@ -95,6 +313,8 @@ def run_cli():
         timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
         research_file = save_research_results(research_results, query, timestamp)
         draft_file = save_draft(draft, query, timestamp)
+        # Make sure the files are on disk before their paths are shown
+        flush_writes()
     
     # Display results
     display_results(research_results, draft, query, research_file, draft_file)
@@ -1,31 +1,162 @@
 """
 Configuration settings for the Deep Research AI Agent System
+
+Importing this module has no side effects beyond reading the environment:
+API keys are looked up and validated on first use, and results directories
+are created by whatever writes to them.
 """
 import os
 from dotenv import load_dotenv
 
-# Load environment variables from .env file if present
+# Load environment variables from .env file if present (the only place this is done)
 load_dotenv()
 
 # === API Keys ===
-TAVILY_API_KEY = os.getenv("TAVILY_API_KEY")
-GOOGLE_API_KEY = os.getenv("GOOGLE_API_KEY")
+# TAVILY_API_KEY and GOOGLE_API_KEY are resolved lazily by __getattr__ below
+_REQUIRED_KEYS = ("TAVILY_API_KEY", "GOOGLE_API_KEY")
+
+
+def __getattr__(name):
+    """Read required API keys on first use, failing only when one is actually needed (PEP 562)"""
+    if name in _REQUIRED_KEYS:
+        value = os.getenv(name)
+        if not value:
+            raise EnvironmentError(f"Missing API key {name}. Please check your .env file.")
+        return value
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+def validate() -> None:
+    """Check every required setting now, for entry points that want to fail fast"""
+    for name in _REQUIRED_KEYS:
+        __getattr__(name)
+
 
-# Check if the keys are loaded properly (optional, for debugging)
-if not TAVILY_API_KEY or not GOOGLE_API_KEY:
-    raise EnvironmentError("Missing API keys. Please check your .env file.")
+# === Tavily HTTP Client ===
+TAVILY_API_URL = os.getenv("TAVILY_API_URL", "https://api.tavily.com/search")
+TAVILY_CONNECT_TIMEOUT = float(os.getenv("TAVILY_CONNECT_TIMEOUT", "5"))
+TAVILY_READ_TIMEOUT = float(os.getenv("TAVILY_READ_TIMEOUT", "30"))
+TAVILY_POOL_SIZE = int(os.getenv("TAVILY_POOL_SIZE", "10"))
+TAVILY_HTTP2 = os.getenv("TAVILY_HTTP2", "true").lower() == "true"
 
 # === LLM Parameters ===
 DEFAULT_TEMPERATURE = 0.2
-MAX_RESEARCH_ITERATIONS = 3
+MAX_RESEARCH_ITERATIONS = int(os.getenv("MAX_RESEARCH_ITERATIONS", "3"))
 MAX_DRAFTING_ITERATIONS = 2
 
+# === Research Fan-out ===
+RESEARCH_FANOUT_ENABLED = os.getenv("RESEARCH_FANOUT_ENABLED", "false").lower() == "true"
+RESEARCH_FANOUT_SUB_QUERIES = int(os.getenv("RESEARCH_FANOUT_SUB_QUERIES", "4"))
+RESEARCH_FANOUT_MAX_WORKERS = int(os.getenv("RESEARCH_FANOUT_MAX_WORKERS", "4"))
+
+# === Iterative Research ===
+RESEARCH_FOLLOWUP_QUERIES = int(os.getenv("RESEARCH_FOLLOWUP_QUERIES", "3"))
+RESEARCH_MIN_NOVELTY = float(os.getenv("RESEARCH_MIN_NOVELTY", "0.15"))
+RESEARCH_TIME_BUDGET_SECONDS = float(os.getenv("RESEARCH_TIME_BUDGET_SECONDS", "90"))
+RESEARCH_TOKEN_BUDGET = int(os.getenv("RESEARCH_TOKEN_BUDGET", "60000"))
+RESEARCH_API_CALL_BUDGET = int(os.getenv("RESEARCH_API_CALL_BUDGET", "20"))
+
+# === Request Coalescing ===
+REQUEST_COALESCING_ENABLED = os.getenv("REQUEST_COALESCING_ENABLED", "true").lower() == "true"
+
+# === Semantic Query Cache ===
+SEMANTIC_CACHE_ENABLED = os.getenv("SEMANTIC_CACHE_ENABLED", "true").lower() == "true"
+SEMANTIC_CACHE_THRESHOLD = float(os.getenv("SEMANTIC_CACHE_THRESHOLD", "0.9"))
+SEMANTIC_CACHE_TTL_SECONDS = float(os.getenv("SEMANTIC_CACHE_TTL_SECONDS", "3600"))
+SEMANTIC_CACHE_MAX_ENTRIES = int(os.getenv("SEMANTIC_CACHE_MAX_ENTRIES", "1000"))
+SEMANTIC_CACHE_DIM = int(os.getenv("SEMANTIC_CACHE_DIM", "1024"))
+
+# === Drafting Context Packing ===
+DRAFT_CONTEXT_TOKEN_BUDGET = int(os.getenv("DRAFT_CONTEXT_TOKEN_BUDGET", "6000"))
+DRAFT_DEDUP_THRESHOLD = float(os.getenv("DRAFT_DEDUP_THRESHOLD", "0.8"))
+DRAFT_MINHASH_PERMUTATIONS = int(os.getenv("DRAFT_MINHASH_PERMUTATIONS", "64"))
+
+# === Agent Registry ===
+WARM_AGENTS_ON_STARTUP = os.getenv("WARM_AGENTS_ON_STARTUP", "true").lower() == "true"
+
 # === File Storage Paths ===
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 RESULTS_DIR = os.path.join(BASE_DIR, "results")
 RESEARCH_RESULTS_DIR = os.path.join(RESULTS_DIR, "research")
 DRAFT_RESULTS_DIR = os.path.join(RESULTS_DIR, "drafts")
 
-# === Ensure Results Directories Exist ===
-os.makedirs(RESEARCH_RESULTS_DIR, exist_ok=True)
-os.makedirs(DRAFT_RESULTS_DIR, exist_ok=True)
+# === Search Cache ===
+SEARCH_CACHE_ENABLED = os.getenv("SEARCH_CACHE_ENABLED", "true").lower() == "true"
+SEARCH_CACHE_PATH = os.getenv("SEARCH_CACHE_PATH", os.path.join(RESULTS_DIR, "cache", "search_cache.db"))
+SEARCH_CACHE_TTL_SECONDS = int(os.getenv("SEARCH_CACHE_TTL_SECONDS", "3600"))
+SEARCH_CACHE_MAX_ENTRIES = int(os.getenv("SEARCH_CACHE_MAX_ENTRIES", "5000"))
+# Hit counters and access times are buffered and written at most this often
+SEARCH_CACHE_FLUSH_SECONDS = float(os.getenv("SEARCH_CACHE_FLUSH_SECONDS", "5"))
+
+# === Research Jobs ===
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", "2"))
+JOB_QUEUE_SIZE = int(os.getenv("JOB_QUEUE_SIZE", "16"))
+JOB_RETRY_AFTER_SECONDS = int(os.getenv("JOB_RETRY_AFTER_SECONDS", "5"))
+JOB_STORE_PATH = os.getenv("JOB_STORE_PATH", os.path.join(RESULTS_DIR, "cache", "jobs.db"))
+JOB_RETENTION_SECONDS = int(os.getenv("JOB_RETENTION_SECONDS", str(7 * 86400)))
+
+# === Result Store ===
+RESULT_STORE_PATH = os.getenv("RESULT_STORE_PATH", os.path.join(RESULTS_DIR, "cache", "results.db"))
+RESULT_STORE_MEMORY_ENTRIES = int(os.getenv("RESULT_STORE_MEMORY_ENTRIES", "128"))
+RESULT_STORE_RETENTION_SECONDS = int(os.getenv("RESULT_STORE_RETENTION_SECONDS", str(30 * 86400)))
+RESULT_STORE_MAX_ROWS = int(os.getenv("RESULT_STORE_MAX_ROWS", "10000"))
+
+# === Database ===
+DATABASE_URL = os.getenv("DATABASE_URL", f"sqlite:///{os.path.join(RESULTS_DIR, 'research.db')}")
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "5"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "10"))
+DB_POOL_TIMEOUT = int(os.getenv("DB_POOL_TIMEOUT", "10"))
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "1800"))
+HISTORY_PAGE_SIZE = int(os.getenv("HISTORY_PAGE_SIZE", "50"))
+
+# === Local Retrieval Index ===
+LOCAL_INDEX_ENABLED = os.getenv("LOCAL_INDEX_ENABLED", "true").lower() == "true"
+LOCAL_INDEX_DIM = int(os.getenv("LOCAL_INDEX_DIM", "256"))
+LOCAL_INDEX_ALPHA = float(os.getenv("LOCAL_INDEX_ALPHA", "0.5"))
+LOCAL_INDEX_TOP_K = int(os.getenv("LOCAL_INDEX_TOP_K", "8"))
+LOCAL_INDEX_MIN_RESULTS = int(os.getenv("LOCAL_INDEX_MIN_RESULTS", "3"))
+LOCAL_INDEX_MIN_SIMILARITY = float(os.getenv("LOCAL_INDEX_MIN_SIMILARITY", "0.2"))
+LOCAL_INDEX_COVERAGE_THRESHOLD = float(os.getenv("LOCAL_INDEX_COVERAGE_THRESHOLD", "0.8"))
+
+# === CLI Batch Mode ===
+BATCH_PARALLELISM = int(os.getenv("BATCH_PARALLELISM", "4"))
+
+# === Upstream Resilience ===
+TAVILY_RATE_LIMIT_PER_SECOND = float(os.getenv("TAVILY_RATE_LIMIT_PER_SECOND", "5"))
+TAVILY_RATE_LIMIT_BURST = float(os.getenv("TAVILY_RATE_LIMIT_BURST", "10"))
+LLM_RATE_LIMIT_PER_SECOND = float(os.getenv("LLM_RATE_LIMIT_PER_SECOND", "5"))
+LLM_RATE_LIMIT_BURST = float(os.getenv("LLM_RATE_LIMIT_BURST", "10"))
+UPSTREAM_MAX_ATTEMPTS = int(os.getenv("UPSTREAM_MAX_ATTEMPTS", "4"))
+UPSTREAM_BACKOFF_BASE_SECONDS = float(os.getenv("UPSTREAM_BACKOFF_BASE_SECONDS", "0.5"))
+UPSTREAM_BACKOFF_MAX_SECONDS = float(os.getenv("UPSTREAM_BACKOFF_MAX_SECONDS", "20"))
+UPSTREAM_MAX_RETRY_AFTER_SECONDS = float(os.getenv("UPSTREAM_MAX_RETRY_AFTER_SECONDS", "60"))
+CIRCUIT_FAILURE_THRESHOLD = int(os.getenv("CIRCUIT_FAILURE_THRESHOLD", "5"))
+CIRCUIT_RESET_SECONDS = float(os.getenv("CIRCUIT_RESET_SECONDS", "30"))
+
+# === Draft Rendering ===
+MARKDOWN_CACHE_ENTRIES = int(os.getenv("MARKDOWN_CACHE_ENTRIES", "256"))
+
+# === Write-Behind File Persistence ===
+WRITE_BEHIND_ENABLED = os.getenv("WRITE_BEHIND_ENABLED", "true").lower() == "true"
+WRITE_BEHIND_MAX_BATCH = int(os.getenv("WRITE_BEHIND_MAX_BATCH", "64"))
+WRITE_BEHIND_MAX_QUEUE = int(os.getenv("WRITE_BEHIND_MAX_QUEUE", "10000"))
+WRITE_BEHIND_FSYNC = os.getenv("WRITE_BEHIND_FSYNC", "false").lower() == "true"
+
+# === Results Archive ===
+RESULTS_ARCHIVE_ENABLED = os.getenv("RESULTS_ARCHIVE_ENABLED", "true").lower() == "true"
+RESULTS_ARCHIVE_DIR = os.getenv("RESULTS_ARCHIVE_DIR", os.path.join(RESULTS_DIR, "archive"))
+RESULTS_ARCHIVE_MANIFEST = os.getenv("RESULTS_ARCHIVE_MANIFEST", os.path.join(RESULTS_ARCHIVE_DIR, "manifest.db"))
+RESULTS_ARCHIVE_CODEC = os.getenv("RESULTS_ARCHIVE_CODEC", "zstd")
+RESULTS_ARCHIVE_LEVEL = int(os.getenv("RESULTS_ARCHIVE_LEVEL", "3"))
+
+# === Workflow Checkpoints ===
+WORKFLOW_CHECKPOINT_PATH = os.getenv("WORKFLOW_CHECKPOINT_PATH", os.path.join(RESULTS_DIR, "cache", "checkpoints.db"))
+# Checkpoints of runs left unfinished this long are deleted
+WORKFLOW_CHECKPOINT_TTL_SECONDS = int(os.getenv("WORKFLOW_CHECKPOINT_TTL_SECONDS", str(7 * 86400)))
+
+# === Pipelined Research ===
+RESEARCH_PIPELINE_ENABLED = os.getenv("RESEARCH_PIPELINE_ENABLED", "false").lower() == "true"
+RESEARCH_PIPELINE_DRAFT_WORKERS = int(os.getenv("RESEARCH_PIPELINE_DRAFT_WORKERS", "4"))
+# New findings a search branch collects before a section is drafted from them
+RESEARCH_PIPELINE_SECTION_FINDINGS = int(os.getenv("RESEARCH_PIPELINE_SECTION_FINDINGS", "3"))
+DRAFT_SECTION_TOKEN_BUDGET = int(os.getenv("DRAFT_SECTION_TOKEN_BUDGET", "2000"))
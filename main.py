@@ -5,7 +5,14 @@ Main entry point for the AI Agent-based Deep Research System
 import os
 import logging
 from cli import run_cli
-from app import app  # Import the app for Gunicorn
+
+
+def __getattr__(name):
+    """Import the Flask app only when Gunicorn asks for ``main:app``, not for CLI runs (PEP 562)"""
+    if name == "app":
+        from app import app
+        return app
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 # Set up logging
 logging.basicConfig(
@@ -2,8 +2,10 @@
 Database models for the Deep Research AI Agent System
 """
 from datetime import datetime
-from sqlalchemy import Column, Integer, String, Text, DateTime, ForeignKey
+from typing import Iterable, Optional
+from sqlalchemy import Column, Integer, String, Text, DateTime, ForeignKey, event, insert
 from flask_sqlalchemy import SQLAlchemy
+from sqlalchemy.engine import Engine
 from sqlalchemy.orm import DeclarativeBase
 
 
@@ -19,6 +21,10 @@ class Research(db.Model):
     Model for storing research queries and their results
     """
     __tablename__ = 'researches'
+    __table_args__ = (
+        # Serves the newest-first keyset pagination of /history
+        db.Index('ix_researches_created_at_id', 'created_at', 'id'),
+    )
 
     id = db.Column(db.Integer, primary_key=True)
     query = db.Column(db.String(500), nullable=False)
@@ -39,7 +45,7 @@ class Finding(db.Model):
     __tablename__ = 'findings'
 
     id = db.Column(db.Integer, primary_key=True)
-    research_id = db.Column(db.Integer, db.ForeignKey('researches.id'), nullable=False)
+    research_id = db.Column(db.Integer, db.ForeignKey('researches.id'), nullable=False, index=True)
     title = db.Column(db.String(255))
     content = db.Column(db.Text, nullable=False)
     source_url = db.Column(db.String(1024))
@@ -59,12 +65,68 @@ class Draft(db.Model):
     __tablename__ = 'drafts'
 
     id = db.Column(db.Integer, primary_key=True)
-    research_id = db.Column(db.Integer, db.ForeignKey('researches.id'), nullable=False)
+    research_id = db.Column(db.Integer, db.ForeignKey('researches.id'), nullable=False, index=True)
     content = db.Column(db.Text, nullable=False)
-    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, index=True)
     
     # Relationships
     research = db.relationship('Research', back_populates='draft')
 
     def __repr__(self):
-        return f'<Draft {self.id} for Research {self.research_id}>'
\ No newline at end of file
+        return f'<Draft {self.id} for Research {self.research_id}>'
+
+
+@event.listens_for(Engine, "connect")
+def _set_sqlite_pragmas(dbapi_connection, connection_record):
+    """Run SQLite in WAL mode so several workers can read while one writes"""
+    if type(dbapi_connection).__module__ != "sqlite3":
+        return
+    cursor = dbapi_connection.cursor()
+    cursor.execute("PRAGMA journal_mode=WAL")
+    cursor.execute("PRAGMA synchronous=NORMAL")
+    cursor.execute("PRAGMA foreign_keys=ON")
+    cursor.close()
+
+
+def save_research_run(query: str, findings: Iterable, draft_content: str,
+                      created_at: Optional[datetime] = None) -> int:
+    """
+    Persist one research run in a single transaction
+
+    The research row is flushed to get its ID, then every finding is written
+    with one executemany INSERT instead of one ORM object per finding.
+
+    Args:
+        query: The research question
+        findings: Findings with title, content, source_url and source_title attributes
+        draft_content: The drafted answer
+        created_at: Creation time (defaults to now)
+
+    Returns:
+        The ID of the new research row
+    """
+    created_at = created_at or datetime.utcnow()
+    try:
+        research = Research(query=query[:500], created_at=created_at)
+        db.session.add(research)
+        db.session.flush()
+
+        rows = [
+            {
+                'research_id': research.id,
+                'title': (finding.title or 'Untitled')[:255],
+                'content': finding.content or '',
+                'source_url': (finding.source_url or '')[:1024],
+                'source_title': (finding.source_title or 'Unknown Source')[:255],
+            }
+            for finding in findings
+        ]
+        if rows:
+            db.session.execute(insert(Finding), rows)
+
+        db.session.add(Draft(research_id=research.id, content=draft_content, created_at=created_at))
+        db.session.commit()
+        return research.id
+    except Exception:
+        db.session.rollback()
+        raise
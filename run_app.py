@@ -3,7 +3,9 @@
 Flask server runner for the Deep Research AI Agent System
 """
 from app import app
+import config
 
 if __name__ == "__main__":
+    config.validate()
     print("Starting Flask server on port 5000...")
     app.run(debug=True, host="0.0.0.0", port=5000)
\ No newline at end of file
@@ -0,0 +1,122 @@
+import glob
+import os
+
+import pytest
+
+from utils import archive as archive_module
+from utils.archive import ResultArchive
+from utils.local_index import LocalIndex
+from utils.schema import Finding
+from utils.write_behind import flush_writes
+
+
+def _archive(tmp_path, codec="gzip"):
+    return ResultArchive(str(tmp_path / "archive"), str(tmp_path / "manifest.db"), codec=codec)
+
+
+def _findings(*contents):
+    return [Finding(title=f"t{i}", content=content, source_url=f"https://example.com/{i}")
+            for i, content in enumerate(contents)]
+
+
+def _object_files(tmp_path):
+    return glob.glob(str(tmp_path / "archive" / "objects" / "*" / "*" / "*"))
+
+
+def test_research_round_trip_and_dedup(tmp_path):
+    archive = _archive(tmp_path)
+    findings = _findings("alpha", "beta")
+    first = archive.save_research("q", "20260101_000000", findings)
+    second = archive.save_research("q", "20260101_000001", findings[:1])
+    flush_writes()
+
+    loaded = archive.load_research(first)
+    assert loaded["query"] == "q"
+    assert loaded["results"] == findings
+    assert archive.load_research(second)["results"] == findings[:1]
+
+    stats = archive.stats()
+    assert stats["entries"] == {"research": 2}
+    # Two findings and two documents; the shared finding is stored once
+    assert stats["objects"] == 4
+    assert len(_object_files(tmp_path)) == 4
+
+
+def test_entry_is_visible_to_others_only_once_its_objects_are_written(tmp_path, monkeypatch):
+    queued = []
+    monkeypatch.setattr(archive_module, "write_file",
+                        lambda path, data, on_written: queued.append((path, data, on_written)))
+    archive = _archive(tmp_path)
+    ref = archive.save_research("q", "20260101_000000", _findings("alpha"))
+
+    # A second handle on the same manifest, as another worker would have
+    other = _archive(tmp_path)
+    assert queued and other.research_since(0) == []
+    assert not _object_files(tmp_path)
+
+    for path, data, on_written in queued:
+        with open(path, "wb") as f:
+            f.write(data)
+        on_written()
+    assert [r for _, r in other.research_since(0)] == [ref]
+    assert other.load_research(ref)["results"] == _findings("alpha")
+
+
+def test_saving_process_reads_an_entry_before_it_is_written(tmp_path, monkeypatch):
+    queued = {}
+    monkeypatch.setattr(archive_module, "write_file", lambda path, data, on_written: queued.update({path: data}))
+    monkeypatch.setattr(archive_module, "read_file", lambda path: queued[path])
+    archive = _archive(tmp_path)
+    ref = archive.save_draft("q", "20260101_000000", b"# Draft", b"<h1>Draft</h1>")
+
+    assert archive.read(ref) == b"# Draft"
+    assert archive.read(ref + ".html") == b"<h1>Draft</h1>"
+    with pytest.raises(FileNotFoundError):
+        _archive(tmp_path).read(ref)
+
+
+def test_draft_and_html_are_readable(tmp_path):
+    archive = _archive(tmp_path)
+    ref = archive.save_draft("q", "20260101_000000", b"# Draft", b"<h1>Draft</h1>")
+    assert archive.read(ref) == b"# Draft"
+    flush_writes()
+    assert archive.read(ref) == b"# Draft"
+    assert archive.read(ref + ".html") == b"<h1>Draft</h1>"
+    with pytest.raises(ValueError):
+        archive.load_research(ref)
+
+
+def test_missing_object_is_rewritten_on_the_next_save(tmp_path):
+    archive = _archive(tmp_path)
+    findings = _findings("alpha")
+    ref = archive.save_research("q", "20260101_000000", findings)
+    flush_writes()
+    for path in _object_files(tmp_path):
+        os.remove(path)
+    with pytest.raises(OSError):
+        archive.load_research(ref)
+
+    # Saving the same run again names the same objects
+    archive.save_research("q", "20260101_000000", findings)
+    flush_writes()
+    assert archive.load_research(ref)["results"] == findings
+
+
+def test_local_index_retries_an_entry_that_failed_to_load(tmp_path):
+    archive = _archive(tmp_path)
+    findings = _findings("alpha")
+    archive.save_research("q", "20260101_000000", findings)
+    flush_writes()
+    saved = {path: open(path, "rb").read() for path in _object_files(tmp_path)}
+    for path in saved:
+        os.remove(path)
+
+    index = LocalIndex(str(tmp_path / "research"), archive=archive)
+    assert index.refresh() == 0
+    assert len(index) == 0
+
+    for path, data in saved.items():
+        with open(path, "wb") as f:
+            f.write(data)
+    assert index.refresh() == 1
+    assert index.refresh() == 0
@@ -0,0 +1,61 @@
+from agents.drafting_agent import assemble_sections
+from utils.schema import Finding
+
+FINDINGS = [
+    Finding(title="A", content="a", source_url="https://a.example", source_title="Source A"),
+    Finding(title="B", content="b", source_url="https://b.example", source_title="Source B"),
+]
+
+
+def test_citations_are_renumbered_across_sections():
+    draft = assemble_sections("Q", [
+        ("first", "Alpha [1] and beta [2].", {1: "https://a.example", 2: "https://b.example"}),
+        ("second", "Beta again [1].", {1: "https://b.example"}),
+    ], FINDINGS)
+    assert "## first\n\nAlpha [1] and beta [2]." in draft
+    assert "## second\n\nBeta again [2]." in draft
+    assert "- [1] Source A - https://a.example\n- [2] Source B - https://b.example" in draft
+
+
+def test_unknown_bracketed_numbers_are_kept():
+    draft = assemble_sections("Q", [("focus", "In [2023] it grew [1].", {1: "https://a.example"})], FINDINGS)
+    assert "In [2023] it grew [1]." in draft
+
+
+def test_code_is_left_untouched():
+    text = (
+        "Index with `a[1]` first [1].\n\n"
+        "```python\n"
+        "# comment\n"
+        "x = a[1]\n"
+        "```\n"
+    )
+    draft = assemble_sections("Q", [("focus", text, {1: "https://b.example"})], FINDINGS)
+    assert "`a[1]` first [1]." in draft
+    assert "```python\n# comment\nx = a[1]\n```" in draft
+    # A comment in a code block isn't a top-level header, so the section still gets one
+    assert "## focus\n\nIndex with" in draft
+
+
+def test_top_level_headers_outside_code_are_demoted():
+    text = "# Overview\n\nText [1].\n\n```\n# kept\n```\n\n## Detail"
+    draft = assemble_sections("Q", [("focus", text, {1: "https://a.example"})], FINDINGS)
+    assert draft.startswith("# Q\n\n## Overview\n\nText [1].")
+    assert "```\n# kept\n```" in draft
+    assert "### Detail" in draft
+
+
+def test_consecutive_sections_with_one_focus_share_a_header():
+    draft = assemble_sections("Q", [
+        ("focus", "Part one [1].", {1: "https://a.example"}),
+        ("focus", "Part two [1].", {1: "https://b.example"}),
+    ], FINDINGS)
+    assert draft.count("## focus") == 1
+    assert "Part one [1].\n\nPart two [2]." in draft
+
+
+def test_title_can_be_left_to_the_caller():
+    draft = assemble_sections("Q", [("focus", "# Overview\n\nText [1].", {1: "https://a.example"})],
+                              FINDINGS, title=False)
+    assert draft.startswith("## Overview\n\nText [1].")
+    assert "# Q" not in draft
@@ -0,0 +1,41 @@
+from utils.context_packer import pack_findings
+from utils.schema import Finding
+from utils.text_utils import estimate_tokens
+
+
+def _finding(i, content, **kwargs):
+    return Finding(title=f"Finding {i}", content=content, source_url=f"https://example.org/{i}",
+                   source_title=f"Source {i}", **kwargs)
+
+
+def test_near_duplicates_are_dropped():
+    text = "solar panels convert sunlight into electricity using photovoltaic cells"
+    packed = pack_findings("solar", [_finding(1, text), _finding(2, text)], token_budget=1000)
+    assert packed["kept"] == 1
+    assert packed["dropped_duplicates"] == 1
+
+
+def test_findings_without_content_are_not_duplicates():
+    packed = pack_findings("query", [_finding(i, "") for i in range(4)], token_budget=1000)
+    assert packed["kept"] == 4
+    assert packed["dropped_duplicates"] == 0
+    assert len(packed["citations"]) == 4
+
+
+def test_oversized_top_finding_is_truncated_not_dropped():
+    findings = [_finding(1, "solar " * 5000), _finding(2, "wind " * 5000)]
+    packed = pack_findings("solar", findings, token_budget=200)
+    assert packed["kept"] == 1
+    assert packed["truncated"] == 1
+    assert packed["dropped_budget"] == 1
+    assert "Finding 1 [1]: solar solar" in packed["text"]
+    entries = packed["text"].split("\nSources")[0]
+    assert estimate_tokens(entries) <= 200
+
+
+def test_citations_map_urls_to_ids():
+    findings = [_finding(1, "first fact about a topic"), _finding(2, "second unrelated observation here")]
+    packed = pack_findings("topic", findings, token_budget=1000)
+    assert sorted(packed["citations"].values()) == [1, 2]
+    for url, citation in packed["citations"].items():
+        assert f"[{citation}] " in packed["text"] and url in packed["text"]
@@ -0,0 +1,76 @@
+import json
+
+from utils.json_stream import JSONArrayStreamParser
+
+ITEMS = [
+    {"title": "One", "content": "quote \" and backslash \\ and } brace"},
+    {"title": "Two", "content": "unicode é and [brackets]"},
+]
+
+
+def _feed(text, size, key="findings"):
+    """Feed text in chunks of ``size`` characters, returning the parser and every emitted item"""
+    parser = JSONArrayStreamParser(key)
+    items = []
+    for start in range(0, len(text), size):
+        items.extend(parser.feed(text[start:start + size]))
+    return parser, items
+
+
+def test_items_survive_any_chunk_split():
+    text = json.dumps({"findings": ITEMS})
+    for size in range(1, 12):
+        parser, items = _feed(text, size)
+        assert items == ITEMS, size
+        assert parser.close() == {"items": 2, "malformed": 0, "found": True,
+                                  "truncated": False, "partial_item": False}
+
+
+def test_escape_split_from_its_character():
+    text = json.dumps({"findings": ITEMS})
+    split = text.index("\\\"") + 1
+    parser = JSONArrayStreamParser()
+    items = parser.feed(text[:split]) + parser.feed(text[split:])
+    assert items == ITEMS
+
+
+def test_preamble_and_fences_are_skipped():
+    text = "Here are [1] the findings:\n```json\n" + json.dumps({"note": "x", "findings": ITEMS}) + "\n```"
+    parser, items = _feed(text, 7)
+    assert items == ITEMS
+    assert parser.complete
+
+
+def test_top_level_array():
+    parser, items = _feed(json.dumps(ITEMS), 5)
+    assert items == ITEMS
+    assert parser.close()["found"]
+
+
+def test_truncated_response_keeps_closed_items():
+    text = json.dumps({"findings": ITEMS})
+    cut = text.index('{"title": "Two"') + 10
+    parser, items = _feed(text[:cut], 4)
+    assert items == ITEMS[:1]
+    report = parser.close()
+    assert report["truncated"] and report["partial_item"]
+
+
+def test_malformed_items_are_skipped_and_counted():
+    text = '{"findings": [{"title": "ok"}, {"title": oops}, {"title": "also ok"}]}'
+    parser, items = _feed(text, 3)
+    assert items == [{"title": "ok"}, {"title": "also ok"}]
+    assert parser.close()["malformed"] == 1
+
+
+def test_missing_array_is_reported():
+    parser, items = _feed('{"answer": "no findings here"}', 4)
+    assert items == []
+    assert parser.close()["found"] is False
+
+
+def test_empty_findings_array_is_a_complete_answer():
+    parser, items = _feed('{"findings": []}', 3)
+    assert items == []
+    assert parser.complete
+    assert parser.close()["found"]
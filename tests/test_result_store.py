@@ -0,0 +1,37 @@
+import time
+
+from utils.result_store import ResultStore
+from utils.schema import Finding
+
+
+def _store(tmp_path, **kwargs):
+    return ResultStore(str(tmp_path / "results.db"), memory_entries=8, prune_interval=0, **kwargs)
+
+
+def test_saved_result_round_trips(tmp_path):
+    store = _store(tmp_path)
+    findings = [Finding(title="t", content="c", source_url="https://a.example")]
+    result_id = store.save("q", findings, "draft")
+    other = _store(tmp_path)
+    record = other.get(result_id)
+    assert record["query"] == "q"
+    assert record["findings"] == findings
+    assert record["draft"] == "draft"
+
+
+def test_rows_beyond_the_cap_are_pruned_oldest_first(tmp_path):
+    store = _store(tmp_path, max_rows=2)
+    ids = []
+    for i in range(4):
+        ids.append(store.save(f"q{i}", [], "draft"))
+        time.sleep(0.01)
+    assert [store.get(result_id) is not None for result_id in ids] == [False, False, True, True]
+
+
+def test_expired_rows_are_pruned(tmp_path):
+    store = _store(tmp_path, retention_seconds=0.05)
+    old = store.save("old", [], "draft")
+    time.sleep(0.1)
+    new = store.save("new", [], "draft")
+    assert store.get(old) is None
+    assert store.get(new) is not None
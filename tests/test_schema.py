@@ -0,0 +1,13 @@
+from utils.schema import Finding, SearchResult
+
+
+def test_non_numeric_scores_fall_back_to_zero():
+    assert Finding.from_dict({"content": "c", "score": "high"}).score == 0.0
+    assert Finding.from_dict({"content": "c", "score": [1]}).score == 0.0
+    assert SearchResult.from_dict({"url": "u", "score": "n/a"}).score == 0.0
+
+
+def test_numeric_scores_are_kept():
+    assert Finding.from_dict({"content": "c", "score": "0.75"}).score == 0.75
+    assert SearchResult.from_dict({"url": "u", "score": 0.5}).score == 0.5
+    assert SearchResult.from_dict({"url": "u", "score": None}).score == 0.0
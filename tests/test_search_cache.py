@@ -0,0 +1,64 @@
+import time
+
+from utils.search_cache import SearchCache, make_cache_key
+
+
+def _cache(tmp_path, max_entries=10, flush_seconds=60.0):
+    return SearchCache(str(tmp_path / "search_cache.db"), ttl_seconds=60, max_entries=max_entries,
+                       flush_seconds=flush_seconds)
+
+
+def test_key_ignores_query_case_and_spacing():
+    assert make_cache_key("What  is X", depth="basic") == make_cache_key("what is x", depth="basic")
+    assert make_cache_key("what is x", depth="basic") != make_cache_key("what is x", depth="advanced")
+
+
+def test_expired_entries_miss(tmp_path):
+    cache = _cache(tmp_path)
+    cache.set("fresh", "q", "value")
+    cache.set("stale", "q", "old", ttl_seconds=0.05)
+    time.sleep(0.1)
+
+    assert cache.get("fresh") == "value"
+    assert cache.get("stale") is None
+    stats = cache.stats()
+    assert (stats["hits"], stats["misses"], stats["expired"]) == (1, 1, 1)
+
+    # The next write evicts the expired entry
+    cache.set("other", "q", "value")
+    assert cache.stats()["entries"] == 2
+
+
+def test_least_recently_used_entry_is_evicted(tmp_path):
+    cache = _cache(tmp_path, max_entries=2)
+    cache.set("a", "q", "1")
+    time.sleep(0.01)
+    cache.set("b", "q", "2")
+    time.sleep(0.01)
+    # A buffered hit still counts as recent use when the next write evicts
+    assert cache.get("a") == "1"
+    cache.set("c", "q", "3")
+
+    assert cache.get("b") is None
+    assert cache.get("a") == "1"
+    assert cache.get("c") == "3"
+    assert cache.stats()["evictions"] == 1
+
+
+def test_lookups_do_not_write_until_flushed(tmp_path):
+    cache = _cache(tmp_path)
+    cache.set("a", "q", "1")
+    reader = _cache(tmp_path)
+    for _ in range(5):
+        assert cache.get("a") == "1"
+    # Another handle on the same database sees nothing until the flush
+    assert reader.stats()["hits"] == 0
+    cache.flush()
+    assert reader.stats()["hits"] == 5
+
+
+def test_counters_flush_once_the_interval_is_up(tmp_path):
+    cache = _cache(tmp_path, flush_seconds=0.0)
+    cache.set("a", "q", "1")
+    cache.get("a")
+    assert _cache(tmp_path).stats()["hits"] == 1
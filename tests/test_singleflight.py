@@ -0,0 +1,90 @@
+import threading
+import time
+
+from utils.singleflight import SingleFlight
+
+
+def _run_with_followers(group, fn, followers=3):
+    """Start a leader call, wait until ``followers`` callers join it, then release it"""
+    release = threading.Event()
+    results = {}
+    errors = {}
+
+    def leader_fn():
+        release.wait(5)
+        return fn()
+
+    def call(name):
+        try:
+            results[name] = group.do("key", leader_fn)
+        except Exception as e:
+            errors[name] = e
+
+    threads = [threading.Thread(target=call, args=("leader",))]
+    threads[0].start()
+    while group.stats()["in_flight"] == 0:
+        time.sleep(0.001)
+    for i in range(followers):
+        threads.append(threading.Thread(target=call, args=(f"follower{i}",)))
+        threads[-1].start()
+    while group.stats()["deduplicated"] < followers:
+        time.sleep(0.001)
+    release.set()
+    for thread in threads:
+        thread.join(5)
+    return results, errors
+
+
+def test_followers_share_one_execution():
+    group = SingleFlight("test")
+    calls = []
+
+    def fn():
+        calls.append(1)
+        return {"findings": [1, 2]}
+
+    results, errors = _run_with_followers(group, fn)
+    assert not errors
+    assert len(calls) == 1
+    assert all(result == {"findings": [1, 2]} for result in results.values())
+    assert group.stats() == {"executed": 1, "deduplicated": 3, "in_flight": 0}
+
+
+def test_leader_and_followers_get_independent_copies():
+    group = SingleFlight("test")
+    results, _ = _run_with_followers(group, lambda: {"findings": [1, 2]})
+
+    results["leader"]["findings"].append("leader only")
+    results["follower0"]["findings"].append("follower only")
+
+    assert results["follower1"] == {"findings": [1, 2]}
+    assert results["follower2"] == {"findings": [1, 2]}
+    assert len({id(result) for result in results.values()}) == len(results)
+
+
+def test_followers_receive_the_leaders_error():
+    group = SingleFlight("test")
+
+    def fn():
+        raise ValueError("upstream failed")
+
+    results, errors = _run_with_followers(group, fn, followers=2)
+    assert not results
+    assert set(errors) == {"leader", "follower0", "follower1"}
+    assert all(isinstance(error, ValueError) for error in errors.values())
+
+
+def test_calls_after_completion_run_again():
+    group = SingleFlight("test")
+    calls = []
+    group.do("key", lambda: calls.append(1))
+    group.do("key", lambda: calls.append(1))
+    assert len(calls) == 2
+
+
+def test_disabled_coalescing_calls_through(monkeypatch):
+    import config
+    monkeypatch.setattr(config, "REQUEST_COALESCING_ENABLED", False)
+    group = SingleFlight("test")
+    assert group.do("key", lambda: 42) == 42
+    assert group.stats()["executed"] == 0
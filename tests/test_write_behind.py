@@ -0,0 +1,62 @@
+import os
+import time
+
+from utils.write_behind import WriteBehindQueue
+
+
+def _wait_for(condition, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "timed out"
+        time.sleep(0.01)
+
+
+def test_files_are_written_and_readable_while_pending(tmp_path):
+    queue = WriteBehindQueue(max_batch=4, max_queue=100)
+    path = str(tmp_path / "a.md")
+    queue.submit(path, b"draft")
+    assert queue.pending(path) in (b"draft", None)
+    queue.flush()
+    assert open(path, "rb").read() == b"draft"
+    assert queue.pending(path) is None
+    assert queue.stats()["written"] == 1
+
+
+def test_failed_write_is_kept_and_retried(tmp_path):
+    queue = WriteBehindQueue(max_batch=4, max_queue=100, retry_interval=0.05)
+    path = str(tmp_path / "missing" / "a.md")
+    queue.submit(path, b"draft")
+    queue.flush()
+    assert queue.pending(path) == b"draft"
+    assert queue.stats()["awaiting_retry"] == 1
+
+    os.makedirs(os.path.dirname(path))
+    _wait_for(lambda: queue.stats()["awaiting_retry"] == 0)
+    assert open(path, "rb").read() == b"draft"
+    assert queue.pending(path) is None
+    assert queue.stats()["retried"] == 1
+
+
+def test_newer_submit_supersedes_a_failed_write(tmp_path):
+    queue = WriteBehindQueue(max_batch=4, max_queue=100, retry_interval=60)
+    path = str(tmp_path / "missing" / "a.md")
+    queue.submit(path, b"old")
+    queue.flush()
+    os.makedirs(os.path.dirname(path))
+    queue.submit(path, b"new")
+    queue.flush()
+    assert open(path, "rb").read() == b"new"
+    assert queue.stats()["awaiting_retry"] == 0
+
+
+def test_on_written_runs_once_the_file_is_on_disk(tmp_path):
+    queue = WriteBehindQueue(max_batch=4, max_queue=100, retry_interval=0.05)
+    path = str(tmp_path / "missing" / "a.md")
+    seen = []
+    queue.submit(path, b"draft", lambda: seen.append(open(path, "rb").read()))
+    queue.flush()
+    assert seen == []
+
+    os.makedirs(os.path.dirname(path))
+    _wait_for(lambda: seen)
+    assert seen == [b"draft"]
@@ -0,0 +1,399 @@
+"""
+Content-addressed, compressed archive of research results and drafts
+"""
+import gzip
+import hashlib
+import logging
+import os
+import threading
+import time
+import uuid
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import config
+from utils import schema
+from utils.schema import Finding
+from utils.sqlite_utils import SQLiteConnectionFactory
+from utils.write_behind import read_file, write_file
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+logger = logging.getLogger(__name__)
+
+ARCHIVE_PREFIX = "archive://"
+_HTML_SUFFIX = ".html"
+_EXTENSIONS = {"zstd": ".zst", "gzip": ".gz"}
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS blobs (
+    hash TEXT PRIMARY KEY,
+    codec TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    stored_size INTEGER NOT NULL,
+    refs INTEGER NOT NULL DEFAULT 0
+);
+CREATE TABLE IF NOT EXISTS entries (
+    id TEXT PRIMARY KEY,
+    kind TEXT NOT NULL,
+    query TEXT NOT NULL,
+    timestamp TEXT NOT NULL,
+    created_at REAL NOT NULL,
+    object_hash TEXT NOT NULL,
+    html_hash TEXT,
+    item_count INTEGER NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS idx_entries_query ON entries (query, created_at);
+CREATE INDEX IF NOT EXISTS idx_entries_kind_created_at ON entries (kind, created_at);
+"""
+
+
+def is_archive_ref(path: Optional[str]) -> bool:
+    """Check whether a saved-file path is an archive reference"""
+    return bool(path) and path.startswith(ARCHIVE_PREFIX)
+
+
+def _parse_ref(ref: str) -> Tuple[str, bool]:
+    """Split an archive reference into its entry ID and whether it names the rendered HTML"""
+    entry_id = ref[len(ARCHIVE_PREFIX):]
+    if entry_id.endswith(_HTML_SUFFIX):
+        return entry_id[:-len(_HTML_SUFFIX)], True
+    return entry_id, False
+
+
+class ResultArchive:
+    """
+    Stores saved runs as compressed, content-addressed objects.
+
+    Every object is named by the SHA-256 of its uncompressed bytes and
+    lives under ``objects/<2 hex>/<2 hex>/``, so no directory grows large.
+    Research results are split into one object per finding plus a small
+    document listing the finding hashes, so a finding seen in several runs
+    is stored once. A SQLite manifest maps entry IDs and queries to their
+    objects, so lookups never list directories.
+
+    Object files go through the write-behind queue, and an entry's manifest
+    row is committed only once its files are on disk; until then the entry
+    is readable from the process that saved it but invisible to others.
+
+    Saved entries are referred to as ``archive://<entry id>``; a draft's
+    pre-rendered HTML is ``archive://<entry id>.html``.
+    """
+
+    def __init__(self, directory: str, manifest_path: str, codec: str = "zstd", level: int = 3):
+        if codec == "zstd" and zstandard is None:
+            logger.warning("zstandard is not installed; archiving with gzip instead")
+            codec = "gzip"
+        if codec not in _EXTENSIONS:
+            raise ValueError(f"Unknown archive codec: {codec}")
+        self.directory = directory
+        self.codec = codec
+        self.level = level
+        self._connections = SQLiteConnectionFactory(manifest_path)
+        self._connections.connect().executescript(_SCHEMA)
+        self._shards: set = set()
+        self._shards_lock = threading.Lock()
+        # Entries (and their new objects) whose files are still on the write-behind queue
+        self._pending_entries: Dict[str, Tuple[str, str, Optional[str]]] = {}
+        self._pending_blobs: Dict[str, str] = {}
+        self._pending_lock = threading.Lock()
+
+    def _object_path(self, digest: str, codec: str) -> str:
+        return os.path.join(self.directory, "objects", digest[:2], digest[2:4], digest + _EXTENSIONS[codec])
+
+    def _compress(self, data: bytes, codec: str) -> bytes:
+        if codec == "zstd":
+            if zstandard is None:
+                raise RuntimeError("Archive object is zstd-compressed but zstandard is not installed")
+            return zstandard.ZstdCompressor(level=self.level).compress(data)
+        return gzip.compress(data, compresslevel=self.level)
+
+    @staticmethod
+    def _decompress(data: bytes, codec: str) -> bytes:
+        if codec == "zstd":
+            if zstandard is None:
+                raise RuntimeError("Archive object is zstd-compressed but zstandard is not installed")
+            return zstandard.ZstdDecompressor().decompress(data)
+        return gzip.decompress(data)
+
+    def _prepare_objects(self, objects: List[bytes]) -> Tuple[Dict[str, Tuple[str, int, int]], List[Tuple[str, bytes]]]:
+        """
+        Compress the objects an entry needs that aren't on disk yet
+
+        An object the manifest already lists is only rewritten if its file
+        is missing (lost in a crash, say).
+
+        Returns:
+            Tuple of (object hash to (codec, size, stored size), files to write)
+        """
+        conn = self._connections.connect()
+        stored = {}
+        writes = []
+        for data in objects:
+            digest = hashlib.sha256(data).hexdigest()
+            if digest in stored:
+                continue
+            row = conn.execute("SELECT codec, stored_size FROM blobs WHERE hash = ?", (digest,)).fetchone()
+            codec = row[0] if row is not None else self.codec
+            path = self._object_path(digest, codec)
+            if row is not None and os.path.exists(path):
+                stored[digest] = (codec, len(data), row[1])
+                continue
+            compressed = self._compress(data, codec)
+            self._make_shard(path)
+            writes.append((path, compressed))
+            stored[digest] = (codec, len(data), len(compressed))
+        return stored, writes
+
+    def _make_shard(self, path: str) -> None:
+        """Create an object's shard directory, once per process"""
+        shard = os.path.dirname(path)
+        with self._shards_lock:
+            if shard not in self._shards:
+                os.makedirs(shard, exist_ok=True)
+                self._shards.add(shard)
+
+    def _get(self, digest: str) -> bytes:
+        """Read and verify an object, including one still waiting to be written"""
+        row = self._connections.connect().execute(
+            "SELECT codec FROM blobs WHERE hash = ?", (digest,)
+        ).fetchone()
+        if row is not None:
+            codec = row[0]
+        else:
+            with self._pending_lock:
+                codec = self._pending_blobs.get(digest)
+            if codec is None:
+                raise FileNotFoundError(f"Archive object {digest} is not in the manifest")
+        data = self._decompress(read_file(self._object_path(digest, codec)), codec)
+        if hashlib.sha256(data).hexdigest() != digest:
+            raise RuntimeError(f"Archive object {digest} is corrupt")
+        return data
+
+    def _add_entry(self, kind: str, query: str, timestamp: str, objects: List[bytes],
+                   build_document: Callable[[List[str]], bytes], html: Optional[bytes] = None) -> str:
+        """
+        Queue an entry's objects on the write-behind queue and commit its manifest row once they are on disk
+
+        Until then the entry is readable from this process only, so other
+        processes never see an entry whose files are missing.
+        """
+        entry_id = uuid.uuid4().hex
+        hashes = [hashlib.sha256(data).hexdigest() for data in objects]
+        document = build_document(hashes)
+        stored, writes = self._prepare_objects(objects + [document] + ([html] if html is not None else []))
+        object_hash = hashlib.sha256(document).hexdigest()
+        html_hash = hashlib.sha256(html).hexdigest() if html is not None else None
+        references = hashes + [object_hash] + ([html_hash] if html_hash is not None else [])
+        row = (entry_id, kind, query, timestamp, time.time(), object_hash, html_hash, len(objects))
+
+        with self._pending_lock:
+            self._pending_entries[entry_id] = (kind, object_hash, html_hash)
+            for digest, (codec, _, _) in stored.items():
+                self._pending_blobs.setdefault(digest, codec)
+
+        def commit() -> None:
+            self._commit_entry(row, [(digest, *stored[digest]) for digest in references])
+
+        if not writes:
+            commit()
+            return ARCHIVE_PREFIX + entry_id
+        remaining = [len(writes)]
+        remaining_lock = threading.Lock()
+
+        def written() -> None:
+            with remaining_lock:
+                remaining[0] -= 1
+                done = remaining[0] == 0
+            if done:
+                commit()
+
+        for path, data in writes:
+            write_file(path, data, written)
+        return ARCHIVE_PREFIX + entry_id
+
+    def _commit_entry(self, row: Tuple, blobs: List[Tuple[str, str, int, int]]) -> None:
+        """Count an entry's object references and insert its manifest row in one transaction"""
+        conn = self._connections.connect()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            for digest, codec, size, stored_size in blobs:
+                conn.execute(
+                    "INSERT INTO blobs (hash, codec, size, stored_size, refs) VALUES (?, ?, ?, ?, 1) "
+                    "ON CONFLICT (hash) DO UPDATE SET refs = refs + 1",
+                    (digest, codec, size, stored_size),
+                )
+            conn.execute(
+                "INSERT INTO entries (id, kind, query, timestamp, created_at, object_hash, html_hash, item_count) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                row,
+            )
+            conn.execute("COMMIT")
+        except BaseException as e:
+            conn.execute("ROLLBACK")
+            logger.error(f"Could not add archive entry {row[0]} to the manifest: {str(e)}")
+            raise
+        with self._pending_lock:
+            self._pending_entries.pop(row[0], None)
+            for digest, *_ in blobs:
+                self._pending_blobs.pop(digest, None)
+
+    def save_research(self, query: str, timestamp: str, findings: List[Finding]) -> str:
+        """
+        Archive a run's findings, storing each distinct finding once
+
+        Returns:
+            The entry's archive reference
+        """
+        return self._add_entry(
+            "research", query, timestamp,
+            [schema.dumps(finding) for finding in findings],
+            lambda hashes: schema.dumps({"query": query, "timestamp": timestamp, "findings": hashes}),
+        )
+
+    def save_draft(self, query: str, timestamp: str, document: bytes, html: bytes) -> str:
+        """
+        Archive a draft file and its pre-rendered HTML
+
+        Returns:
+            The entry's archive reference
+        """
+        return self._add_entry("draft", query, timestamp, [], lambda hashes: document, html)
+
+    def _entry(self, entry_id: str) -> Tuple[str, str, Optional[str]]:
+        with self._pending_lock:
+            pending = self._pending_entries.get(entry_id)
+        if pending is not None:
+            return pending
+        row = self._connections.connect().execute(
+            "SELECT kind, object_hash, html_hash FROM entries WHERE id = ?", (entry_id,)
+        ).fetchone()
+        if row is None:
+            raise FileNotFoundError(f"No archive entry {entry_id}")
+        return row
+
+    def read(self, ref: str) -> bytes:
+        """
+        Read the document an archive reference names (a draft file or its HTML)
+
+        Raises:
+            FileNotFoundError: If the entry or its HTML doesn't exist
+        """
+        entry_id, html = _parse_ref(ref)
+        _, object_hash, html_hash = self._entry(entry_id)
+        if html:
+            if html_hash is None:
+                raise FileNotFoundError(f"Archive entry {entry_id} has no rendered HTML")
+            return self._get(html_hash)
+        return self._get(object_hash)
+
+    def load_research(self, ref: str) -> Dict[str, Any]:
+        """
+        Load archived research results
+
+        Returns:
+            Dictionary with 'query', 'timestamp' and 'results' as Finding records
+        """
+        entry_id, _ = _parse_ref(ref)
+        kind, object_hash, _ = self._entry(entry_id)
+        if kind != "research":
+            raise ValueError(f"Archive entry {entry_id} is a {kind}, not research results")
+        document = schema.loads(self._get(object_hash))
+        results = [Finding.from_dict(schema.loads(self._get(digest))) for digest in document["findings"]]
+        return {"query": document["query"], "timestamp": document["timestamp"], "results": results}
+
+    def entries(self, query: Optional[str] = None, kind: Optional[str] = None, limit: int = 50) -> List[Dict[str, Any]]:
+        """
+        List archived entries, newest first, optionally for one query or kind
+
+        Returns:
+            Manifest rows with 'ref', 'kind', 'query', 'timestamp', 'created_at' and 'item_count'
+        """
+        clauses, params = [], []
+        if query is not None:
+            clauses.append("query = ?")
+            params.append(query)
+        if kind is not None:
+            clauses.append("kind = ?")
+            params.append(kind)
+        where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+        rows = self._connections.connect().execute(
+            f"SELECT id, kind, query, timestamp, created_at, item_count FROM entries {where} "
+            "ORDER BY created_at DESC LIMIT ?",
+            (*params, limit),
+        ).fetchall()
+        return [
+            {"ref": ARCHIVE_PREFIX + row[0], "kind": row[1], "query": row[2],
+             "timestamp": row[3], "created_at": row[4], "item_count": row[5]}
+            for row in rows
+        ]
+
+    def research_since(self, after_rowid: int) -> List[Tuple[int, str]]:
+        """
+        List research entries added after a manifest row, oldest first
+
+        Returns:
+            (rowid, archive reference) pairs
+        """
+        rows = self._connections.connect().execute(
+            "SELECT rowid, id FROM entries WHERE kind = 'research' AND rowid > ? ORDER BY rowid",
+            (after_rowid,),
+        ).fetchall()
+        return [(rowid, ARCHIVE_PREFIX + entry_id) for rowid, entry_id in rows]
+
+    def stats(self) -> Dict[str, Any]:
+        """Report entry counts, stored and logical bytes, and dedup and compression ratios"""
+        conn = self._connections.connect()
+        entries = dict(conn.execute("SELECT kind, COUNT(*) FROM entries GROUP BY kind").fetchall())
+        objects, size, stored, logical = conn.execute(
+            "SELECT COUNT(*), COALESCE(SUM(size), 0), COALESCE(SUM(stored_size), 0), "
+            "COALESCE(SUM(size * refs), 0) FROM blobs"
+        ).fetchone()
+        return {
+            "codec": self.codec,
+            "entries": entries,
+            "objects": objects,
+            "logical_bytes": logical,
+            "unique_bytes": size,
+            "stored_bytes": stored,
+            "dedup_ratio": round(logical / size, 3) if size else 0.0,
+            "compression_ratio": round(size / stored, 3) if stored else 0.0,
+        }
+
+
+_archive: Optional[ResultArchive] = None
+_archive_lock = threading.Lock()
+
+
+def open_archive() -> ResultArchive:
+    """
+    Return the process-wide results archive, whether or not new results are archived
+
+    Returns:
+        The shared ResultArchive
+    """
+    global _archive
+    if _archive is None:
+        with _archive_lock:
+            if _archive is None:
+                _archive = ResultArchive(
+                    config.RESULTS_ARCHIVE_DIR,
+                    config.RESULTS_ARCHIVE_MANIFEST,
+                    codec=config.RESULTS_ARCHIVE_CODEC,
+                    level=config.RESULTS_ARCHIVE_LEVEL,
+                )
+    return _archive
+
+
+def get_archive() -> Optional[ResultArchive]:
+    """
+    Return the archive new results should be saved to
+
+    Returns:
+        The shared ResultArchive, or None if archiving is disabled
+    """
+    if not config.RESULTS_ARCHIVE_ENABLED:
+        return None
+    return open_archive()
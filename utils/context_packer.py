@@ -0,0 +1,191 @@
+"""
+Token-budgeted packing of research findings into the drafting prompt
+"""
+import hashlib
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+from utils.embeddings import tokenize
+from utils.schema import Finding
+from utils.text_utils import estimate_tokens
+
+_MERSENNE_PRIME = (1 << 61) - 1
+_MAX_HASH = (1 << 32) - 1
+
+
+def shingles(text: str, size: int = 3) -> set:
+    """
+    Build word shingles for near-duplicate detection
+
+    Args:
+        text: Text to shingle
+        size: Number of words per shingle
+
+    Returns:
+        Set of shingle strings (the whole text if it is shorter than ``size``)
+    """
+    tokens = tokenize(text, drop_stopwords=False)
+    if len(tokens) < size:
+        return {" ".join(tokens)} if tokens else set()
+    return {" ".join(tokens[i:i + size]) for i in range(len(tokens) - size + 1)}
+
+
+class MinHasher:
+    """
+    Computes MinHash signatures whose agreement estimates Jaccard similarity
+    """
+
+    def __init__(self, num_perm: int = 64, seed: int = 1):
+        rng = np.random.default_rng(seed)
+        self.num_perm = num_perm
+        self._a = rng.integers(1, _MERSENNE_PRIME, size=num_perm, dtype=np.uint64)
+        self._b = rng.integers(0, _MERSENNE_PRIME, size=num_perm, dtype=np.uint64)
+
+    def signature(self, items: set) -> np.ndarray:
+        """
+        Compute the signature of a set of shingles
+
+        Returns:
+            Array of ``num_perm`` minimum hash values
+        """
+        if not items:
+            return np.full(self.num_perm, _MAX_HASH, dtype=np.uint64)
+        hashes = np.array(
+            [int.from_bytes(hashlib.blake2b(item.encode("utf-8"), digest_size=4).digest(), "little")
+             for item in items],
+            dtype=np.uint64,
+        )
+        permuted = (np.outer(hashes, self._a) + self._b) % _MERSENNE_PRIME & _MAX_HASH
+        return permuted.min(axis=0)
+
+    @staticmethod
+    def similarity(first: np.ndarray, second: np.ndarray) -> float:
+        """Estimate the Jaccard similarity of two signatures"""
+        return float(np.mean(first == second))
+
+
+def _relevance(query_tokens: set, finding: Finding, position: int) -> float:
+    """Score a finding by search score, query-term overlap and original rank"""
+    text = f"{finding.title} {finding.content}"
+    tokens = set(tokenize(text))
+    overlap = len(query_tokens & tokens) / len(query_tokens) if query_tokens else 0.0
+    return overlap + finding.score - position * 0.01
+
+
+def _format_unpacked(findings: List[Finding]) -> str:
+    """Format findings the way they were sent before packing, for comparison"""
+    text = ""
+    for i, finding in enumerate(findings, 1):
+        text += f"Finding {i}:\n"
+        text += f"Title: {finding.title}\n"
+        text += f"Content: {finding.content}\n"
+        text += f"Source URL: {finding.source_url}\n"
+        text += f"Source Title: {finding.source_title}\n\n"
+    return text
+
+
+def pack_findings(query: str, findings: List[Finding], token_budget: int,
+                  dedup_threshold: float = 0.8, hasher: Optional[MinHasher] = None) -> Dict[str, Any]:
+    """
+    Pack findings into a compact, budgeted prompt section
+
+    Near-duplicate findings (MinHash Jaccard estimate of their content at or
+    above ``dedup_threshold``) are dropped; findings without content are never
+    treated as duplicates. The rest are ranked by relevance to the query and
+    added until ``token_budget`` is reached, except that the top-ranked
+    finding is truncated to fit rather than dropped, so the prompt always has
+    some context. Each source URL is listed once and referenced by a short
+    citation ID such as ``[2]``.
+
+    Args:
+        query: The research question
+        findings: Research findings
+        token_budget: Maximum estimated tokens for the packed text
+        dedup_threshold: Similarity at which two findings count as duplicates
+        hasher: Optional MinHasher to reuse
+
+    Returns:
+        Dictionary with 'text', 'tokens_before', 'tokens_after', 'kept',
+        'dropped_duplicates', 'dropped_budget', 'truncated' and 'citations'
+        (source URL to citation ID)
+    """
+    hasher = hasher or MinHasher()
+    tokens_before = estimate_tokens(_format_unpacked(findings))
+
+    # Drop near-duplicates, keeping the first (highest-ranked upstream) copy
+    unique = []
+    signatures = []
+    for finding in findings:
+        items = shingles(finding.content)
+        if not items:
+            # Nothing to compare; an empty signature would match every other empty one
+            unique.append(finding)
+            continue
+        signature = hasher.signature(items)
+        if any(hasher.similarity(signature, kept) >= dedup_threshold for kept in signatures):
+            continue
+        signatures.append(signature)
+        unique.append(finding)
+    dropped_duplicates = len(findings) - len(unique)
+
+    # Rank by relevance and fill the budget
+    query_tokens = set(tokenize(query))
+    ranked = sorted(
+        enumerate(unique),
+        key=lambda item: _relevance(query_tokens, item[1], item[0]),
+        reverse=True,
+    )
+
+    citations: Dict[str, int] = {}
+    sources: List[str] = []
+    entries: List[str] = []
+    used = 0
+    dropped_budget = 0
+    truncated = 0
+    for _, finding in ranked:
+        url = finding.source_url
+        citation = citations.get(url) if url else None
+        source_line = ""
+        if url and citation is None:
+            citation = len(citations) + 1
+            source_line = f"[{citation}] {finding.source_title} - {url}\n"
+
+        cite = f" [{citation}]" if citation else ""
+        entry = f"- {finding.title}{cite}: {finding.content}\n"
+        cost = estimate_tokens(entry) + estimate_tokens(source_line)
+        if used + cost > token_budget and not entries:
+            # The top-ranked finding alone overflows the budget: keep as much of it as fits
+            prefix = f"- {finding.title}{cite}: "
+            room = (token_budget - estimate_tokens(prefix) - estimate_tokens(source_line) - 1) * 4
+            if room > 0:
+                cut = finding.content[:room]
+                if " " in cut:
+                    cut = cut.rsplit(" ", 1)[0]
+                entry = f"{prefix}{cut.rstrip()}…\n"
+                cost = estimate_tokens(entry) + estimate_tokens(source_line)
+                truncated += 1
+        if used + cost > token_budget:
+            dropped_budget += 1
+            continue
+
+        used += cost
+        entries.append(entry)
+        if source_line:
+            citations[url] = citation
+            sources.append(source_line)
+
+    text = "".join(entries)
+    if sources:
+        text += "\nSources (cite by ID):\n" + "".join(sources)
+
+    return {
+        "text": text,
+        "tokens_before": tokens_before,
+        "tokens_after": estimate_tokens(text),
+        "kept": len(entries),
+        "dropped_duplicates": dropped_duplicates,
+        "dropped_budget": dropped_budget,
+        "truncated": truncated,
+        "citations": citations,
+    }
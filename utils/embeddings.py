@@ -0,0 +1,112 @@
+"""
+Offline text embeddings based on feature hashing
+"""
+import hashlib
+import re
+from typing import Dict, Iterable, List, Tuple
+
+import numpy as np
+
+_TOKEN_RE = re.compile(r"[a-z0-9]+")
+_TOKEN_CACHE_SIZE = 200_000
+
+STOPWORDS = frozenset(
+    "a an and are as at be by about can did do does for from how in is it its of on or "
+    "tell the their this to was what when where which who whom why with me please".split()
+)
+
+# Generic request words that don't change what a research query is about
+INTENT_WORDS = frozenset(
+    "biography define definition describe details explain explanation info information "
+    "meaning overview summary summarize".split()
+)
+
+
+def tokenize(text: str, drop_stopwords: bool = True) -> List[str]:
+    """
+    Split text into lower-case word tokens
+
+    Args:
+        text: Text to tokenize
+        drop_stopwords: Remove common question words, articles and generic request words
+
+    Returns:
+        List of tokens
+    """
+    tokens = _TOKEN_RE.findall((text or "").lower())
+    if drop_stopwords:
+        tokens = [t for t in tokens if t not in STOPWORDS and t not in INTENT_WORDS]
+    return tokens
+
+
+class HashingEmbedder:
+    """
+    Embeds text into a fixed-size vector without any model download.
+
+    Word tokens and character trigrams are hashed into ``dim`` buckets with
+    a sign bit, weighted sub-linearly by count and L2-normalised, so cosine
+    similarity is a plain dot product. Trigrams make inflections
+    ("biography"/"biographies") land close together.
+    """
+
+    def __init__(self, dim: int = 1024, trigram_weight: float = 0.3):
+        self.dim = dim
+        self.trigram_weight = trigram_weight
+        self._token_cache: Dict[str, Tuple[List[int], List[float]]] = {}
+
+    def _token_features(self, token: str) -> Tuple[List[int], List[float]]:
+        """Hashed buckets and signed weights of a token and its trigrams (cached per token)"""
+        cached = self._token_cache.get(token)
+        if cached is not None:
+            return cached
+
+        features = [(token, 1.0)]
+        padded = f"#{token}#"
+        for i in range(len(padded) - 2):
+            features.append(("3:" + padded[i:i + 3], self.trigram_weight))
+
+        buckets = []
+        weights = []
+        for feature, weight in features:
+            value = int.from_bytes(hashlib.blake2b(feature.encode("utf-8"), digest_size=8).digest(), "little")
+            buckets.append((value >> 1) % self.dim)
+            weights.append(weight if value & 1 else -weight)
+
+        if len(self._token_cache) < _TOKEN_CACHE_SIZE:
+            self._token_cache[token] = (buckets, weights)
+        return buckets, weights
+
+    def embed(self, text: str) -> np.ndarray:
+        """
+        Embed one text
+
+        Args:
+            text: Text to embed
+
+        Returns:
+            L2-normalised float32 vector of length ``dim``
+        """
+        buckets = []
+        weights = []
+        for token in tokenize(text):
+            token_buckets, token_weights = self._token_features(token)
+            buckets.extend(token_buckets)
+            weights.extend(token_weights)
+        vector = np.bincount(buckets, weights=weights, minlength=self.dim).astype(np.float32)
+        vector = np.sign(vector) * np.log1p(np.abs(vector))
+        norm = np.linalg.norm(vector)
+        if norm > 0:
+            vector /= norm
+        return vector.astype(np.float32, copy=False)
+
+    def embed_many(self, texts: Iterable[str]) -> np.ndarray:
+        """
+        Embed several texts
+
+        Returns:
+            Matrix with one normalised row per text
+        """
+        rows = [self.embed(text) for text in texts]
+        if not rows:
+            return np.zeros((0, self.dim), dtype=np.float32)
+        return np.vstack(rows)
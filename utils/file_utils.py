@@ -2,30 +2,52 @@
 File utility functions for saving and loading research results
 """
 import os
-import json
 import logging
 from typing import List, Dict, Any, Optional
 from datetime import datetime
 
 import config
+from utils import schema
+from utils.archive import get_archive, is_archive_ref, open_archive
+from utils.local_index import index_saved_results
+from utils.markdown_utils import draft_html_path, rendered_file
+from utils.schema import Finding
+from utils.tracing import span
+from utils.write_behind import read_file, write_file
 
 logger = logging.getLogger(__name__)
 
-def save_research_results(results: List[Dict[str, Any]], query: str, timestamp: Optional[str] = None) -> str:
+def save_research_results(results: List[Finding], query: str, timestamp: Optional[str] = None) -> str:
     """
     Save research results to a JSON file
     
+    With the results archive enabled the findings go to the archive and an
+    ``archive://`` reference is returned instead of a file path. Either way
+    the disk write happens on the background write-behind queue.
+    
     Args:
         results: List of research findings
         query: The original query
         timestamp: Optional timestamp string (defaults to current time)
         
     Returns:
-        Path to the saved file
+        Path to the saved file, or its archive reference
     """
     if timestamp is None:
         timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
     
+    archive = get_archive()
+    if archive is not None:
+        try:
+            with span("file_save"):
+                ref = archive.save_research(query, timestamp, results)
+            logger.info(f"Research results archived as {ref}")
+            index_saved_results(ref, results)
+            return ref
+        except Exception as e:
+            logger.error(f"Error archiving research results: {str(e)}")
+            return ""
+    
     # Create a safe filename from the query
     safe_query = "".join([c if c.isalnum() else "_" for c in query])
     safe_query = safe_query[:50]  # Limit filename length
@@ -33,6 +55,7 @@ def save_research_results(results: List[Dict[str, Any]], query: str, timestamp:
     # Create the filename
     filename = f"{safe_query}_{timestamp}.json"
     filepath = os.path.join(config.RESEARCH_RESULTS_DIR, filename)
+    os.makedirs(config.RESEARCH_RESULTS_DIR, exist_ok=True)
     
     # Prepare data structure
     data = {
@@ -42,11 +65,14 @@ def save_research_results(results: List[Dict[str, Any]], query: str, timestamp:
     }
     
     try:
-        # Write to file
-        with open(filepath, 'w', encoding='utf-8') as f:
-            json.dump(data, f, indent=2, ensure_ascii=False)
+        # Serialize compact JSON here; the disk write happens in the background
+        with span("file_save") as stage:
+            payload = schema.dumps(data)
+            stage.payload_bytes = len(payload)
+            write_file(filepath, payload)
         
-        logger.info(f"Research results saved to {filepath}")
+        logger.info(f"Research results queued for {filepath}")
+        index_saved_results(filepath, results)
         return filepath
     except Exception as e:
         logger.error(f"Error saving research results: {str(e)}")
@@ -54,7 +80,7 @@ def save_research_results(results: List[Dict[str, Any]], query: str, timestamp:
 
 def save_draft(draft: str, query: str, timestamp: Optional[str] = None) -> str:
     """
-    Save drafted answer to a markdown file
+    Save drafted answer to a markdown file, with its rendered HTML alongside
     
     Args:
         draft: The drafted answer text
@@ -62,7 +88,7 @@ def save_draft(draft: str, query: str, timestamp: Optional[str] = None) -> str:
         timestamp: Optional timestamp string (defaults to current time)
         
     Returns:
-        Path to the saved file
+        Path to the saved file, or its archive reference
     """
     if timestamp is None:
         timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
@@ -76,13 +102,22 @@ def save_draft(draft: str, query: str, timestamp: Optional[str] = None) -> str:
     filepath = os.path.join(config.DRAFT_RESULTS_DIR, filename)
     
     try:
-        # Write to file
-        with open(filepath, 'w', encoding='utf-8') as f:
-            f.write(f"# {query}\n\n")
-            f.write(f"*Generated on {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}*\n\n")
-            f.write(draft)
+        # Queue the markdown and its rendered HTML for the background writer
+        with span("file_save") as stage:
+            header = f"# {query}\n\n*Generated on {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}*\n\n"
+            payload = (header + draft).encode('utf-8')
+            stage.payload_bytes = len(payload)
+            # Render once now so results pages can serve the stored HTML
+            html = rendered_file(draft)
+            archive = get_archive()
+            if archive is not None:
+                filepath = archive.save_draft(query, timestamp, payload, html)
+            else:
+                os.makedirs(config.DRAFT_RESULTS_DIR, exist_ok=True)
+                write_file(filepath, payload)
+                write_file(draft_html_path(filepath), html)
         
-        logger.info(f"Draft saved to {filepath}")
+        logger.info(f"Draft queued for {filepath}")
         return filepath
     except Exception as e:
         logger.error(f"Error saving draft: {str(e)}")
@@ -90,17 +125,20 @@ def save_draft(draft: str, query: str, timestamp: Optional[str] = None) -> str:
 
 def load_research_results(filepath: str) -> Dict[str, Any]:
     """
-    Load research results from a JSON file
+    Load research results from a JSON file or the results archive
     
     Args:
-        filepath: Path to the JSON file
+        filepath: Path to the JSON file, or an archive reference
         
     Returns:
-        Dictionary containing the loaded research data
+        Dictionary containing the loaded research data, with 'results' as Finding records
     """
     try:
-        with open(filepath, 'r', encoding='utf-8') as f:
-            data = json.load(f)
+        if is_archive_ref(filepath):
+            data = open_archive().load_research(filepath)
+        else:
+            data = schema.loads(read_file(filepath))
+            data["results"] = schema.findings_from_dicts(data.get("results", []))
         
         logger.info(f"Research results loaded from {filepath}")
         return data
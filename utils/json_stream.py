@@ -0,0 +1,171 @@
+"""
+Incremental extraction of JSON array items from a streamed LLM response
+"""
+import json
+import logging
+import re
+from typing import Any, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# Characters that matter outside and inside a JSON string
+_STRUCTURE_RE = re.compile(r'["{}\[\]]')
+_STRING_RE = re.compile(r'["\\]')
+
+
+class JSONArrayStreamParser:
+    """
+    Emits the objects of a JSON array as soon as each one closes.
+
+    The array is either the value of ``key`` in the top-level object (as in
+    ``{"findings": [...]}``) or a top-level array. Text around the JSON, such
+    as Markdown fences or a preamble, is skipped. Items that are not valid
+    JSON objects are skipped and counted instead of failing the response, and
+    when the output is cut off the items that closed before the cut are kept.
+
+    Example:
+        parser = JSONArrayStreamParser("findings")
+        for chunk in chunks:
+            for item in parser.feed(chunk):
+                ...
+        parser.close()
+    """
+
+    def __init__(self, key: str = "findings"):
+        self.key = key
+        self._text = ""
+        self._pos = 0
+        self._stack: List[str] = []
+        self._in_string = False
+        self._string_start: Optional[int] = None
+        self._last_string: Optional[str] = None
+        self._array_depth: Optional[int] = None
+        self._item_start: Optional[int] = None
+        self.items = 0
+        self.malformed = 0
+        self.complete = False
+
+    def feed(self, chunk: str) -> List[Dict[str, Any]]:
+        """
+        Consume the next piece of the response
+
+        Args:
+            chunk: Text streamed by the model
+
+        Returns:
+            Array items that closed within this chunk
+        """
+        if self.complete or not chunk:
+            return []
+        self._text += chunk
+        found = []
+        text = self._text
+        while self._pos < len(text):
+            if self._in_string:
+                match = _STRING_RE.search(text, self._pos)
+                if match is None:
+                    self._pos = len(text)
+                    break
+                if match.group() == "\\":
+                    if match.end() >= len(text):
+                        # Escape split across chunks; resume at the backslash
+                        self._pos = match.start()
+                        break
+                    self._pos = match.end() + 1
+                    continue
+                self._in_string = False
+                if len(self._stack) == 1 and self._item_start is None:
+                    self._last_string = text[self._string_start + 1:match.start()]
+                self._pos = match.end()
+                continue
+
+            match = _STRUCTURE_RE.search(text, self._pos)
+            if match is None:
+                self._pos = len(text)
+                break
+            char, position = match.group(), match.start()
+            self._pos = match.end()
+
+            if char == '"':
+                if self._stack:
+                    self._in_string = True
+                    self._string_start = position
+            elif char in "{[":
+                self._stack.append(char)
+                depth = len(self._stack)
+                if char == "[" and self._array_depth is None and (
+                    depth == 1 or (depth == 2 and self._stack[0] == "{" and self._last_string == self.key)
+                ):
+                    self._array_depth = depth
+                elif char == "{" and self._array_depth is not None and depth == self._array_depth + 1:
+                    self._item_start = position
+            elif self._stack:
+                self._stack.pop()
+                depth = len(self._stack)
+                if char == "}" and self._item_start is not None and depth == self._array_depth:
+                    item = self._parse_item(text[self._item_start:self._pos])
+                    self._item_start = None
+                    if item is not None:
+                        found.append(item)
+                elif char == "]" and self._array_depth is not None and depth == self._array_depth - 1:
+                    # The keyed array is the answer even when it's empty
+                    if self.items or self.malformed or self._array_depth == 2:
+                        self.complete = True
+                        break
+                    # An empty or non-object top-level array (e.g. "[1]" in a preamble); keep looking
+                    self._array_depth = None
+
+        self._trim()
+        return found
+
+    def _parse_item(self, text: str) -> Optional[Dict[str, Any]]:
+        """Decode one closed item, counting it as malformed if it isn't a JSON object"""
+        try:
+            item = json.loads(text)
+        except json.JSONDecodeError:
+            item = None
+        if not isinstance(item, dict):
+            self.malformed += 1
+            return None
+        self.items += 1
+        return item
+
+    def _trim(self) -> None:
+        """Drop consumed text that no open item or pending key still needs"""
+        keep = self._pos
+        if self._item_start is not None:
+            keep = min(keep, self._item_start)
+        if self._in_string and self._string_start is not None:
+            keep = min(keep, self._string_start)
+        if keep <= 0:
+            return
+        self._text = self._text[keep:]
+        self._pos -= keep
+        if self._item_start is not None:
+            self._item_start -= keep
+        if self._string_start is not None:
+            self._string_start = self._string_start - keep if self._string_start >= keep else None
+
+    @property
+    def truncated(self) -> bool:
+        """Whether the response ended inside the array"""
+        return self._array_depth is not None and not self.complete
+
+    def close(self) -> Dict[str, Any]:
+        """
+        Finish the stream and report how the response parsed
+
+        Returns:
+            Dictionary with 'items' (emitted objects), 'malformed' (skipped
+            items), 'found' (whether the array was present), 'truncated'
+            (the response ended inside the array) and 'partial_item'
+            (an unfinished item was dropped)
+        """
+        return {
+            "items": self.items,
+            "malformed": self.malformed,
+            "found": self.complete or self._array_depth is not None,
+            "truncated": self.truncated,
+            "partial_item": self._item_start is not None,
+        }
+
@@ -0,0 +1,349 @@
+"""
+Local hybrid (BM25 + dense) retrieval over previously saved research findings
+"""
+import glob
+import logging
+import math
+import os
+import threading
+import time
+from collections import Counter
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+import config
+from utils import schema
+from utils.archive import ResultArchive, open_archive
+from utils.embeddings import HashingEmbedder, tokenize
+from utils.schema import Finding
+
+logger = logging.getLogger(__name__)
+
+# Scans that may fail to load an archive entry before it is skipped for good
+_ARCHIVE_LOAD_ATTEMPTS = 3
+
+
+class LocalIndex:
+    """
+    In-memory retrieval index over the findings of past research runs.
+
+    Lexical scores come from BM25 over an inverted index; dense scores are
+    cosine similarities against a growable NumPy matrix of hashing
+    embeddings, so one query is a single matrix-vector product. The two are
+    normalised and blended with ``alpha``. Findings are added incrementally,
+    either directly when a run is saved or by picking up new files from the
+    research results directory and new entries in the results archive
+    (e.g. ones written by another process).
+    """
+
+    def __init__(self, directory: str, dim: int = 256, alpha: float = 0.5,
+                 k1: float = 1.5, b: float = 0.75, archive: Optional[ResultArchive] = None):
+        self.directory = directory
+        self.archive = archive
+        self.alpha = alpha
+        self.k1 = k1
+        self.b = b
+        self.embedder = HashingEmbedder(dim=dim)
+        self._findings: List[Finding] = []
+        self._keys = set()
+        self._postings: Dict[str, Tuple[List[int], List[int]]] = {}
+        self._lengths = np.zeros(0, dtype=np.float32)
+        self._vectors = np.zeros((0, dim), dtype=np.float32)
+        self._size = 0
+        self._total_length = 0
+        self._files = set()
+        self._dir_mtime = None
+        self._archive_rowid = 0
+        self._archive_failures: Dict[str, int] = {}
+        self._lock = threading.RLock()
+        self.build_ms = 0.0
+        self._queries = 0
+        self._query_ms = 0.0
+        self._covered = 0
+
+    def __len__(self) -> int:
+        return self._size
+
+    def add(self, findings: List[Finding]) -> int:
+        """
+        Index new findings, skipping ones already indexed
+
+        Args:
+            findings: Findings to add
+
+        Returns:
+            Number of findings added
+        """
+        with self._lock:
+            new = []
+            for finding in findings:
+                key = (finding.source_url, finding.content)
+                if not finding.content or key in self._keys:
+                    continue
+                self._keys.add(key)
+                new.append(finding)
+            if not new:
+                return 0
+
+            self._reserve(self._size + len(new))
+            vectors = self.embedder.embed_many(f"{f.title} {f.content}" for f in new)
+            for offset, finding in enumerate(new):
+                doc = self._size + offset
+                tokens = tokenize(f"{finding.title} {finding.content}")
+                for term, count in Counter(tokens).items():
+                    docs, counts = self._postings.setdefault(term, ([], []))
+                    docs.append(doc)
+                    counts.append(count)
+                self._lengths[doc] = len(tokens)
+                self._total_length += len(tokens)
+                self._findings.append(finding)
+            self._vectors[self._size:self._size + len(new)] = vectors
+            self._size += len(new)
+            return len(new)
+
+    def add_file(self, path: str) -> int:
+        """
+        Index the findings of one saved research results file
+
+        Returns:
+            Number of findings added
+        """
+        if not self._claim(path):
+            return 0
+        try:
+            with open(path, 'rb') as f:
+                data = schema.loads(f.read())
+            return self.add(schema.findings_from_dicts(data.get("results", [])))
+        except Exception as e:
+            logger.warning(f"Skipping unreadable research results file {path}: {str(e)}")
+            return 0
+
+    def add_saved(self, path: str, findings: List[Finding]) -> int:
+        """
+        Index the findings of a file this process just saved, without re-reading it
+
+        Returns:
+            Number of findings added
+        """
+        if not self._claim(path):
+            return 0
+        return self.add(findings)
+
+    def _claim(self, path: str) -> bool:
+        """Mark a file as indexed, returning False if it already was"""
+        with self._lock:
+            if path in self._files:
+                return False
+            self._files.add(path)
+            return True
+
+    def refresh(self) -> int:
+        """
+        Pick up research results files and archive entries added since the last scan
+
+        Returns:
+            Number of findings added
+        """
+        start = time.perf_counter()
+        added = self._scan_directory() + self._scan_archive()
+        if added:
+            elapsed = (time.perf_counter() - start) * 1000
+            self.build_ms += elapsed
+            logger.info(f"Local index picked up {added} findings in {elapsed:.1f} ms ({self._size} total)")
+        return added
+
+    def _scan_directory(self) -> int:
+        """Index results files in the directory if it changed since the last scan"""
+        try:
+            mtime = os.stat(self.directory).st_mtime_ns
+        except OSError:
+            return 0
+        if mtime == self._dir_mtime:
+            return 0
+        self._dir_mtime = mtime
+        added = 0
+        for path in sorted(glob.glob(os.path.join(self.directory, "*.json"))):
+            added += self.add_file(path)
+        return added
+
+    def _scan_archive(self) -> int:
+        """Index research entries added to the archive manifest since the last scan"""
+        if self.archive is None:
+            return 0
+        added = 0
+        try:
+            entries = self.archive.research_since(self._archive_rowid)
+        except Exception as e:
+            logger.warning(f"Could not read the results archive manifest: {str(e)}")
+            return 0
+        for rowid, ref in entries:
+            with self._lock:
+                indexed = ref in self._files
+            if not indexed:
+                # Claim only once the entry loads, so a failed load is retried on the next scan
+                try:
+                    results = self.archive.load_research(ref)["results"]
+                except Exception as e:
+                    attempts = self._archive_failures.get(ref, 0) + 1
+                    if attempts < _ARCHIVE_LOAD_ATTEMPTS:
+                        self._archive_failures[ref] = attempts
+                        logger.warning(f"Could not load archive entry {ref} (attempt {attempts}), retrying later: {str(e)}")
+                        break
+                    logger.warning(f"Skipping unreadable archive entry {ref}: {str(e)}")
+                    self._archive_failures.pop(ref, None)
+                else:
+                    self._archive_failures.pop(ref, None)
+                    if self._claim(ref):
+                        added += self.add(results)
+            self._archive_rowid = rowid
+        return added
+
+    def _reserve(self, size: int) -> None:
+        """Grow the vector and length arrays geometrically"""
+        capacity = self._vectors.shape[0]
+        if size <= capacity:
+            return
+        capacity = max(size, capacity * 2, 64)
+        vectors = np.zeros((capacity, self._vectors.shape[1]), dtype=np.float32)
+        vectors[:self._size] = self._vectors[:self._size]
+        lengths = np.zeros(capacity, dtype=np.float32)
+        lengths[:self._size] = self._lengths[:self._size]
+        self._vectors, self._lengths = vectors, lengths
+
+    def _bm25(self, terms: List[str]) -> np.ndarray:
+        """Score every indexed finding against the query terms"""
+        scores = np.zeros(self._size, dtype=np.float32)
+        if not self._size:
+            return scores
+        lengths = self._lengths[:self._size]
+        norm = self.k1 * (1 - self.b + self.b * lengths / (self._total_length / self._size or 1.0))
+        for term in set(terms):
+            posting = self._postings.get(term)
+            if posting is None:
+                continue
+            docs = np.asarray(posting[0], dtype=np.int64)
+            counts = np.asarray(posting[1], dtype=np.float32)
+            idf = math.log(1 + (self._size - len(docs) + 0.5) / (len(docs) + 0.5))
+            scores[docs] += idf * counts * (self.k1 + 1) / (counts + norm[docs])
+        return scores
+
+    def search(self, query: str, k: int = 5) -> List[Tuple[Finding, float, float]]:
+        """
+        Find the past findings most relevant to a query
+
+        Args:
+            query: The search query
+            k: Maximum number of results
+
+        Returns:
+            List of (finding, hybrid score, dense similarity), best first
+        """
+        self.refresh()
+        start = time.perf_counter()
+        with self._lock:
+            if not self._size:
+                hits = []
+            else:
+                bm25 = self._bm25(tokenize(query))
+                dense = self._vectors[:self._size] @ self.embedder.embed(query)
+                top = bm25.max()
+                lexical = bm25 / top if top > 0 else bm25
+                hybrid = self.alpha * lexical + (1 - self.alpha) * np.clip(dense, 0.0, None)
+                count = min(k, self._size)
+                best = np.argpartition(-hybrid, count - 1)[:count]
+                best = best[np.argsort(-hybrid[best])]
+                hits = [(self._findings[i], float(hybrid[i]), float(dense[i])) for i in best if hybrid[i] > 0]
+            self._queries += 1
+            self._query_ms += (time.perf_counter() - start) * 1000
+        return hits
+
+    def lookup(self, query: str, k: Optional[int] = None) -> Optional[List[Finding]]:
+        """
+        Return past findings when they cover the query well enough to skip the web
+
+        A query counts as covered when at least config.LOCAL_INDEX_MIN_RESULTS
+        hits reach config.LOCAL_INDEX_MIN_SIMILARITY and together contain at
+        least config.LOCAL_INDEX_COVERAGE_THRESHOLD of the query's terms.
+
+        Args:
+            query: The search query
+            k: Maximum number of findings (defaults to config.LOCAL_INDEX_TOP_K)
+
+        Returns:
+            The covering findings, or None when the web should be searched
+        """
+        terms = set(tokenize(query))
+        if not terms:
+            return None
+
+        hits = [hit for hit in self.search(query, k or config.LOCAL_INDEX_TOP_K)
+                if hit[2] >= config.LOCAL_INDEX_MIN_SIMILARITY]
+        if len(hits) < config.LOCAL_INDEX_MIN_RESULTS:
+            return None
+
+        found = set()
+        for finding, _, _ in hits:
+            found.update(terms.intersection(tokenize(f"{finding.title} {finding.content}")))
+        coverage = len(found) / len(terms)
+        if coverage < config.LOCAL_INDEX_COVERAGE_THRESHOLD:
+            return None
+
+        with self._lock:
+            self._covered += 1
+        logger.info(f"Local index covers '{query}' with {len(hits)} findings (coverage {coverage:.2f})")
+        return [finding for finding, _, _ in hits]
+
+    def stats(self) -> Dict[str, Any]:
+        """Report index size, build time, query latency and web-call avoidance"""
+        with self._lock:
+            return {
+                "findings": self._size,
+                "files": len(self._files),
+                "terms": len(self._postings),
+                "build_ms": round(self.build_ms, 1),
+                "queries": self._queries,
+                "avg_query_ms": round(self._query_ms / self._queries, 3) if self._queries else 0.0,
+                "web_calls_avoided": self._covered,
+                "web_call_avoidance_rate": self._covered / self._queries if self._queries else 0.0,
+            }
+
+
+_index: Optional[LocalIndex] = None
+_index_lock = threading.Lock()
+
+
+def get_local_index() -> Optional[LocalIndex]:
+    """
+    Return the process-wide local index, building it from saved results on first use
+
+    Returns:
+        The shared LocalIndex, or None when it is disabled
+    """
+    global _index
+    if not config.LOCAL_INDEX_ENABLED:
+        return None
+    if _index is None:
+        with _index_lock:
+            if _index is None:
+                index = LocalIndex(
+                    config.RESEARCH_RESULTS_DIR,
+                    dim=config.LOCAL_INDEX_DIM,
+                    alpha=config.LOCAL_INDEX_ALPHA,
+                    archive=open_archive(),
+                )
+                index.refresh()
+                _index = index
+    return _index
+
+
+def index_saved_results(path: str, findings: List[Finding]) -> None:
+    """
+    Add a just-saved research results file to the local index, if it is loaded
+
+    Args:
+        path: Path of the saved file
+        findings: The findings written to it
+    """
+    if _index is not None and path:
+        _index.add_saved(path, findings)
@@ -0,0 +1,229 @@
+"""
+Cached and incremental markdown-to-HTML rendering for drafts
+"""
+import hashlib
+import logging
+import os
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Optional
+
+import config
+from utils.tracing import span
+from utils.archive import is_archive_ref, open_archive
+from utils.write_behind import read_file
+
+logger = logging.getLogger(__name__)
+
+MARKDOWN_EXTENSIONS = ['tables', 'fenced_code']
+_HASH_PREFIX = "<!-- sha256:"
+
+
+def content_hash(text: str) -> str:
+    """Hex SHA-256 of a draft, used as its cache key"""
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def _convert(text: str) -> str:
+    """Render markdown to HTML, timed as the markdown_render stage"""
+    import markdown
+
+    with span("markdown_render") as stage:
+        html = markdown.markdown(text, extensions=MARKDOWN_EXTENSIONS)
+        stage.payload_bytes = len(html.encode("utf-8"))
+    return html
+
+
+class RenderCache:
+    """
+    In-memory LRU of rendered drafts keyed by content hash.
+
+    Misses fall back to the pre-rendered ``.html`` file written next to the
+    draft, if one is given and its recorded hash matches, before rendering.
+    """
+
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, str]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._file_hits = 0
+        self._renders = 0
+
+    def render(self, text: str, html_path: Optional[str] = None) -> str:
+        """
+        Return the HTML for a draft, rendering it only if no cached copy exists
+
+        Args:
+            text: Markdown draft
+            html_path: Optional pre-rendered HTML file for this draft
+
+        Returns:
+            Rendered HTML
+        """
+        key = content_hash(text)
+        with self._lock:
+            html = self._entries.get(key)
+            if html is not None:
+                self._entries.move_to_end(key)
+                self._hits += 1
+                return html
+
+        html = read_rendered(html_path, key) if html_path else None
+        with self._lock:
+            if html is not None:
+                self._file_hits += 1
+            else:
+                self._renders += 1
+        if html is None:
+            html = _convert(text)
+        self.put(key, html)
+        return html
+
+    def put(self, key: str, html: str) -> None:
+        """Cache rendered HTML under a content hash"""
+        if self.max_entries <= 0:
+            return
+        with self._lock:
+            self._entries[key] = html
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def stats(self) -> Dict[str, Any]:
+        """Report memory hits, file hits and renders"""
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "memory_hits": self._hits,
+                "file_hits": self._file_hits,
+                "renders": self._renders,
+            }
+
+
+_cache: Optional[RenderCache] = None
+_cache_lock = threading.Lock()
+
+
+def get_render_cache() -> RenderCache:
+    """
+    Return the process-wide render cache
+
+    Returns:
+        The shared RenderCache
+    """
+    global _cache
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = RenderCache(config.MARKDOWN_CACHE_ENTRIES)
+    return _cache
+
+
+def render_markdown(text: str, html_path: Optional[str] = None) -> str:
+    """
+    Render a draft to HTML through the shared content-hash cache
+
+    Args:
+        text: Markdown draft
+        html_path: Optional pre-rendered HTML file for this draft
+
+    Returns:
+        Rendered HTML
+    """
+    return get_render_cache().render(text or "", html_path)
+
+
+def draft_html_path(draft_path: str) -> str:
+    """Path (or archive reference) of the pre-rendered HTML stored next to a saved draft"""
+    return os.path.splitext(draft_path)[0] + ".html"
+
+
+def rendered_file(text: str) -> bytes:
+    """
+    Contents of the pre-rendered HTML file for a draft, tagged with its content hash
+
+    Args:
+        text: Markdown draft
+
+    Returns:
+        UTF-8 encoded file contents
+    """
+    key = content_hash(text)
+    return f"{_HASH_PREFIX}{key} -->\n{render_markdown(text)}".encode("utf-8")
+
+
+def read_rendered(html_path: str, key: str) -> Optional[str]:
+    """
+    Load pre-rendered HTML if it was rendered from the draft with this hash
+
+    Returns:
+        The HTML, or None if the file is missing or stale
+    """
+    try:
+        data = open_archive().read(html_path) if is_archive_ref(html_path) else read_file(html_path)
+        header, _, html = data.decode("utf-8").partition("\n")
+    except (OSError, RuntimeError, UnicodeDecodeError):
+        return None
+    if header.strip() != f"{_HASH_PREFIX}{key} -->":
+        return None
+    return html
+
+
+class IncrementalMarkdownRenderer:
+    """
+    Renders a streamed draft block by block as it arrives.
+
+    Text is only cut at a blank line outside fenced code blocks, so each
+    completed block is rendered once and never revisited. The fragments are
+    for live display; ``finish`` renders the whole draft once through the
+    shared cache, so the results page for it costs no further rendering.
+    """
+
+    def __init__(self):
+        self._text = ""
+        self._rendered_upto = 0
+
+    def feed(self, chunk: str) -> str:
+        """
+        Add streamed text
+
+        Args:
+            chunk: Next piece of the draft
+
+        Returns:
+            HTML for blocks completed by this chunk (empty if none)
+        """
+        self._text += chunk
+        boundary = self._block_boundary()
+        if boundary <= self._rendered_upto:
+            return ""
+        block = self._text[self._rendered_upto:boundary]
+        self._rendered_upto = boundary
+        return _convert(block) if block.strip() else ""
+
+    def _block_boundary(self) -> int:
+        """Find the end of the last complete block after the rendered prefix"""
+        boundary = self._rendered_upto
+        position = self._rendered_upto
+        in_fence = False
+        while True:
+            end = self._text.find("\n", position)
+            if end == -1:
+                return boundary
+            line = self._text[position:end].strip()
+            if line.startswith("```") or line.startswith("~~~"):
+                in_fence = not in_fence
+            elif not line and not in_fence:
+                boundary = end + 1
+            position = end + 1
+
+    def finish(self) -> str:
+        """
+        Render the complete draft
+
+        Returns:
+            HTML for the whole draft
+        """
+        return render_markdown(self._text)
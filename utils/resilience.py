@@ -0,0 +1,403 @@
+"""
+Rate limiting, retries with jittered backoff and circuit breaking for upstream calls
+"""
+import asyncio
+import logging
+import random
+import threading
+import time
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from typing import Any, Callable, Dict, Iterator, Optional
+
+import config
+
+logger = logging.getLogger(__name__)
+
+# Exception class names that signal a transient upstream problem (Google API core / gRPC)
+_TRANSIENT_ERROR_NAMES = frozenset({
+    "DeadlineExceeded",
+    "InternalServerError",
+    "ResourceExhausted",
+    "ServiceUnavailable",
+    "TooManyRequests",
+})
+
+
+class CircuitOpenError(RuntimeError):
+    """Raised instead of calling an upstream whose circuit breaker is open"""
+
+
+def is_transient_error(exc: BaseException) -> bool:
+    """
+    Decide whether an upstream error is worth retrying
+
+    Connection problems, timeouts, 408, 429 and 5xx statuses are transient;
+    other client errors are not.
+    """
+    if isinstance(exc, (ConnectionError, TimeoutError)):
+        return True
+    status = getattr(exc, "status_code", None) or getattr(exc, "code", None)
+    if isinstance(status, int):
+        return status in (408, 429) or status >= 500
+    return type(exc).__name__ in _TRANSIENT_ERROR_NAMES
+
+
+def parse_retry_after(value: Any) -> Optional[float]:
+    """
+    Parse a Retry-After value (delay in seconds or an HTTP date)
+
+    Returns:
+        Seconds to wait, or None if the value is missing or malformed
+    """
+    if value is None:
+        return None
+    try:
+        return max(0.0, float(value))
+    except (TypeError, ValueError):
+        pass
+    try:
+        when = parsedate_to_datetime(str(value))
+    except (TypeError, ValueError):
+        return None
+    if when.tzinfo is None:
+        when = when.replace(tzinfo=timezone.utc)
+    return max(0.0, (when - datetime.now(timezone.utc)).total_seconds())
+
+
+class TokenBucket:
+    """
+    Token-bucket rate limiter shared by the threads of one process.
+
+    Tokens refill continuously at ``rate`` per second up to ``capacity``;
+    ``acquire`` blocks until a token is available.
+    """
+
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def reserve(self) -> float:
+        """
+        Take a token without waiting
+
+        Returns:
+            Seconds the caller must wait before using the token
+        """
+        if self.rate <= 0:
+            return 0.0
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            self._tokens -= 1
+            if self._tokens >= 0:
+                return 0.0
+            return -self._tokens / self.rate
+
+    def acquire(self) -> float:
+        """
+        Wait for a token
+
+        Returns:
+            Seconds spent waiting
+        """
+        wait = self.reserve()
+        if wait > 0:
+            time.sleep(wait)
+        return wait
+
+
+class CircuitBreaker:
+    """
+    Fails fast while an upstream keeps failing.
+
+    After ``failure_threshold`` consecutive failures the circuit opens and
+    calls are rejected for ``reset_timeout`` seconds. Then one probe call is
+    let through (half-open): success closes the circuit, failure re-opens it.
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, failure_threshold: int, reset_timeout: float):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._state = self.CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._probing = False
+        self._lock = threading.Lock()
+        self.trips = 0
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            return self._state
+
+    def allow(self) -> bool:
+        """Check whether a call may go ahead now"""
+        with self._lock:
+            if self._state == self.CLOSED:
+                return True
+            if self._state == self.OPEN and time.monotonic() - self._opened_at >= self.reset_timeout:
+                self._state = self.HALF_OPEN
+                self._probing = False
+            if self._state == self.HALF_OPEN and not self._probing:
+                self._probing = True
+                return True
+            return False
+
+    def record_success(self) -> None:
+        """Close the circuit after a successful call"""
+        with self._lock:
+            self._state = self.CLOSED
+            self._failures = 0
+            self._probing = False
+
+    def record_failure(self) -> None:
+        """Count a failed call, opening the circuit at the threshold"""
+        with self._lock:
+            self._failures += 1
+            if self._state == self.HALF_OPEN or self._failures >= self.failure_threshold:
+                if self._state != self.OPEN:
+                    self.trips += 1
+                self._state = self.OPEN
+                self._opened_at = time.monotonic()
+                self._probing = False
+
+
+class Upstream:
+    """
+    Guards calls to one upstream service (e.g. Tavily or the LLM).
+
+    Every attempt takes a rate-limiter token and passes the circuit breaker.
+    Transient failures are retried up to ``max_attempts`` times with full
+    jitter exponential backoff; a Retry-After hint on the error is honoured
+    as the minimum delay. Errors that are not transient are raised at once
+    and don't count against the circuit.
+    """
+
+    def __init__(self, name: str, limiter: TokenBucket, breaker: CircuitBreaker,
+                 max_attempts: int, base_delay: float, max_delay: float, max_retry_after: float,
+                 retryable: Callable[[BaseException], bool] = is_transient_error):
+        self.name = name
+        self.limiter = limiter
+        self.breaker = breaker
+        self.max_attempts = max(1, max_attempts)
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.max_retry_after = max_retry_after
+        self.retryable = retryable
+        self._lock = threading.Lock()
+        self._counters = {
+            "calls": 0,
+            "attempts": 0,
+            "retries": 0,
+            "failures": 0,
+            "rejected": 0,
+        }
+        self._rate_limit_wait = 0.0
+        self._backoff_wait = 0.0
+
+    def _count(self, name: str, amount: int = 1) -> None:
+        with self._lock:
+            self._counters[name] += amount
+
+    def _admit(self) -> float:
+        """
+        Check the circuit and take a rate-limiter token
+
+        Returns:
+            Seconds to wait for the token before making the attempt
+        """
+        if not self.breaker.allow():
+            self._count("rejected")
+            raise CircuitOpenError(f"{self.name} circuit is open after repeated failures; failing fast")
+        wait = self.limiter.reserve()
+        with self._lock:
+            self._counters["attempts"] += 1
+            self._rate_limit_wait += wait
+        return wait
+
+    def _backoff(self, attempt: int, exc: BaseException) -> Optional[float]:
+        """
+        Compute the delay before the next attempt
+
+        Returns:
+            Seconds to wait, or None if the error shouldn't be retried
+        """
+        if attempt >= self.max_attempts or not self.retryable(exc):
+            return None
+        delay = random.uniform(0, min(self.max_delay, self.base_delay * 2 ** (attempt - 1)))
+        retry_after = parse_retry_after(getattr(exc, "retry_after", None))
+        if retry_after is not None:
+            if retry_after > self.max_retry_after:
+                return None
+            delay = max(delay, retry_after)
+        return delay
+
+    def _failed(self, exc: BaseException) -> None:
+        """Record a failed attempt with the circuit breaker (non-transient errors mean upstream is up)"""
+        if self.retryable(exc):
+            self.breaker.record_failure()
+        else:
+            self.breaker.record_success()
+
+    def call(self, fn: Callable[..., Any], *args: Any, **kwargs: Any) -> Any:
+        """
+        Call ``fn(*args, **kwargs)`` with rate limiting, retries and circuit breaking
+
+        Returns:
+            The result of ``fn``
+
+        Raises:
+            CircuitOpenError: If the circuit is open
+            Exception: The last error from ``fn`` once retries are exhausted
+        """
+        self._count("calls")
+        attempt = 0
+        while True:
+            attempt += 1
+            wait = self._admit()
+            if wait > 0:
+                time.sleep(wait)
+            try:
+                result = fn(*args, **kwargs)
+            except Exception as e:
+                time.sleep(self._retry_delay(attempt, e))
+                continue
+            self.breaker.record_success()
+            return result
+
+    async def acall(self, fn: Callable[..., Any], *args: Any, **kwargs: Any) -> Any:
+        """Async variant of ``call`` for a coroutine function"""
+        self._count("calls")
+        attempt = 0
+        while True:
+            attempt += 1
+            wait = self._admit()
+            if wait > 0:
+                await asyncio.sleep(wait)
+            try:
+                result = await fn(*args, **kwargs)
+            except Exception as e:
+                await asyncio.sleep(self._retry_delay(attempt, e))
+                continue
+            self.breaker.record_success()
+            return result
+
+    def stream(self, fn: Callable[..., Iterator[Any]], *args: Any, **kwargs: Any) -> Iterator[Any]:
+        """
+        Like ``call`` for a function returning an iterator
+
+        Only failures before the first item are retried; once items have
+        been yielded an error is raised as is.
+        """
+        self._count("calls")
+        attempt = 0
+        while True:
+            attempt += 1
+            wait = self._admit()
+            if wait > 0:
+                time.sleep(wait)
+            try:
+                iterator = iter(fn(*args, **kwargs))
+                first = next(iterator)
+            except StopIteration:
+                self.breaker.record_success()
+                return
+            except Exception as e:
+                time.sleep(self._retry_delay(attempt, e))
+                continue
+            break
+
+        self.breaker.record_success()
+        yield first
+        yield from iterator
+
+    def _retry_delay(self, attempt: int, exc: Exception) -> float:
+        """
+        Record a failed attempt and decide how long to back off
+
+        Must be called from an ``except`` block; re-raises the error when it
+        shouldn't be retried.
+
+        Returns:
+            Seconds to wait before the next attempt
+        """
+        self._failed(exc)
+        delay = self._backoff(attempt, exc)
+        if delay is None:
+            self._count("failures")
+            raise exc
+        logger.warning(
+            f"{self.name} call failed (attempt {attempt}/{self.max_attempts}): {str(exc)}; "
+            f"retrying in {delay:.2f}s"
+        )
+        with self._lock:
+            self._counters["retries"] += 1
+            self._backoff_wait += delay
+        return delay
+
+    def stats(self) -> Dict[str, Any]:
+        """Report call, retry and failure counters, breaker state and time spent waiting"""
+        with self._lock:
+            stats = dict(self._counters)
+            stats["rate_limit_wait_seconds"] = round(self._rate_limit_wait, 3)
+            stats["backoff_wait_seconds"] = round(self._backoff_wait, 3)
+        stats["circuit_state"] = self.breaker.state
+        stats["circuit_trips"] = self.breaker.trips
+        return stats
+
+
+_upstreams: Dict[str, Upstream] = {}
+_upstreams_lock = threading.Lock()
+
+
+def get_upstream(name: str, retryable: Callable[[BaseException], bool] = is_transient_error) -> Upstream:
+    """
+    Return the process-wide guard for an upstream service
+
+    Rate limits come from config.<NAME>_RATE_LIMIT_PER_SECOND and
+    config.<NAME>_RATE_LIMIT_BURST; retry and circuit settings are shared.
+
+    Args:
+        name: Upstream name, e.g. "tavily" or "llm"
+        retryable: Predicate deciding which errors are transient (used on first creation)
+
+    Returns:
+        The shared Upstream for that name
+    """
+    with _upstreams_lock:
+        upstream = _upstreams.get(name)
+        if upstream is None:
+            prefix = name.upper()
+            upstream = _upstreams[name] = Upstream(
+                name,
+                TokenBucket(
+                    rate=getattr(config, f"{prefix}_RATE_LIMIT_PER_SECOND"),
+                    capacity=getattr(config, f"{prefix}_RATE_LIMIT_BURST"),
+                ),
+                CircuitBreaker(
+                    failure_threshold=config.CIRCUIT_FAILURE_THRESHOLD,
+                    reset_timeout=config.CIRCUIT_RESET_SECONDS,
+                ),
+                max_attempts=config.UPSTREAM_MAX_ATTEMPTS,
+                base_delay=config.UPSTREAM_BACKOFF_BASE_SECONDS,
+                max_delay=config.UPSTREAM_BACKOFF_MAX_SECONDS,
+                max_retry_after=config.UPSTREAM_MAX_RETRY_AFTER_SECONDS,
+                retryable=retryable,
+            )
+        return upstream
+
+
+def resilience_stats() -> Dict[str, Dict[str, Any]]:
+    """Report counters for every guarded upstream"""
+    with _upstreams_lock:
+        upstreams = list(_upstreams.values())
+    return {upstream.name: upstream.stats() for upstream in upstreams}
@@ -0,0 +1,221 @@
+"""
+Server-side store for finished research results, keyed by result ID
+"""
+import logging
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional
+
+import config
+from utils import schema
+from utils.schema import Finding
+from utils.sqlite_utils import SQLiteConnectionFactory
+
+logger = logging.getLogger(__name__)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS results (
+    id TEXT PRIMARY KEY,
+    query TEXT NOT NULL,
+    findings BLOB NOT NULL,
+    draft TEXT NOT NULL,
+    research_file TEXT,
+    draft_file TEXT,
+    created_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_results_created_at ON results (created_at);
+"""
+
+
+class ResultStore:
+    """
+    SQLite-backed result records with an in-memory LRU tier.
+
+    The web UI keeps only a result ID in the session cookie and loads the
+    findings and draft from here. Recently used records are kept decoded in
+    memory, so repeated page views don't decode the findings again; any
+    worker process can still load a record from the database.
+
+    Records older than ``retention_seconds``, and the oldest beyond
+    ``max_rows``, are deleted by ``save``, at most once per
+    ``prune_interval`` seconds.
+    """
+
+    def __init__(self, path: str, memory_entries: int, retention_seconds: float = 30 * 86400,
+                 max_rows: int = 10000, prune_interval: float = 3600):
+        self.memory_entries = memory_entries
+        self.retention_seconds = retention_seconds
+        self.max_rows = max_rows
+        self.prune_interval = prune_interval
+        self._last_prune = 0.0
+        self._connections = SQLiteConnectionFactory(path)
+        self._connections.connect().executescript(_SCHEMA)
+        self._memory: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._memory_hits = 0
+        self._db_hits = 0
+        self._misses = 0
+
+    def save(self, query: str, findings: List[Finding], draft: str,
+             research_file: str = "", draft_file: str = "") -> str:
+        """
+        Store a finished research result
+
+        Args:
+            query: The research question
+            findings: Research findings
+            draft: The drafted answer (markdown)
+            research_file: Path of the saved research results file
+            draft_file: Path of the saved draft file
+
+        Returns:
+            The result ID
+        """
+        result_id = uuid.uuid4().hex
+        record = {
+            "result_id": result_id,
+            "query": query,
+            "findings": list(findings),
+            "draft": draft,
+            "research_file": research_file,
+            "draft_file": draft_file,
+            "created_at": time.time(),
+        }
+        self._connections.connect().execute(
+            "INSERT INTO results (id, query, findings, draft, research_file, draft_file, created_at) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?)",
+            (result_id, query, schema.dumps(record["findings"]), draft,
+             research_file, draft_file, record["created_at"]),
+        )
+        self._remember(result_id, record)
+        self._maybe_prune()
+        return result_id
+
+    def prune(self) -> int:
+        """
+        Delete records past the retention age or beyond the row cap, oldest first
+
+        Returns:
+            Number of records deleted
+        """
+        conn = self._connections.connect()
+        cutoff = time.time() - self.retention_seconds
+        if self.max_rows > 0:
+            row = conn.execute(
+                "SELECT created_at FROM results ORDER BY created_at DESC LIMIT 1 OFFSET ?",
+                (self.max_rows - 1,),
+            ).fetchone()
+            if row is not None:
+                cutoff = max(cutoff, row[0])
+        removed = conn.execute("DELETE FROM results WHERE created_at < ?", (cutoff,)).rowcount
+        with self._lock:
+            for result_id in [k for k, record in self._memory.items() if record["created_at"] < cutoff]:
+                del self._memory[result_id]
+        return removed
+
+    def _maybe_prune(self) -> None:
+        """Delete expired records, at most once per prune interval"""
+        now = time.time()
+        if now - self._last_prune < self.prune_interval:
+            return
+        self._last_prune = now
+        try:
+            removed = self.prune()
+        except Exception as e:
+            logger.warning(f"Failed to prune old research results: {str(e)}")
+            return
+        if removed:
+            logger.info(f"Pruned {removed} stored research results")
+
+    def get(self, result_id: str) -> Optional[Dict[str, Any]]:
+        """
+        Load a stored result
+
+        The returned record is shared with the memory tier and must not be
+        modified.
+
+        Args:
+            result_id: ID returned by ``save``
+
+        Returns:
+            Record with 'query', 'findings' (list of Finding), 'draft',
+            'research_file', 'draft_file' and 'created_at', or None if unknown
+        """
+        with self._lock:
+            record = self._memory.get(result_id)
+            if record is not None:
+                self._memory.move_to_end(result_id)
+                self._memory_hits += 1
+                return record
+
+        row = self._connections.connect().execute(
+            "SELECT query, findings, draft, research_file, draft_file, created_at "
+            "FROM results WHERE id = ?",
+            (result_id,),
+        ).fetchone()
+        if row is None:
+            with self._lock:
+                self._misses += 1
+            return None
+
+        query, findings, draft, research_file, draft_file, created_at = row
+        record = {
+            "result_id": result_id,
+            "query": query,
+            "findings": schema.findings_from_dicts(schema.loads(findings)),
+            "draft": draft,
+            "research_file": research_file or "",
+            "draft_file": draft_file or "",
+            "created_at": created_at,
+        }
+        with self._lock:
+            self._db_hits += 1
+        self._remember(result_id, record)
+        return record
+
+    def _remember(self, result_id: str, record: Dict[str, Any]) -> None:
+        """Put a record in the memory tier, evicting the least recently used one"""
+        if self.memory_entries <= 0:
+            return
+        with self._lock:
+            self._memory[result_id] = record
+            self._memory.move_to_end(result_id)
+            while len(self._memory) > self.memory_entries:
+                self._memory.popitem(last=False)
+
+    def stats(self) -> Dict[str, Any]:
+        """Report memory-tier and database hit counters"""
+        with self._lock:
+            return {
+                "memory_entries": len(self._memory),
+                "max_memory_entries": self.memory_entries,
+                "memory_hits": self._memory_hits,
+                "db_hits": self._db_hits,
+                "misses": self._misses,
+            }
+
+
+_store: Optional[ResultStore] = None
+_store_lock = threading.Lock()
+
+
+def get_result_store() -> ResultStore:
+    """
+    Return the process-wide result store
+
+    Returns:
+        The shared ResultStore
+    """
+    global _store
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                _store = ResultStore(
+                    config.RESULT_STORE_PATH,
+                    config.RESULT_STORE_MEMORY_ENTRIES,
+                    retention_seconds=config.RESULT_STORE_RETENTION_SECONDS,
+                    max_rows=config.RESULT_STORE_MAX_ROWS,
+                )
+    return _store
@@ -0,0 +1,164 @@
+"""
+Typed records passed through the research pipeline, and their codec
+"""
+import json
+from dataclasses import dataclass, field
+from typing import Any, Dict, Iterable, List, Optional, Union
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+def _score(value: Any) -> float:
+    """Read a relevance score, treating missing or non-numeric values (e.g. "high") as 0.0"""
+    try:
+        return float(value or 0.0)
+    except (TypeError, ValueError):
+        return 0.0
+
+
+@dataclass(slots=True)
+class SearchResult:
+    """One web search hit"""
+
+    title: str = ""
+    url: str = ""
+    content: str = ""
+    score: float = 0.0
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "SearchResult":
+        """Build a result from a Tavily result object"""
+        return cls(
+            title=data.get("title") or "",
+            url=data.get("url") or "",
+            content=data.get("content") or "",
+            score=_score(data.get("score")),
+        )
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Convert to a Tavily-shaped dictionary"""
+        return {"title": self.title, "url": self.url, "content": self.content, "score": self.score}
+
+
+@dataclass(slots=True)
+class SearchResponse:
+    """The results of one (possibly fanned-out) search"""
+
+    query: str
+    results: List[SearchResult] = field(default_factory=list)
+    error: Optional[str] = None
+    sub_queries: List[str] = field(default_factory=list)
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "SearchResponse":
+        """Build a response from a decoded Tavily response"""
+        return cls(
+            query=data.get("query", ""),
+            results=[SearchResult.from_dict(r) for r in data.get("results", [])],
+            error=data.get("error"),
+            sub_queries=list(data.get("sub_queries", [])),
+        )
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Convert to a Tavily-shaped dictionary"""
+        data = {"query": self.query, "results": [r.to_dict() for r in self.results]}
+        if self.error:
+            data["error"] = self.error
+        if self.sub_queries:
+            data["sub_queries"] = self.sub_queries
+        return data
+
+
+@dataclass(slots=True)
+class Finding:
+    """One synthesized research finding with its source"""
+
+    title: str = "Research Finding"
+    content: str = ""
+    source_url: str = ""
+    source_title: str = "Research Source"
+    score: float = 0.0
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "Finding":
+        """
+        Build a finding from a loosely structured dictionary
+
+        Missing titles get defaults and a 'source' key is accepted in place
+        of 'source_url', matching what the synthesis LLM tends to produce.
+        """
+        title = data.get("title") or "Research Finding"
+        return cls(
+            title=title,
+            content=str(data.get("content") or ""),
+            source_url=data.get("source_url") or data.get("source") or "",
+            source_title=data.get("source_title") or title,
+            score=_score(data.get("score")),
+        )
+
+    @classmethod
+    def from_search_result(cls, result: SearchResult) -> "Finding":
+        """Build a finding directly from a raw search result"""
+        return cls(
+            title=result.title or "Search Result",
+            content=result.content or "No content available",
+            source_url=result.url,
+            source_title=result.title or "Search Result",
+            score=result.score,
+        )
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Convert to a plain dictionary"""
+        return {
+            "title": self.title,
+            "content": self.content,
+            "source_url": self.source_url,
+            "source_title": self.source_title,
+            "score": self.score,
+        }
+
+
+def _default(obj: Any) -> Any:
+    """Serialize records for the stdlib json fallback"""
+    if hasattr(obj, "to_dict"):
+        return obj.to_dict()
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+
+def dumps(obj: Any) -> bytes:
+    """
+    Serialize a structure containing records to compact JSON
+
+    Uses orjson when installed (it encodes slotted dataclasses natively),
+    otherwise the stdlib encoder with compact separators.
+
+    Args:
+        obj: Value to encode; records may appear anywhere inside it
+
+    Returns:
+        UTF-8 encoded JSON
+    """
+    if orjson is not None:
+        return orjson.dumps(obj, default=_default)
+    return json.dumps(obj, default=_default, separators=(",", ":"), ensure_ascii=False).encode("utf-8")
+
+
+def loads(data: Union[bytes, str]) -> Any:
+    """Decode JSON produced by ``dumps`` (records come back as dictionaries)"""
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+def findings_to_dicts(findings: Iterable[Finding]) -> List[Dict[str, Any]]:
+    """Convert findings to dictionaries for JSON responses"""
+    return [finding.to_dict() for finding in findings]
+
+
+def findings_from_dicts(items: Iterable[Dict[str, Any]]) -> List[Finding]:
+    """Convert decoded dictionaries back to findings"""
+    return [Finding.from_dict(item) for item in items]
+
@@ -0,0 +1,278 @@
+"""
+Persistent, TTL-bounded cache for Tavily search results
+"""
+import atexit
+import hashlib
+import json
+import logging
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, Optional
+
+import config
+from utils.sqlite_utils import SQLiteConnectionFactory
+from utils.text_utils import normalize_query
+
+logger = logging.getLogger(__name__)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS search_cache (
+    key TEXT PRIMARY KEY,
+    query TEXT NOT NULL,
+    value TEXT NOT NULL,
+    created_at REAL NOT NULL,
+    expires_at REAL NOT NULL,
+    last_accessed REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_search_cache_last_accessed ON search_cache (last_accessed);
+CREATE INDEX IF NOT EXISTS idx_search_cache_expires_at ON search_cache (expires_at);
+CREATE TABLE IF NOT EXISTS search_cache_stats (
+    name TEXT PRIMARY KEY,
+    value INTEGER NOT NULL
+);
+"""
+
+
+def make_cache_key(query: str, **params: Any) -> str:
+    """
+    Build a cache key from the normalized query and search parameters
+
+    Args:
+        query: The search query
+        **params: Search parameters that change the result (depth, max results, ...)
+
+    Returns:
+        Hex digest identifying the search
+    """
+    payload = json.dumps({"query": normalize_query(query), "params": params}, sort_keys=True)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class SearchCache:
+    """
+    SQLite-backed search cache with per-entry TTL and LRU eviction.
+
+    The database runs in WAL mode so it can be shared by several gunicorn
+    workers and the CLI. Hit, miss and eviction counters live in the same
+    database, so ``stats()`` reports totals across all processes.
+
+    Lookups only read: each hit's access time and the counters are kept in
+    memory and written in one transaction every ``flush_seconds``, before
+    eviction picks the least recently used entries, and on ``stats()``.
+    """
+
+    def __init__(self, path: str, ttl_seconds: int, max_entries: int, flush_seconds: float = 5.0):
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.flush_seconds = flush_seconds
+        self._connections = SQLiteConnectionFactory(path)
+        conn = self._connections.connect()
+        conn.executescript(_SCHEMA)
+        self._lock = threading.Lock()
+        self._accessed: Dict[str, float] = {}
+        self._counts: Dict[str, int] = {}
+        self._last_flush = time.monotonic()
+
+    def get(self, key: str) -> Optional[str]:
+        """
+        Look up a cached value
+
+        Args:
+            key: Cache key from ``make_cache_key``
+
+        Returns:
+            The cached value, or None on a miss, expired entry or database error
+        """
+        try:
+            return self._get(key)
+        except sqlite3.Error as e:
+            logger.warning(f"Search cache lookup failed: {str(e)}")
+            return None
+
+    def _get(self, key: str) -> Optional[str]:
+        """Look up a cached value, raising on database errors"""
+        conn = self._connections.connect()
+        now = time.time()
+        row = conn.execute(
+            "SELECT value, expires_at FROM search_cache WHERE key = ?", (key,)
+        ).fetchone()
+
+        if row is None:
+            self._record(misses=1)
+            return None
+
+        value, expires_at = row
+        if expires_at <= now:
+            # Left for the next write to evict, keeping lookups read-only
+            self._record(misses=1, expired=1)
+            return None
+
+        self._record(key, now, hits=1)
+        return value
+
+    def _record(self, key: Optional[str] = None, accessed: float = 0.0, **counts: int) -> None:
+        """Buffer an access time and counter increments, flushing when the interval is up"""
+        with self._lock:
+            if key is not None:
+                self._accessed[key] = accessed
+            for name, amount in counts.items():
+                self._counts[name] = self._counts.get(name, 0) + amount
+            due = time.monotonic() - self._last_flush >= self.flush_seconds
+        if due:
+            self.flush()
+
+    def flush(self) -> None:
+        """Write buffered access times and counters in one transaction"""
+        with self._lock:
+            if not self._accessed and not self._counts:
+                self._last_flush = time.monotonic()
+                return
+        try:
+            conn = self._connections.connect()
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                self._flush_pending(conn)
+                conn.execute("COMMIT")
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+        except sqlite3.Error as e:
+            logger.warning(f"Search cache stats flush failed: {str(e)}")
+
+    def _flush_pending(self, conn) -> None:
+        """Write buffered updates inside the caller's transaction; they are dropped if it fails"""
+        with self._lock:
+            accessed, self._accessed = self._accessed, {}
+            counts, self._counts = self._counts, {}
+            self._last_flush = time.monotonic()
+        if accessed:
+            conn.executemany(
+                "UPDATE search_cache SET last_accessed = MAX(last_accessed, ?) WHERE key = ?",
+                [(at, key) for key, at in accessed.items()],
+            )
+        for name, amount in counts.items():
+            self._bump(conn, name, amount)
+
+    def set(self, key: str, query: str, value: str, ttl_seconds: Optional[int] = None) -> None:
+        """
+        Store a value and evict least recently used entries over the size cap
+
+        Args:
+            key: Cache key from ``make_cache_key``
+            query: The original query (kept for inspection only)
+            value: The value to cache
+            ttl_seconds: Optional per-entry TTL overriding the default
+        """
+        try:
+            self._set(key, query, value, ttl_seconds)
+        except sqlite3.Error as e:
+            logger.warning(f"Search cache write failed: {str(e)}")
+
+    def _set(self, key: str, query: str, value: str, ttl_seconds: Optional[int]) -> None:
+        """Store a value, raising on database errors"""
+        ttl = self.ttl_seconds if ttl_seconds is None else ttl_seconds
+        now = time.time()
+        conn = self._connections.connect()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            # Recent hits must count before eviction ranks entries by last access
+            self._flush_pending(conn)
+            conn.execute(
+                "INSERT OR REPLACE INTO search_cache "
+                "(key, query, value, created_at, expires_at, last_accessed) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (key, query, value, now, now + ttl, now),
+            )
+            evicted = self._evict(conn, now)
+            if evicted:
+                self._bump(conn, "evictions", evicted)
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+
+    def _evict(self, conn, now: float) -> int:
+        """Drop expired entries, then the least recently used ones over the cap"""
+        evicted = conn.execute("DELETE FROM search_cache WHERE expires_at <= ?", (now,)).rowcount
+        count = conn.execute("SELECT COUNT(*) FROM search_cache").fetchone()[0]
+        overflow = count - self.max_entries
+        if overflow > 0:
+            evicted += conn.execute(
+                "DELETE FROM search_cache WHERE key IN "
+                "(SELECT key FROM search_cache ORDER BY last_accessed ASC LIMIT ?)",
+                (overflow,),
+            ).rowcount
+        return evicted
+
+    def _bump(self, conn, name: str, amount: int = 1) -> None:
+        """Increment a shared counter"""
+        conn.execute(
+            "INSERT INTO search_cache_stats (name, value) VALUES (?, ?) "
+            "ON CONFLICT(name) DO UPDATE SET value = value + excluded.value",
+            (name, amount),
+        )
+
+    def clear(self) -> None:
+        """Remove all entries and reset the counters"""
+        with self._lock:
+            self._accessed.clear()
+            self._counts.clear()
+        conn = self._connections.connect()
+        conn.execute("DELETE FROM search_cache")
+        conn.execute("DELETE FROM search_cache_stats")
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Report cache counters
+
+        Returns:
+            Dictionary with hits, misses, evictions, expired, entries and hit_rate
+        """
+        self.flush()
+        conn = self._connections.connect()
+        counters = dict(conn.execute("SELECT name, value FROM search_cache_stats").fetchall())
+        entries = conn.execute("SELECT COUNT(*) FROM search_cache").fetchone()[0]
+        hits = counters.get("hits", 0)
+        misses = counters.get("misses", 0)
+        lookups = hits + misses
+        return {
+            "hits": hits,
+            "misses": misses,
+            "evictions": counters.get("evictions", 0),
+            "expired": counters.get("expired", 0),
+            "entries": entries,
+            "max_entries": self.max_entries,
+            "hit_rate": hits / lookups if lookups else 0.0,
+        }
+
+
+_cache: Optional[SearchCache] = None
+_cache_lock = threading.Lock()
+
+
+def get_search_cache() -> Optional[SearchCache]:
+    """
+    Return the process-wide search cache
+
+    Returns:
+        The shared SearchCache, or None when caching is disabled or unavailable
+    """
+    global _cache
+    if not config.SEARCH_CACHE_ENABLED:
+        return None
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                try:
+                    _cache = SearchCache(
+                        config.SEARCH_CACHE_PATH,
+                        ttl_seconds=config.SEARCH_CACHE_TTL_SECONDS,
+                        max_entries=config.SEARCH_CACHE_MAX_ENTRIES,
+                        flush_seconds=config.SEARCH_CACHE_FLUSH_SECONDS,
+                    )
+                    atexit.register(_cache.flush)
+                except Exception as e:
+                    logger.error(f"Search cache unavailable: {str(e)}")
+                    return None
+    return _cache
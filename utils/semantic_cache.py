@@ -0,0 +1,156 @@
+"""
+Workflow-level cache that matches paraphrased queries by embedding similarity
+"""
+import copy
+import logging
+import threading
+import time
+from typing import Any, Dict, Optional, Tuple
+
+import numpy as np
+
+import config
+from utils.embeddings import HashingEmbedder
+
+logger = logging.getLogger(__name__)
+
+
+class SemanticCache:
+    """
+    In-memory vector index of past queries and their workflow results.
+
+    Query embeddings live in a preallocated NumPy matrix, so a lookup is one
+    matrix-vector product. Entries expire after ``ttl_seconds``; when the
+    index is full the least recently used entry is replaced.
+    """
+
+    def __init__(self, threshold: float, ttl_seconds: float, max_entries: int,
+                 embedder: Optional[HashingEmbedder] = None):
+        self.threshold = threshold
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.embedder = embedder or HashingEmbedder(dim=config.SEMANTIC_CACHE_DIM)
+        self._vectors = np.zeros((max_entries, self.embedder.dim), dtype=np.float32)
+        self._expires_at = np.zeros(max_entries, dtype=np.float64)
+        self._last_access = np.zeros(max_entries, dtype=np.float64)
+        self._queries = [None] * max_entries
+        self._values = [None] * max_entries
+        self._size = 0
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+
+    def lookup(self, query: str) -> Optional[Tuple[Any, float, str]]:
+        """
+        Find a cached result for a query or a close paraphrase of it
+
+        Args:
+            query: The research question
+
+        Returns:
+            Tuple of (copy of the cached value, similarity, matched query), or None
+        """
+        vector = self.embedder.embed(query)
+        now = time.time()
+        with self._lock:
+            if self._size == 0:
+                self._misses += 1
+                return None
+
+            similarities = self._vectors[:self._size] @ vector
+            similarities[self._expires_at[:self._size] <= now] = -1.0
+            best = int(np.argmax(similarities))
+            similarity = float(similarities[best])
+            if similarity < self.threshold:
+                self._misses += 1
+                return None
+
+            self._last_access[best] = now
+            self._hits += 1
+            value = self._values[best]
+            matched = self._queries[best]
+
+        return copy.deepcopy(value), similarity, matched
+
+    def store(self, query: str, value: Any) -> None:
+        """
+        Cache a workflow result for a query
+
+        Args:
+            query: The research question
+            value: The result to cache
+        """
+        vector = self.embedder.embed(query)
+        now = time.time()
+        with self._lock:
+            slot = self._find_slot(vector, now)
+            self._vectors[slot] = vector
+            self._expires_at[slot] = now + self.ttl_seconds
+            self._last_access[slot] = now
+            self._queries[slot] = query
+            self._values[slot] = copy.deepcopy(value)
+
+    def _find_slot(self, vector: np.ndarray, now: float) -> int:
+        """Pick the slot for a new entry: an identical query, a free slot, an expired one, or the LRU one"""
+        if self._size:
+            similarities = self._vectors[:self._size] @ vector
+            best = int(np.argmax(similarities))
+            if similarities[best] >= 0.9999:
+                return best
+
+        if self._size < self.max_entries:
+            self._size += 1
+            return self._size - 1
+
+        expired = np.flatnonzero(self._expires_at <= now)
+        self._evictions += 1
+        if expired.size:
+            return int(expired[0])
+        return int(np.argmin(self._last_access))
+
+    def clear(self) -> None:
+        """Drop every entry"""
+        with self._lock:
+            self._size = 0
+            self._queries = [None] * self.max_entries
+            self._values = [None] * self.max_entries
+
+    def stats(self) -> Dict[str, Any]:
+        """Report hit, miss and eviction counters"""
+        with self._lock:
+            lookups = self._hits + self._misses
+            return {
+                "hits": self._hits,
+                "misses": self._misses,
+                "evictions": self._evictions,
+                "entries": self._size,
+                "max_entries": self.max_entries,
+                "threshold": self.threshold,
+                "hit_rate": self._hits / lookups if lookups else 0.0,
+            }
+
+
+_cache: Optional[SemanticCache] = None
+_cache_lock = threading.Lock()
+
+
+def get_semantic_cache() -> Optional[SemanticCache]:
+    """
+    Return the process-wide semantic cache
+
+    Returns:
+        The shared SemanticCache, or None when it is disabled
+    """
+    global _cache
+    if not config.SEMANTIC_CACHE_ENABLED:
+        return None
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = SemanticCache(
+                    threshold=config.SEMANTIC_CACHE_THRESHOLD,
+                    ttl_seconds=config.SEMANTIC_CACHE_TTL_SECONDS,
+                    max_entries=config.SEMANTIC_CACHE_MAX_ENTRIES,
+                )
+    return _cache
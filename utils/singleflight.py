@@ -0,0 +1,127 @@
+"""
+Single-flight coalescing of identical in-flight calls
+"""
+import copy
+import threading
+from typing import Any, Callable, Dict, Optional
+
+import config
+
+
+class _Call:
+    """An in-flight call that followers wait on"""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result: Any = None
+        self.error: Optional[BaseException] = None
+        self.followers = 0
+
+
+class SingleFlight:
+    """
+    Runs at most one call per key at a time within this process.
+
+    Callers arriving while a call with the same key is running wait for it
+    and receive a deep copy of its result (or its exception) instead of
+    repeating the work. The copies are taken from a snapshot made before
+    followers are released, so the leader and every follower can mutate what
+    they get back without affecting each other.
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self._calls: Dict[str, _Call] = {}
+        self._lock = threading.Lock()
+        self._executed = 0
+        self._deduplicated = 0
+
+    def do(self, key: str, fn: Callable[..., Any], *args: Any, **kwargs: Any) -> Any:
+        """
+        Call ``fn(*args, **kwargs)`` unless an identical call is already running
+
+        Args:
+            key: Identifies calls that may share a result
+            fn: The function to call
+
+        Returns:
+            The result of ``fn``, either computed here or shared from the running call
+        """
+        if not config.REQUEST_COALESCING_ENABLED:
+            return fn(*args, **kwargs)
+
+        with self._lock:
+            call = self._calls.get(key)
+            if call is not None:
+                call.followers += 1
+                self._deduplicated += 1
+                leader = False
+            else:
+                call = _Call()
+                self._calls[key] = call
+                self._executed += 1
+                leader = True
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return copy.deepcopy(call.result)
+
+        try:
+            result = fn(*args, **kwargs)
+        except BaseException as e:
+            call.error = e
+            raise
+        else:
+            # Followers copy a snapshot nobody holds, never the leader's live result
+            with self._lock:
+                self._calls.pop(key, None)
+                followers = call.followers
+            if followers:
+                try:
+                    call.result = copy.deepcopy(result)
+                except Exception as e:
+                    call.error = e
+            return result
+        finally:
+            with self._lock:
+                self._calls.pop(key, None)
+            call.done.set()
+
+    def stats(self) -> Dict[str, int]:
+        """Report executed and deduplicated call counts"""
+        with self._lock:
+            return {
+                "executed": self._executed,
+                "deduplicated": self._deduplicated,
+                "in_flight": len(self._calls),
+            }
+
+
+_groups: Dict[str, SingleFlight] = {}
+_groups_lock = threading.Lock()
+
+
+def get_singleflight(name: str) -> SingleFlight:
+    """
+    Return the process-wide coalescing group for a kind of call
+
+    Args:
+        name: Group name, e.g. "workflow", "search" or "synthesis"
+
+    Returns:
+        The shared SingleFlight for that name
+    """
+    with _groups_lock:
+        group = _groups.get(name)
+        if group is None:
+            group = _groups[name] = SingleFlight(name)
+        return group
+
+
+def singleflight_stats() -> Dict[str, Dict[str, int]]:
+    """Report counters for every coalescing group"""
+    with _groups_lock:
+        groups = list(_groups.values())
+    return {group.name: group.stats() for group in groups}
@@ -0,0 +1,43 @@
+"""
+SQLite helpers for stores shared between processes (gunicorn workers, CLI)
+"""
+import os
+import sqlite3
+import threading
+
+
+class SQLiteConnectionFactory:
+    """
+    Hands out one SQLite connection per thread and process.
+
+    Connections are opened in WAL mode with a busy timeout so several
+    gunicorn workers and CLI processes can read and write the same file.
+    A connection inherited across ``fork()`` is never reused.
+    """
+
+    def __init__(self, path: str, busy_timeout_ms: int = 5000):
+        self.path = path
+        self.busy_timeout_ms = busy_timeout_ms
+        self._local = threading.local()
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+    def connect(self) -> sqlite3.Connection:
+        """Return the connection for the calling thread, opening it if needed"""
+        conn = getattr(self._local, "conn", None)
+        if conn is not None and getattr(self._local, "pid", None) == os.getpid():
+            return conn
+
+        conn = sqlite3.connect(
+            self.path,
+            timeout=self.busy_timeout_ms / 1000,
+            isolation_level=None,
+            check_same_thread=False,
+        )
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute(f"PRAGMA busy_timeout={int(self.busy_timeout_ms)}")
+        self._local.conn = conn
+        self._local.pid = os.getpid()
+        return conn
@@ -2,115 +2,479 @@
 Tavily API integration tools
 """
 import os
+import asyncio
 import logging
+import threading
+import time
+import weakref
 import requests
+from requests.adapters import HTTPAdapter
 import json
-from typing import Dict, Any, List, Optional
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
 
 import config
+from utils.resilience import CircuitOpenError, get_upstream
+from utils.search_cache import get_search_cache, make_cache_key
+from utils.singleflight import get_singleflight
+from utils.tracing import span, text_bytes
+from utils import schema
+from utils.schema import SearchResponse, SearchResult
 
 logger = logging.getLogger(__name__)
 
+try:
+    import httpx
+except ImportError:
+    httpx = None
+
+try:
+    import h2  # noqa: F401  (required by httpx for HTTP/2)
+    HTTP2_AVAILABLE = httpx is not None
+except ImportError:
+    HTTP2_AVAILABLE = False
+
+
+class TavilyRequestError(Exception):
+    """Raised when the Tavily API cannot be reached or times out"""
+
+
+class TavilyHTTPError(TavilyRequestError):
+    """Raised when the Tavily API answers with an error status"""
+
+    def __init__(self, status_code: int, message: str, retry_after: Optional[str] = None):
+        super().__init__(message)
+        self.status_code = status_code
+        self.retry_after = retry_after
+
+
+def is_retryable_tavily_error(exc: BaseException) -> bool:
+    """Retry connection errors, timeouts, 408, 429 and 5xx responses"""
+    if isinstance(exc, TavilyHTTPError):
+        return exc.status_code in (408, 429) or exc.status_code >= 500
+    return isinstance(exc, TavilyRequestError)
+
+
+class TavilyClient:
+    """
+    Shared HTTP client for the Tavily API.
+
+    Keeps a pool of keep-alive connections with connect and read timeouts.
+    Uses httpx with HTTP/2 when ``httpx`` and ``h2`` are installed and
+    ``TAVILY_HTTP2`` is enabled, otherwise a pooled ``requests.Session``.
+    ``post_json`` serves sync callers and ``apost_json`` asyncio callers.
+    """
+
+    def __init__(
+        self,
+        url: str,
+        connect_timeout: float,
+        read_timeout: float,
+        pool_size: int,
+        http2: bool = True,
+    ):
+        self.url = url
+        self.connect_timeout = connect_timeout
+        self.read_timeout = read_timeout
+        self.pool_size = pool_size
+        self.http2 = http2 and HTTP2_AVAILABLE
+        self._lock = threading.Lock()
+        self._requests = 0
+        self._errors = 0
+        self._total_latency = 0.0
+        self._streams = set()
+        # One async client per event loop, dropped with its loop
+        self._async_clients = weakref.WeakKeyDictionary()
+
+        if self.http2:
+            self._client = httpx.Client(
+                http2=True,
+                timeout=self._httpx_timeout(),
+                limits=httpx.Limits(
+                    max_connections=pool_size,
+                    max_keepalive_connections=pool_size,
+                ),
+            )
+            self._session = None
+        else:
+            self._client = None
+            self._session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size, max_retries=0)
+            self._session.mount("http://", adapter)
+            self._session.mount("https://", adapter)
+
+    def _httpx_timeout(self):
+        """Build the httpx timeout from the configured connect/read timeouts"""
+        return httpx.Timeout(self.read_timeout, connect=self.connect_timeout)
+
+    def post_json(self, payload: Dict[str, Any], headers: Dict[str, str]) -> Dict[str, Any]:
+        """
+        POST a JSON payload and return the decoded JSON response
+
+        Args:
+            payload: Request body
+            headers: Request headers
+
+        Returns:
+            Decoded JSON response
+
+        Raises:
+            TavilyHTTPError: On an error status code
+            TavilyRequestError: On connection errors and timeouts
+        """
+        start = time.perf_counter()
+        try:
+            if self._client is not None:
+                response = self._client.post(self.url, json=payload, headers=headers)
+                self._track_stream(response)
+            else:
+                response = self._session.post(
+                    self.url,
+                    json=payload,
+                    headers=headers,
+                    timeout=(self.connect_timeout, self.read_timeout),
+                )
+        except (requests.exceptions.RequestException, *self._httpx_errors()) as e:
+            self._record(start, error=True)
+            raise TavilyRequestError(str(e)) from e
+        return self._finish(start, response)
+
+    async def apost_json(self, payload: Dict[str, Any], headers: Dict[str, str]) -> Dict[str, Any]:
+        """
+        Async variant of ``post_json`` for asyncio callers
+
+        Uses a pooled ``httpx.AsyncClient`` per event loop (closed when the
+        loop shuts down) when httpx is installed, otherwise runs the sync
+        client in a worker thread.
+        """
+        if httpx is None:
+            return await asyncio.to_thread(self.post_json, payload, headers)
+
+        client = await self._get_async_client()
+        start = time.perf_counter()
+        try:
+            response = await client.post(self.url, json=payload, headers=headers)
+            self._track_stream(response)
+        except httpx.HTTPError as e:
+            self._record(start, error=True)
+            raise TavilyRequestError(str(e)) from e
+        return self._finish(start, response)
+
+    async def _close_on_loop_shutdown(self, client) -> AsyncIterator[None]:
+        """
+        Close an async client when its event loop shuts down
+
+        Once started, the generator is tracked by the loop, and
+        ``loop.shutdown_asyncgens()`` (called by ``asyncio.run``) finalizes it
+        while the loop can still await the close.
+        """
+        try:
+            yield
+        finally:
+            with self._lock:
+                self._async_clients.pop(asyncio.get_running_loop(), None)
+            await client.aclose()
+
+    async def _get_async_client(self):
+        """Return the pooled async client bound to the running event loop"""
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            entry = self._async_clients.get(loop)
+            if entry is None:
+                client = httpx.AsyncClient(
+                    http2=self.http2,
+                    timeout=self._httpx_timeout(),
+                    limits=httpx.Limits(
+                        max_connections=self.pool_size,
+                        max_keepalive_connections=self.pool_size,
+                    ),
+                )
+                entry = self._async_clients[loop] = (client, self._close_on_loop_shutdown(client))
+            else:
+                client = None
+        if client is not None:
+            # Start the closer so the loop tracks it and finalizes it on shutdown
+            await entry[1].__anext__()
+        return entry[0]
+
+    @staticmethod
+    def _httpx_errors() -> Tuple[type, ...]:
+        """Exception types raised by httpx, if it is installed"""
+        return (httpx.HTTPError,) if httpx is not None else ()
+
+    def _finish(self, start: float, response) -> Dict[str, Any]:
+        """Record the request, raise on error statuses, otherwise decode the JSON body"""
+        if response.status_code >= 400:
+            self._record(start, error=True)
+            raise TavilyHTTPError(
+                response.status_code,
+                f"{response.status_code} error from Tavily API: {response.text[:200]}",
+                retry_after=response.headers.get("Retry-After"),
+            )
+        self._record(start)
+        return response.json()
+
+    def _track_stream(self, response) -> None:
+        """Remember which network connection served an httpx response"""
+        stream = response.extensions.get("network_stream")
+        if stream is not None:
+            with self._lock:
+                self._streams.add(id(stream))
+
+    def _record(self, start: float, error: bool = False) -> None:
+        """Record latency and outcome of one request"""
+        elapsed = time.perf_counter() - start
+        with self._lock:
+            self._requests += 1
+            self._total_latency += elapsed
+            if error:
+                self._errors += 1
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Report request counts, latency and connections opened
+
+        Returns:
+            Dictionary of client statistics
+        """
+        with self._lock:
+            requests_made = self._requests
+            stats = {
+                "transport": "httpx-h2" if self._client is not None else "requests",
+                "requests": requests_made,
+                "errors": self._errors,
+                "avg_latency_ms": (self._total_latency / requests_made * 1000) if requests_made else 0.0,
+            }
+            if self._session is not None:
+                stats["connections_opened"] = sum(
+                    adapter.poolmanager.pools[key].num_connections
+                    for adapter in set(self._session.adapters.values())
+                    for key in adapter.poolmanager.pools.keys()
+                )
+            else:
+                stats["connections_opened"] = len(self._streams)
+        return stats
+
+    def close(self) -> None:
+        """Close pooled connections"""
+        if self._client is not None:
+            self._client.close()
+        if self._session is not None:
+            self._session.close()
+
+
+_client: Optional[TavilyClient] = None
+_client_lock = threading.Lock()
+
+
+def get_tavily_client() -> TavilyClient:
+    """
+    Return the process-wide Tavily HTTP client
+
+    Returns:
+        The shared TavilyClient
+    """
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                _client = TavilyClient(
+                    config.TAVILY_API_URL,
+                    connect_timeout=config.TAVILY_CONNECT_TIMEOUT,
+                    read_timeout=config.TAVILY_READ_TIMEOUT,
+                    pool_size=config.TAVILY_POOL_SIZE,
+                    http2=config.TAVILY_HTTP2,
+                )
+    return _client
+
+
+def _tavily_upstream():
+    """Rate limiter, retry policy and circuit breaker shared by all Tavily searches"""
+    return get_upstream("tavily", retryable=is_retryable_tavily_error)
+
+
+def _validate_params(search_depth: str, max_results: int) -> Tuple[str, int]:
+    """Clamp search parameters to values the API accepts"""
+    if search_depth not in ["quick", "moderate", "comprehensive"]:
+        search_depth = "moderate"
+
+    if max_results < 1 or max_results > 10:
+        max_results = 5
+
+    return search_depth, max_results
+
+
+def _build_request(query: str, search_depth: str, max_results: int) -> Tuple[Dict[str, str], Dict[str, Any]]:
+    """Build headers and payload for a Tavily search"""
+    headers = {
+        "content-type": "application/json",
+        "x-api-key": config.TAVILY_API_KEY
+    }
+    payload = {
+        "query": query,
+        "search_depth": search_depth,
+        "max_results": max_results,
+        "include_domains": [],
+        "exclude_domains": []
+    }
+    return headers, payload
+
+
+def _store_response(results: Dict[str, Any], cache, cache_key: str, query: str) -> SearchResponse:
+    """Convert a decoded Tavily response to a SearchResponse and store it in the cache"""
+    response = SearchResponse.from_dict(results)
+    response.query = query
+
+    if cache is not None:
+        cache.set(cache_key, query, schema.dumps(response).decode("utf-8"))
+
+    logger.info(f"Tavily search returned {len(response.results)} results")
+    return response
+
+
+def _handle_error(e: Exception, query: str) -> SearchResponse:
+    """Turn a failed search into an error response for the agents"""
+    if isinstance(e, (TavilyRequestError, CircuitOpenError)):
+        logger.error(f"Tavily API request failed: {str(e)}")
+        return SearchResponse(query=query, error=f"Tavily search failed: {str(e)}")
+
+    logger.exception(f"Unexpected error in Tavily search: {str(e)}")
+    return SearchResponse(query=query, error=str(e))
+
+
+def _cached_or_mock(query: str, search_depth: str, max_results: int):
+    """
+    Resolve a search without the network if possible
+
+    Returns:
+        Tuple of (SearchResponse or None, cache, cache_key)
+    """
+    # Check if we're using a dummy key for development
+    if config.TAVILY_API_KEY == "dummy_tavily_api_key":
+        logger.warning("Using dummy Tavily API key. Returning mock results.")
+        return _mock_tavily_results(query), None, ""
+
+    # Serve repeated searches from the shared cache
+    cache = get_search_cache()
+    cache_key = make_cache_key(query, search_depth=search_depth, max_results=max_results)
+    if cache is not None:
+        cached = cache.get(cache_key)
+        if cached is not None:
+            logger.info(f"Tavily cache hit for: {query}")
+            return SearchResponse.from_dict(schema.loads(cached)), cache, cache_key
+
+    return None, cache, cache_key
+
+
+def search_tavily_results(query: str, search_depth: str = "moderate", max_results: int = 5) -> SearchResponse:
+    """
+    Search the web using Tavily API and return typed results
+
+    Args:
+        query: The search query
+        search_depth: The depth of the search (quick, moderate, comprehensive)
+        max_results: Maximum number of results to return
+
+    Returns:
+        SearchResponse with the results, or with 'error' set if the search failed
+    """
+    logger.info(f"Searching Tavily for: {query}")
+    search_depth, max_results = _validate_params(search_depth, max_results)
+
+    # Concurrent identical searches share one upstream call
+    key = make_cache_key(query, search_depth=search_depth, max_results=max_results)
+    return get_singleflight("search").do(key, _search, query, search_depth, max_results)
+
+
 def search_tavily(query: str, search_depth: str = "moderate", max_results: int = 5) -> str:
     """
     Search the web using Tavily API
-    
+
     Args:
         query: The search query
         search_depth: The depth of the search (quick, moderate, comprehensive)
         max_results: Maximum number of results to return
-        
+
     Returns:
-        JSON string containing search results
+        JSON string containing search results (for LLM tool use)
+    """
+    return json.dumps(search_tavily_results(query, search_depth, max_results).to_dict(), indent=2)
+
+
+def _search(query: str, search_depth: str, max_results: int) -> SearchResponse:
+    """Run one search through the cache and the shared HTTP client"""
+    try:
+        response, cache, cache_key = _cached_or_mock(query, search_depth, max_results)
+        if response is not None:
+            return response
+
+        headers, payload = _build_request(query, search_depth, max_results)
+        with span("tavily_search") as stage:
+            results = _tavily_upstream().call(get_tavily_client().post_json, payload, headers)
+            response = _store_response(results, cache, cache_key, query)
+            stage.payload_bytes = sum(text_bytes(result.content) for result in response.results)
+        return response
+    except Exception as e:
+        return _handle_error(e, query)
+
+
+async def asearch_tavily_results(query: str, search_depth: str = "moderate", max_results: int = 5) -> SearchResponse:
+    """
+    Async variant of ``search_tavily_results`` sharing the same client pool and cache
+
+    Args:
+        query: The search query
+        search_depth: The depth of the search (quick, moderate, comprehensive)
+        max_results: Maximum number of results to return
+
+    Returns:
+        SearchResponse with the results, or with 'error' set if the search failed
     """
     logger.info(f"Searching Tavily for: {query}")
-    
-    # Validate parameters
-    if search_depth not in ["quick", "moderate", "comprehensive"]:
-        search_depth = "moderate"
-    
-    if max_results < 1 or max_results > 10:
-        max_results = 5
-    
+    search_depth, max_results = _validate_params(search_depth, max_results)
+
     try:
-        # Get API key from config
-        api_key = config.TAVILY_API_KEY
-        
-        # Check if we're using a dummy key for development
-        if api_key == "dummy_tavily_api_key":
-            logger.warning("Using dummy Tavily API key. Returning mock results.")
-            return _mock_tavily_results(query)
-        
-        # Prepare the API request
-        url = "https://api.tavily.com/search"
-        headers = {
-            "content-type": "application/json",
-            "x-api-key": api_key
-        }
-        payload = {
-            "query": query,
-            "search_depth": search_depth,
-            "max_results": max_results,
-            "include_domains": [],
-            "exclude_domains": []
-        }
-        
-        # Make the request
-        response = requests.post(url, headers=headers, json=payload)
-        response.raise_for_status()
-        
-        # Process response
-        results = response.json()
-        
-        # Format results as a string for the agent
-        formatted_results = json.dumps(results, indent=2)
-        
-        logger.info(f"Tavily search returned {len(results.get('results', []))} results")
-        return formatted_results
-        
-    except requests.exceptions.RequestException as e:
-        logger.error(f"Tavily API request failed: {str(e)}")
-        error_message = f"Tavily search failed: {str(e)}"
-        
-        # If we're hitting rate limits or the API is down, use mock results as fallback
-        if isinstance(e, requests.exceptions.HTTPError) and (e.response.status_code == 429 or e.response.status_code >= 500):
-            logger.warning("Using mock results as fallback due to API error")
-            return _mock_tavily_results(query)
-        
-        return json.dumps({"error": error_message, "results": []})
+        response, cache, cache_key = _cached_or_mock(query, search_depth, max_results)
+        if response is not None:
+            return response
+
+        headers, payload = _build_request(query, search_depth, max_results)
+        with span("tavily_search") as stage:
+            results = await _tavily_upstream().acall(get_tavily_client().apost_json, payload, headers)
+            response = _store_response(results, cache, cache_key, query)
+            stage.payload_bytes = sum(text_bytes(result.content) for result in response.results)
+        return response
     except Exception as e:
-        logger.exception(f"Unexpected error in Tavily search: {str(e)}")
-        return json.dumps({"error": str(e), "results": []})
+        return _handle_error(e, query)
+
+
+async def asearch_tavily(query: str, search_depth: str = "moderate", max_results: int = 5) -> str:
+    """Async variant of ``search_tavily`` returning a JSON string"""
+    response = await asearch_tavily_results(query, search_depth, max_results)
+    return json.dumps(response.to_dict(), indent=2)
+
 
-def _mock_tavily_results(query: str) -> str:
+def _mock_tavily_results(query: str) -> SearchResponse:
     """Generate mock Tavily results for development/testing"""
-    mock_results = {
-        "query": query,
-        "results": [
-            {
-                "title": f"Information about {query}",
-                "url": "https://example.com/article1",
-                "content": f"This is some mock content about {query}. This is provided as a development placeholder when the Tavily API is not available.",
-                "score": 0.95
-            },
-            {
-                "title": f"{query} research and analysis",
-                "url": "https://example.com/article2",
-                "content": f"Here is a detailed analysis of {query}. This is mock content for development purposes only.",
-                "score": 0.85
-            },
-            {
-                "title": f"Understanding {query}: A comprehensive guide",
-                "url": "https://example.com/guide",
-                "content": f"A comprehensive guide to understanding {query} and its implications. This is mock content for development purposes.",
-                "score": 0.75
-            }
-        ],
-        "metadata": {
-            "search_depth": "moderate",
-            "max_results": 3,
-            "search_id": "mock-search-id"
-        }
-    }
-    
-    return json.dumps(mock_results, indent=2)
+    return SearchResponse(
+        query=query,
+        results=[
+            SearchResult(
+                title=f"Information about {query}",
+                url="https://example.com/article1",
+                content=f"This is some mock content about {query}. This is provided as a development placeholder when the Tavily API is not available.",
+                score=0.95
+            ),
+            SearchResult(
+                title=f"{query} research and analysis",
+                url="https://example.com/article2",
+                content=f"Here is a detailed analysis of {query}. This is mock content for development purposes only.",
+                score=0.85
+            ),
+            SearchResult(
+                title=f"Understanding {query}: A comprehensive guide",
+                url="https://example.com/guide",
+                content=f"A comprehensive guide to understanding {query} and its implications. This is mock content for development purposes.",
+                score=0.75
+            )
+        ]
+    )
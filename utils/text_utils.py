@@ -0,0 +1,37 @@
+"""
+Text helper functions shared across the research pipeline
+"""
+import re
+import unicodedata
+
+_WHITESPACE_RE = re.compile(r"\s+")
+
+
+def normalize_query(query: str) -> str:
+    """
+    Normalize a query so trivially different spellings share cache keys
+
+    Args:
+        query: The raw query text
+
+    Returns:
+        Lower-cased, whitespace-collapsed query without trailing punctuation
+    """
+    text = unicodedata.normalize("NFKC", query or "")
+    text = _WHITESPACE_RE.sub(" ", text).strip().lower()
+    return text.rstrip("?!. ")
+
+
+def estimate_tokens(text: str) -> int:
+    """
+    Roughly estimate the number of LLM tokens in a text
+
+    Args:
+        text: The text to measure
+
+    Returns:
+        Estimated token count (about four characters per token)
+    """
+    if not text:
+        return 0
+    return max(1, len(text) // 4)
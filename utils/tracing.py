@@ -0,0 +1,208 @@
+"""
+Per-stage timing spans and Prometheus histograms for the research pipeline
+"""
+import contextvars
+import math
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Optional, Sequence
+
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304)
+TOKEN_BUCKETS = (16, 64, 256, 1024, 4096, 16384, 65536)
+
+
+class Histogram:
+    """
+    Prometheus histogram with one label ("stage").
+
+    Keeps cumulative bucket counts, a sum and a count per label value and
+    renders them in the Prometheus text exposition format.
+    """
+
+    def __init__(self, name: str, help_text: str, buckets: Sequence[float]):
+        self.name = name
+        self.help_text = help_text
+        self.buckets = tuple(buckets)
+        self._series: Dict[str, List[float]] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, stage: str, value: float) -> None:
+        """Record one observation for a stage"""
+        with self._lock:
+            series = self._series.get(stage)
+            if series is None:
+                # Bucket counts, then +Inf, sum and count
+                series = self._series[stage] = [0.0] * (len(self.buckets) + 3)
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series[i] += 1
+            series[-3] += 1
+            series[-2] += value
+            series[-1] += 1
+
+    def render(self) -> str:
+        """Render the histogram in the Prometheus text format"""
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            series = {stage: list(values) for stage, values in self._series.items()}
+        for stage in sorted(series):
+            values = series[stage]
+            for bound, count in zip(self.buckets, values):
+                lines.append(f'{self.name}_bucket{{stage="{stage}",le="{_format(bound)}"}} {_format(count)}')
+            lines.append(f'{self.name}_bucket{{stage="{stage}",le="+Inf"}} {_format(values[-3])}')
+            lines.append(f'{self.name}_sum{{stage="{stage}"}} {_format(values[-2])}')
+            lines.append(f'{self.name}_count{{stage="{stage}"}} {_format(values[-1])}')
+        return "\n".join(lines) + "\n"
+
+
+def _format(value: float) -> str:
+    """Format a sample value the way Prometheus clients do"""
+    if math.isinf(value):
+        return "+Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+STAGE_DURATION = Histogram(
+    "deepsearch_stage_duration_seconds", "Time spent in each pipeline stage", DURATION_BUCKETS
+)
+STAGE_PAYLOAD = Histogram(
+    "deepsearch_stage_payload_bytes", "Payload size handled by each pipeline stage", SIZE_BUCKETS
+)
+STAGE_TOKENS = Histogram(
+    "deepsearch_stage_tokens", "LLM tokens (input plus output) used by each pipeline stage", TOKEN_BUCKETS
+)
+_HISTOGRAMS = (STAGE_DURATION, STAGE_PAYLOAD, STAGE_TOKENS)
+
+
+class Span:
+    """One timed stage; set ``payload_bytes`` and ``tokens`` while it runs"""
+
+    __slots__ = ("stage", "payload_bytes", "tokens", "duration")
+
+    def __init__(self, stage: str):
+        self.stage = stage
+        self.payload_bytes: Optional[int] = None
+        self.tokens: Optional[int] = None
+        self.duration = 0.0
+
+
+class Trace:
+    """
+    Collects the spans of one request for a per-stage timing breakdown.
+
+    Spans may finish on worker threads (e.g. fanned-out searches), so
+    recording is locked.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._stages: Dict[str, Dict[str, Any]] = {}
+        self.started = time.perf_counter()
+
+    def record(self, span: Span) -> None:
+        """Add a finished span to the breakdown"""
+        with self._lock:
+            stage = self._stages.setdefault(span.stage, {
+                "count": 0, "total_ms": 0.0, "max_ms": 0.0, "payload_bytes": 0, "tokens": 0,
+            })
+            elapsed_ms = span.duration * 1000
+            stage["count"] += 1
+            stage["total_ms"] += elapsed_ms
+            stage["max_ms"] = max(stage["max_ms"], elapsed_ms)
+            stage["payload_bytes"] += span.payload_bytes or 0
+            stage["tokens"] += span.tokens or 0
+
+    def breakdown(self) -> Dict[str, Any]:
+        """
+        Summarize the trace
+
+        Returns:
+            Dictionary with 'total_ms' and per-stage 'stages' (count, total_ms,
+            max_ms, payload_bytes, tokens)
+        """
+        with self._lock:
+            stages = {
+                name: dict(values, total_ms=round(values["total_ms"], 1), max_ms=round(values["max_ms"], 1))
+                for name, values in self._stages.items()
+            }
+        return {"total_ms": round((time.perf_counter() - self.started) * 1000, 1), "stages": stages}
+
+
+_current_trace: contextvars.ContextVar[Optional[Trace]] = contextvars.ContextVar("trace", default=None)
+
+
+@contextmanager
+def start_trace() -> Iterator[Trace]:
+    """Collect the spans of the enclosed code (and threads started with ``copy_context``)"""
+    trace = Trace()
+    token = _current_trace.set(trace)
+    try:
+        yield trace
+    finally:
+        _current_trace.reset(token)
+
+
+@contextmanager
+def span(stage: str) -> Iterator[Span]:
+    """
+    Time a pipeline stage
+
+    The duration, and the payload size and token count if set on the span,
+    go to the Prometheus histograms and to the current trace, if any.
+    Failed stages are recorded too.
+
+    Args:
+        stage: Stage name, e.g. "tavily_search" or "drafting_llm"
+    """
+    current = Span(stage)
+    start = time.perf_counter()
+    try:
+        yield current
+    finally:
+        current.duration = time.perf_counter() - start
+        _observe(current)
+
+
+def record_span(stage: str, duration: float, payload_bytes: Optional[int] = None,
+                tokens: Optional[int] = None) -> None:
+    """
+    Record a stage timed by the caller, e.g. work interleaved with another stage
+
+    Args:
+        stage: Stage name
+        duration: Seconds spent in the stage
+        payload_bytes: Optional payload size
+        tokens: Optional token count
+    """
+    current = Span(stage)
+    current.duration = duration
+    current.payload_bytes = payload_bytes
+    current.tokens = tokens
+    _observe(current)
+
+
+def _observe(current: Span) -> None:
+    """Send a finished span to the histograms and the current trace"""
+    STAGE_DURATION.observe(current.stage, current.duration)
+    if current.payload_bytes is not None:
+        STAGE_PAYLOAD.observe(current.stage, current.payload_bytes)
+    if current.tokens is not None:
+        STAGE_TOKENS.observe(current.stage, current.tokens)
+    trace = _current_trace.get()
+    if trace is not None:
+        trace.record(current)
+
+
+def render_metrics() -> str:
+    """Render every pipeline histogram in the Prometheus text format"""
+    return "".join(histogram.render() for histogram in _HISTOGRAMS)
+
+
+def text_bytes(text: Any) -> int:
+    """UTF-8 size of a text payload"""
+    return len(str(text).encode("utf-8"))
+
@@ -0,0 +1,95 @@
+"""
+Thread-safe accounting of upstream calls and tokens for one workflow run
+"""
+import threading
+from typing import Any, Dict, Tuple
+
+from utils.text_utils import estimate_tokens
+
+
+def llm_token_counts(prompt: str, response: Any) -> Tuple[int, int]:
+    """
+    Count the tokens of one LLM call, preferring the counts reported by the model
+
+    Args:
+        prompt: The prompt sent to the model
+        response: The model response (a LangChain message or plain text)
+
+    Returns:
+        Tuple of (input tokens, output tokens)
+    """
+    metadata = getattr(response, "usage_metadata", None) or {}
+    content = getattr(response, "content", response)
+    input_tokens = metadata.get("input_tokens") or estimate_tokens(prompt)
+    output_tokens = metadata.get("output_tokens") or estimate_tokens(str(content))
+    return input_tokens, output_tokens
+
+
+class UsageTracker:
+    """
+    Counts search calls, LLM calls and LLM tokens for a single run.
+
+    One tracker is created per workflow run and passed down to the agents,
+    which are shared between requests and therefore keep no counters of
+    their own. Arbitrary extra counters can be recorded with ``add``.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counters: Dict[str, int] = {
+            "search_calls": 0,
+            "llm_calls": 0,
+            "input_tokens": 0,
+            "output_tokens": 0,
+        }
+
+    @classmethod
+    def from_snapshot(cls, counters: Dict[str, int]) -> "UsageTracker":
+        """Rebuild a tracker from ``snapshot`` output (e.g. counters restored from a checkpoint)"""
+        tracker = cls()
+        for name, value in counters.items():
+            if name != "total_tokens":
+                tracker.add(name, value)
+        return tracker
+
+    def add(self, name: str, amount: int = 1) -> None:
+        """Increment a counter"""
+        with self._lock:
+            self._counters[name] = self._counters.get(name, 0) + amount
+
+    def record_search(self, count: int = 1) -> None:
+        """Record search API calls"""
+        self.add("search_calls", count)
+
+    def record_llm(self, prompt: str, response: Any) -> None:
+        """
+        Record one LLM call, preferring the token counts reported by the model
+
+        Args:
+            prompt: The prompt sent to the model
+            response: The model response (a LangChain message or plain text)
+        """
+        input_tokens, output_tokens = llm_token_counts(prompt, response)
+        with self._lock:
+            self._counters["llm_calls"] += 1
+            self._counters["input_tokens"] += input_tokens
+            self._counters["output_tokens"] += output_tokens
+
+    @property
+    def api_calls(self) -> int:
+        """Total upstream calls (searches plus LLM calls)"""
+        with self._lock:
+            return self._counters["search_calls"] + self._counters["llm_calls"]
+
+    @property
+    def total_tokens(self) -> int:
+        """Total LLM tokens, input plus output"""
+        with self._lock:
+            return self._counters["input_tokens"] + self._counters["output_tokens"]
+
+    def snapshot(self) -> Dict[str, int]:
+        """Return a copy of all counters, including total_tokens"""
+        with self._lock:
+            counters = dict(self._counters)
+        counters["total_tokens"] = counters["input_tokens"] + counters["output_tokens"]
+        return counters
@@ -0,0 +1,320 @@
+"""
+Background write-behind queue for result files
+"""
+import atexit
+import logging
+import os
+import queue
+import tempfile
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional
+
+import config
+from utils.tracing import span
+
+logger = logging.getLogger(__name__)
+
+
+def atomic_write(path: str, data: bytes, fsync: bool = False) -> None:
+    """
+    Write a file via a temporary file in the same directory and a rename
+
+    Readers see either the old file or the complete new one, never a
+    partial write.
+
+    Args:
+        path: Destination path
+        data: File contents
+        fsync: Whether to fsync the temporary file before renaming it
+    """
+    directory = os.path.dirname(path) or "."
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=f".{os.path.basename(path)}.", suffix=".tmp")
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(data)
+            if fsync:
+                f.flush()
+                os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+    except BaseException:
+        try:
+            os.unlink(tmp_path)
+        except OSError:
+            pass
+        raise
+
+
+class WriteBehindQueue:
+    """
+    Writes files on a background thread so callers don't wait for the disk.
+
+    ``submit`` queues the contents and returns at once. The writer thread
+    takes whatever has queued up (up to ``max_batch`` files), writes each
+    one atomically and records the batch as a ``file_flush`` span. Files
+    still waiting to be written can be read back with ``pending``. When the
+    queue is full, ``submit`` blocks until the writer catches up.
+
+    A file that can't be written is never dropped: it stays readable through
+    ``pending`` and is retried every ``retry_interval`` seconds until it is
+    written or superseded by a newer submit for the same path.
+
+    A submit can pass ``on_written``, which the writer thread calls once the
+    path's latest submitted contents are on disk.
+    """
+
+    def __init__(self, max_batch: int, max_queue: int, fsync: bool = False,
+                 retry_interval: float = 5.0):
+        self.max_batch = max(1, max_batch)
+        self.fsync = fsync
+        self.retry_interval = retry_interval
+        self._queue: "queue.Queue[tuple]" = queue.Queue(maxsize=max_queue)
+        self._pending: Dict[str, bytes] = {}
+        # Files whose write failed, by path, still held in _pending
+        self._failed: Dict[str, bytes] = {}
+        # Callbacks waiting for a path's latest contents to be written
+        self._callbacks: Dict[str, List[Callable[[], None]]] = {}
+        self._lock = threading.Lock()
+        self._counters = {
+            "submitted": 0,
+            "written": 0,
+            "failed": 0,
+            "retried": 0,
+            "batches": 0,
+            "max_depth": 0,
+        }
+        self._flush_ms_total = 0.0
+        self._flush_ms_max = 0.0
+        self._lag_ms_max = 0.0
+        self._thread = threading.Thread(target=self._run, name="write-behind", daemon=True)
+        self._thread.start()
+
+    def submit(self, path: str, data: bytes, on_written: Optional[Callable[[], None]] = None) -> str:
+        """
+        Queue a file for writing
+
+        Args:
+            path: Destination path
+            data: File contents
+            on_written: Called on the writer thread once the file is on disk
+
+        Returns:
+            The destination path
+        """
+        with self._lock:
+            self._pending[path] = data
+            if on_written is not None:
+                self._callbacks.setdefault(path, []).append(on_written)
+            self._counters["submitted"] += 1
+        self._queue.put((path, data, time.perf_counter()))
+        depth = self._queue.qsize()
+        with self._lock:
+            self._counters["max_depth"] = max(self._counters["max_depth"], depth)
+        return path
+
+    def pending(self, path: str) -> Optional[bytes]:
+        """Contents of a file that is queued but not yet on disk, else None"""
+        with self._lock:
+            return self._pending.get(path)
+
+    def _run(self) -> None:
+        while True:
+            with self._lock:
+                timeout = self.retry_interval if self._failed else None
+            try:
+                first = self._queue.get(timeout=timeout)
+            except queue.Empty:
+                self._retry_failed()
+                continue
+            batch = [first]
+            while len(batch) < self.max_batch:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            try:
+                self._write_batch(batch)
+            finally:
+                for _ in batch:
+                    self._queue.task_done()
+
+    def _write_batch(self, batch: list) -> None:
+        """Write one group of queued files"""
+        start = time.perf_counter()
+        written = failed = 0
+        callbacks = []
+        with span("file_flush") as stage:
+            stage.payload_bytes = sum(len(data) for _, data, _ in batch)
+            for path, data, submitted_at in batch:
+                try:
+                    atomic_write(path, data, self.fsync)
+                    written += 1
+                    ok = True
+                except Exception as e:
+                    failed += 1
+                    ok = False
+                    logger.error(f"Error writing {path}, keeping it queued for retry: {str(e)}")
+                with self._lock:
+                    # A newer submit for the same path keeps its own pending copy
+                    current = self._pending.get(path) is data
+                    if ok:
+                        self._failed.pop(path, None)
+                        if current:
+                            del self._pending[path]
+                            callbacks.extend(self._callbacks.pop(path, ()))
+                    elif current:
+                        self._failed[path] = data
+                    self._lag_ms_max = max(self._lag_ms_max, (time.perf_counter() - submitted_at) * 1000)
+        elapsed_ms = (time.perf_counter() - start) * 1000
+        with self._lock:
+            self._counters["written"] += written
+            self._counters["failed"] += failed
+            self._counters["batches"] += 1
+            self._flush_ms_total += elapsed_ms
+            self._flush_ms_max = max(self._flush_ms_max, elapsed_ms)
+        self._notify(callbacks)
+
+    def _retry_failed(self) -> None:
+        """Try again to write files whose earlier write failed"""
+        with self._lock:
+            retry = list(self._failed.items())
+        for path, data in retry:
+            try:
+                atomic_write(path, data, self.fsync)
+            except Exception as e:
+                logger.error(f"Retrying write of {path} failed: {str(e)}")
+                continue
+            with self._lock:
+                self._counters["retried"] += 1
+                if self._failed.get(path) is data:
+                    del self._failed[path]
+                callbacks = []
+                if self._pending.get(path) is data:
+                    del self._pending[path]
+                    callbacks = self._callbacks.pop(path, [])
+            logger.info(f"Wrote {path} on retry")
+            self._notify(callbacks)
+
+    @staticmethod
+    def _notify(callbacks: List[Callable[[], None]]) -> None:
+        """Run on_written callbacks, logging rather than raising their errors"""
+        for callback in callbacks:
+            try:
+                callback()
+            except Exception as e:
+                logger.error(f"Write-behind callback failed: {str(e)}")
+
+    def flush(self) -> None:
+        """
+        Block until every queued file has been written
+
+        Files whose write keeps failing are retried once more here and
+        logged if they still can't be written.
+        """
+        self._queue.join()
+        with self._lock:
+            has_failed = bool(self._failed)
+        if has_failed:
+            self._retry_failed()
+            with self._lock:
+                stranded = list(self._failed)
+            if stranded:
+                logger.error(f"{len(stranded)} files could not be written: {', '.join(stranded)}")
+
+    def stats(self) -> Dict[str, Any]:
+        """Report queue depth, write counters and flush latency"""
+        with self._lock:
+            stats = dict(self._counters)
+            batches = stats["batches"]
+            stats["avg_flush_ms"] = round(self._flush_ms_total / batches, 2) if batches else 0.0
+            stats["max_flush_ms"] = round(self._flush_ms_max, 2)
+            stats["max_lag_ms"] = round(self._lag_ms_max, 2)
+            stats["awaiting_retry"] = len(self._failed)
+        stats["depth"] = self._queue.qsize()
+        return stats
+
+
+_write_queue: Optional[WriteBehindQueue] = None
+_write_queue_lock = threading.Lock()
+
+
+def get_write_queue() -> Optional[WriteBehindQueue]:
+    """
+    Return the process-wide write-behind queue
+
+    The queue is flushed at interpreter exit.
+
+    Returns:
+        The shared WriteBehindQueue, or None if write-behind is disabled
+    """
+    global _write_queue
+    if not config.WRITE_BEHIND_ENABLED:
+        return None
+    if _write_queue is None:
+        with _write_queue_lock:
+            if _write_queue is None:
+                _write_queue = WriteBehindQueue(
+                    config.WRITE_BEHIND_MAX_BATCH,
+                    config.WRITE_BEHIND_MAX_QUEUE,
+                    config.WRITE_BEHIND_FSYNC,
+                )
+                atexit.register(_write_queue.flush)
+    return _write_queue
+
+
+def write_file(path: str, data: bytes, on_written: Optional[Callable[[], None]] = None) -> str:
+    """
+    Write a file through the write-behind queue, or atomically in place if it is disabled
+
+    Args:
+        path: Destination path
+        data: File contents
+        on_written: Called once the file is on disk (right away if
+            write-behind is disabled, otherwise on the writer thread)
+
+    Returns:
+        The destination path
+    """
+    write_queue = get_write_queue()
+    if write_queue is None:
+        atomic_write(path, data, config.WRITE_BEHIND_FSYNC)
+        if on_written is not None:
+            on_written()
+        return path
+    return write_queue.submit(path, data, on_written)
+
+
+def read_file(path: str) -> bytes:
+    """
+    Read a file, including one still waiting in the write-behind queue
+
+    Raises:
+        OSError: If the file is neither queued nor on disk
+    """
+    write_queue = _write_queue
+    if write_queue is not None:
+        data = write_queue.pending(path)
+        if data is not None:
+            return data
+    with open(path, 'rb') as f:
+        return f.read()
+
+
+def is_pending(path: str) -> bool:
+    """Check whether a file is waiting in the write-behind queue"""
+    write_queue = _write_queue
+    return write_queue is not None and write_queue.pending(path) is not None
+
+
+def flush_writes() -> None:
+    """Block until queued writes are on disk (no-op if write-behind is disabled)"""
+    if _write_queue is not None:
+        _write_queue.flush()
+
+
+def write_behind_stats() -> Dict[str, Any]:
+    """Report write-behind queue stats, or that it is disabled"""
+    write_queue = _write_queue
+    if write_queue is None:
+        return {"enabled": config.WRITE_BEHIND_ENABLED, "started": False}
+    return dict(write_queue.stats(), enabled=True, started=True)
@@ -0,0 +1,384 @@
+"""
+Asynchronous research jobs backed by a bounded worker pool
+"""
+import json
+import logging
+import os
+import threading
+import time
+import uuid
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import config
+from utils.sqlite_utils import SQLiteConnectionFactory
+
+logger = logging.getLogger(__name__)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id TEXT PRIMARY KEY,
+    query TEXT NOT NULL,
+    status TEXT NOT NULL,
+    created_at REAL NOT NULL,
+    started_at REAL,
+    finished_at REAL,
+    result TEXT,
+    error TEXT,
+    cancel_requested INTEGER NOT NULL DEFAULT 0,
+    worker_pid INTEGER
+);
+CREATE INDEX IF NOT EXISTS idx_jobs_created_at ON jobs (created_at);
+CREATE INDEX IF NOT EXISTS idx_jobs_status ON jobs (status);
+"""
+
+QUEUED = "queued"
+RUNNING = "running"
+SUCCEEDED = "succeeded"
+FAILED = "failed"
+CANCELLED = "cancelled"
+
+
+class QueueFullError(Exception):
+    """Raised when the job queue cannot accept more work"""
+
+
+def _pid_alive(pid: Optional[int]) -> bool:
+    """Check whether a process with this ID is running"""
+    if not pid:
+        return False
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+class JobStore:
+    """
+    SQLite-backed job records shared by every worker process.
+
+    Any gunicorn worker can look up a job's status and result, even if a
+    different worker is running it.
+    """
+
+    def __init__(self, path: str):
+        self._connections = SQLiteConnectionFactory(path)
+        self._connections.connect().executescript(_SCHEMA)
+
+    def create(self, query: str) -> str:
+        """Insert a queued job and return its ID"""
+        job_id = uuid.uuid4().hex
+        self._connections.connect().execute(
+            "INSERT INTO jobs (id, query, status, created_at, worker_pid) VALUES (?, ?, ?, ?, ?)",
+            (job_id, query, QUEUED, time.time(), os.getpid()),
+        )
+        return job_id
+
+    def mark_running(self, job_id: str) -> bool:
+        """
+        Move a queued job to running
+
+        Returns:
+            False if the job was cancelled before it started
+        """
+        cursor = self._connections.connect().execute(
+            "UPDATE jobs SET status = ?, started_at = ? "
+            "WHERE id = ? AND status = ? AND cancel_requested = 0",
+            (RUNNING, time.time(), job_id, QUEUED),
+        )
+        return cursor.rowcount == 1
+
+    def finish(self, job_id: str, status: str, result: Optional[Dict[str, Any]] = None,
+               error: Optional[str] = None) -> None:
+        """Record the final state of a job"""
+        self._connections.connect().execute(
+            "UPDATE jobs SET status = ?, finished_at = ?, result = ?, error = ? WHERE id = ?",
+            (status, time.time(), json.dumps(result) if result is not None else None, error, job_id),
+        )
+
+    def request_cancel(self, job_id: str) -> Optional[str]:
+        """
+        Flag a job for cancellation; queued jobs are cancelled immediately
+
+        Returns:
+            The job status after the request, or None if the job doesn't exist
+        """
+        conn = self._connections.connect()
+        conn.execute(
+            "UPDATE jobs SET status = ?, finished_at = ?, cancel_requested = 1 "
+            "WHERE id = ? AND status = ?",
+            (CANCELLED, time.time(), job_id, QUEUED),
+        )
+        conn.execute(
+            "UPDATE jobs SET cancel_requested = 1 WHERE id = ? AND status = ?",
+            (job_id, RUNNING),
+        )
+        row = conn.execute("SELECT status FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return row[0] if row else None
+
+    def orphaned(self) -> List[Tuple[str, str, str, Optional[int]]]:
+        """
+        Find unfinished jobs whose worker process has exited
+
+        A job owned by the calling process counts as orphaned too: this is
+        only called while the process starts its queue, before it owns any
+        jobs, so such a job belongs to an earlier process that had the same ID.
+
+        Returns:
+            List of (job ID, query, status, worker PID) tuples
+        """
+        rows = self._connections.connect().execute(
+            "SELECT id, query, status, worker_pid FROM jobs WHERE status IN (?, ?)",
+            (QUEUED, RUNNING),
+        ).fetchall()
+        return [row for row in rows if row[3] == os.getpid() or not _pid_alive(row[3])]
+
+    def claim(self, job_id: str, old_pid: Optional[int], status: str) -> bool:
+        """
+        Take over an orphaned job, requeuing it for this process
+
+        Returns:
+            False if another process claimed or finished it first
+        """
+        cursor = self._connections.connect().execute(
+            "UPDATE jobs SET status = ?, started_at = NULL, worker_pid = ? "
+            "WHERE id = ? AND status = ? AND worker_pid IS ?",
+            (QUEUED, os.getpid(), job_id, status, old_pid),
+        )
+        return cursor.rowcount == 1
+
+    def prune(self, max_age_seconds: float) -> int:
+        """
+        Delete finished jobs older than ``max_age_seconds``
+
+        Returns:
+            Number of jobs deleted
+        """
+        cursor = self._connections.connect().execute(
+            "DELETE FROM jobs WHERE status IN (?, ?, ?) AND finished_at < ?",
+            (SUCCEEDED, FAILED, CANCELLED, time.time() - max_age_seconds),
+        )
+        return cursor.rowcount
+
+    def cancel_requested(self, job_id: str) -> bool:
+        """Check whether cancellation was requested for a job"""
+        row = self._connections.connect().execute(
+            "SELECT cancel_requested FROM jobs WHERE id = ?", (job_id,)
+        ).fetchone()
+        return bool(row and row[0])
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """
+        Look up a job
+
+        Returns:
+            Job record with the decoded result, or None if it doesn't exist
+        """
+        row = self._connections.connect().execute(
+            "SELECT id, query, status, created_at, started_at, finished_at, result, error "
+            "FROM jobs WHERE id = ?",
+            (job_id,),
+        ).fetchone()
+        if row is None:
+            return None
+        job_id, query, status, created_at, started_at, finished_at, result, error = row
+        return {
+            "job_id": job_id,
+            "query": query,
+            "status": status,
+            "created_at": created_at,
+            "started_at": started_at,
+            "finished_at": finished_at,
+            "result": json.loads(result) if result else None,
+            "error": error,
+        }
+
+
+class JobQueue:
+    """
+    Runs research jobs on a fixed pool of worker threads.
+
+    At most ``max_workers`` jobs run at once and at most ``max_queued``
+    more wait for a worker; ``submit`` raises QueueFullError beyond that so
+    callers can apply backpressure instead of piling up requests.
+
+    Finished jobs older than ``retention_seconds`` are deleted from the
+    store, checked at most once per ``prune_interval`` seconds.
+    """
+
+    def __init__(self, runner: Callable[[str], Dict[str, Any]], store: JobStore,
+                 max_workers: int, max_queued: int, retention_seconds: float = 7 * 86400,
+                 prune_interval: float = 3600):
+        self.runner = runner
+        self.store = store
+        self.max_workers = max_workers
+        self.max_queued = max_queued
+        self.retention_seconds = retention_seconds
+        self.prune_interval = prune_interval
+        self._last_prune = 0.0
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="research-job")
+        self._slots = threading.BoundedSemaphore(max_workers + max_queued)
+        self._futures: Dict[str, Future] = {}
+        self._lock = threading.Lock()
+
+    def submit(self, query: str) -> str:
+        """
+        Queue a research job
+
+        Args:
+            query: The research question
+
+        Returns:
+            The job ID
+
+        Raises:
+            QueueFullError: If every worker is busy and the queue is full
+        """
+        self._maybe_prune()
+        if not self._slots.acquire(blocking=False):
+            raise QueueFullError("Research job queue is full")
+
+        try:
+            job_id = self.store.create(query)
+            self._start(job_id, query)
+        except Exception:
+            self._slots.release()
+            raise
+
+        logger.info(f"Queued research job {job_id} for query: {query}")
+        return job_id
+
+    def _start(self, job_id: str, query: str) -> None:
+        """Hand a job holding a queue slot to the worker pool"""
+        future = self._executor.submit(self._run, job_id, query)
+        with self._lock:
+            self._futures[job_id] = future
+        future.add_done_callback(lambda _: self._release(job_id))
+
+    def recover(self) -> int:
+        """
+        Requeue jobs left queued or running by worker processes that exited
+
+        Jobs that don't fit in the queue are marked failed so clients stop
+        polling them.
+
+        Returns:
+            Number of jobs requeued
+        """
+        requeued = 0
+        for job_id, query, status, worker_pid in self.store.orphaned():
+            if not self.store.claim(job_id, worker_pid, status):
+                continue
+            if self.store.cancel_requested(job_id):
+                self.store.finish(job_id, CANCELLED)
+                continue
+            if not self._slots.acquire(blocking=False):
+                self.store.finish(job_id, FAILED, error="Worker exited and the job queue was full on recovery")
+                continue
+            try:
+                self._start(job_id, query)
+            except Exception:
+                self._slots.release()
+                raise
+            requeued += 1
+            logger.warning(f"Requeued research job {job_id} left {status} by exited worker {worker_pid}")
+        return requeued
+
+    def _maybe_prune(self) -> None:
+        """Delete expired finished jobs, at most once per prune interval"""
+        now = time.time()
+        if now - self._last_prune < self.prune_interval:
+            return
+        self._last_prune = now
+        try:
+            removed = self.store.prune(self.retention_seconds)
+        except Exception as e:
+            logger.warning(f"Failed to prune old research jobs: {str(e)}")
+            return
+        if removed:
+            logger.info(f"Pruned {removed} research jobs older than {self.retention_seconds:.0f}s")
+
+    def _release(self, job_id: str) -> None:
+        """Free the queue slot held by a finished or cancelled job"""
+        with self._lock:
+            self._futures.pop(job_id, None)
+        self._slots.release()
+
+    def _run(self, job_id: str, query: str) -> None:
+        """Execute one job and persist its outcome"""
+        if not self.store.mark_running(job_id):
+            logger.info(f"Skipping cancelled research job {job_id}")
+            return
+
+        try:
+            result = self.runner(query)
+        except Exception as e:
+            logger.exception(f"Research job {job_id} failed")
+            self.store.finish(job_id, FAILED, error=str(e))
+            return
+
+        if self.store.cancel_requested(job_id):
+            self.store.finish(job_id, CANCELLED)
+        else:
+            self.store.finish(job_id, SUCCEEDED, result=result)
+
+    def cancel(self, job_id: str) -> Optional[str]:
+        """
+        Cancel a job; running jobs finish but their result is discarded
+
+        Returns:
+            The job status after the request, or None if the job doesn't exist
+        """
+        status = self.store.request_cancel(job_id)
+        with self._lock:
+            future = self._futures.get(job_id)
+        if future is not None and status == CANCELLED:
+            future.cancel()
+        return status
+
+    def stats(self) -> Dict[str, int]:
+        """Report jobs held by this worker process"""
+        with self._lock:
+            in_flight = len(self._futures)
+        return {
+            "in_flight": in_flight,
+            "max_workers": self.max_workers,
+            "max_queued": self.max_queued,
+        }
+
+
+_queue: Optional[JobQueue] = None
+_queue_lock = threading.Lock()
+
+
+def get_job_queue(runner: Callable[[str], Dict[str, Any]]) -> JobQueue:
+    """
+    Return the process-wide job queue, creating it with ``runner`` on first use
+
+    On creation, jobs orphaned by exited worker processes are requeued and
+    expired jobs are pruned.
+
+    Args:
+        runner: Callable running the workflow for a query and returning the job result
+
+    Returns:
+        The shared JobQueue
+    """
+    global _queue
+    if _queue is None:
+        with _queue_lock:
+            if _queue is None:
+                queue = JobQueue(
+                    runner,
+                    JobStore(config.JOB_STORE_PATH),
+                    max_workers=config.JOB_WORKERS,
+                    max_queued=config.JOB_QUEUE_SIZE,
+                    retention_seconds=config.JOB_RETENTION_SECONDS,
+                )
+                queue._maybe_prune()
+                queue.recover()
+                _queue = queue
+    return _queue
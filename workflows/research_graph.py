@@ -0,0 +1,446 @@
+"""
+LangGraph state graph for the research workflow, with checkpointing and resume
+
+plan -> search (one parallel branch per query) -> synthesize -> review
+     -> search ... (follow-up rounds) -> draft
+
+State is checkpointed after every step, so a run that fails or is
+interrupted resumes from the last completed step (searches that finished
+in a failed step are kept) instead of paying for them again. Runs left
+unfinished for config.WORKFLOW_CHECKPOINT_TTL_SECONDS are deleted.
+"""
+import logging
+import operator
+import os
+import sqlite3
+import threading
+import time
+from typing import Annotated, Any, Dict, List, Optional, TypedDict
+
+from langgraph.config import get_config, get_stream_writer
+from langgraph.graph import END, START, StateGraph
+from langgraph.types import Send
+
+from agents.registry import get_agent_registry
+from agents.research_agent import combine_responses
+from utils.schema import SearchResponse, findings_from_dicts, findings_to_dicts
+from utils.sqlite_utils import SQLiteConnectionFactory
+from utils.usage import UsageTracker
+from workflows.research_workflow import ResearchBudget, merge_findings, finding_novelty
+import config
+
+logger = logging.getLogger(__name__)
+
+
+def _collect(left: Optional[List[Any]], right: Optional[List[Any]]) -> List[Any]:
+    """Accumulate parallel branch outputs; writing None clears the list"""
+    if right is None:
+        return []
+    return (left or []) + right
+
+
+def _add_counts(left: Optional[Dict[str, int]], right: Optional[Dict[str, int]]) -> Dict[str, int]:
+    """Sum usage counters reported by each step"""
+    counts = dict(left or {})
+    for name, value in (right or {}).items():
+        counts[name] = counts.get(name, 0) + value
+    return counts
+
+
+class ResearchState(TypedDict, total=False):
+    """
+    Checkpointed state of one run
+
+    Everything here is JSON-native (findings and search responses as
+    dictionaries) so checkpoints stay readable by any version of the code.
+    ``elapsed`` sums the time spent in completed steps (a round's parallel
+    searches count as their slowest branch), so the time budget survives a
+    resume without counting the time the run was stopped.
+    """
+    query: str
+    elapsed: Annotated[float, operator.add]
+    search_seconds: Annotated[List[float], _collect]
+    round: int
+    round_started: float
+    queries: List[str]
+    responses: Annotated[List[Dict[str, Any]], _collect]
+    findings: List[Dict[str, Any]]
+    iterations: Annotated[List[Dict[str, Any]], operator.add]
+    usage: Annotated[Dict[str, int], _add_counts]
+    stop_reason: Optional[str]
+    draft: str
+
+
+class SearchTask(TypedDict):
+    """Input of one parallel search branch"""
+    search_query: str
+
+
+def _elapsed_ms(since: float) -> float:
+    return round((time.time() - since) * 1000, 1)
+
+
+def plan(state: ResearchState) -> Dict[str, Any]:
+    """Answer from past findings if they cover the question, otherwise pick the first round's queries"""
+    query = state["query"]
+    agent = get_agent_registry().get_research_agent()
+    usage = UsageTracker()
+    started = time.time()
+    step_started = time.perf_counter()
+
+    local = agent.local_lookup(query, usage=usage)
+    if local is not None:
+        return {
+            "round": 1,
+            "queries": [],
+            "findings": findings_to_dicts(local),
+            "iterations": [{
+                "iteration": 1, "queries": [query], "new_findings": len(local),
+                "novelty": 1.0, "elapsed_ms": _elapsed_ms(started),
+            }],
+            "usage": usage.snapshot(),
+            "elapsed": time.perf_counter() - step_started,
+        }
+
+    if config.RESEARCH_FANOUT_ENABLED:
+        queries = agent.generate_sub_queries(query, config.RESEARCH_FANOUT_SUB_QUERIES, usage=usage)
+        logger.info(f"Fanning out research into {len(queries)} searches")
+    else:
+        queries = [query]
+    return {
+        "round": 1, "round_started": started, "queries": queries, "usage": usage.snapshot(),
+        "elapsed": time.perf_counter() - step_started,
+    }
+
+
+def search(task: SearchTask) -> Dict[str, Any]:
+    """Run one search branch"""
+    usage = UsageTracker()
+    started = time.perf_counter()
+    response = get_agent_registry().get_research_agent().search_one(task["search_query"], usage=usage)
+    return {
+        "responses": [response.to_dict()], "usage": usage.snapshot(),
+        "search_seconds": [time.perf_counter() - started],
+    }
+
+
+def synthesize(state: ResearchState) -> Dict[str, Any]:
+    """Merge the round's search branches and synthesize findings from them"""
+    query = state["query"]
+    iteration = state["round"]
+    usage = UsageTracker()
+    step_started = time.perf_counter()
+    # The round's searches ran in parallel; count the slowest one
+    search_seconds = max(state.get("search_seconds") or [0.0])
+    responses = [SearchResponse.from_dict(r) for r in state.get("responses") or []]
+    search_results = combine_responses(query, state["queries"], responses)
+
+    if search_results.error and not search_results.results:
+        if iteration == 1:
+            raise RuntimeError(f"Research failed: {search_results.error}")
+        logger.warning(f"Follow-up searches failed, keeping findings so far: {search_results.error}")
+        return {
+            "responses": None, "search_seconds": None, "stop_reason": "search_error",
+            "elapsed": search_seconds + time.perf_counter() - step_started,
+        }
+
+    agent = get_agent_registry().get_research_agent()
+    new_findings = agent.synthesize(query, search_results, usage=usage)
+    findings = findings_from_dicts(state.get("findings") or [])
+
+    if iteration == 1:
+        findings, added, novelty = new_findings, len(new_findings), 1.0
+    else:
+        novelty = finding_novelty(findings, new_findings)
+        added = merge_findings(findings, new_findings)
+
+    logger.info(f"Research round {iteration} added {added} findings (novelty {novelty:.2f})")
+    update = {
+        "responses": None,
+        "search_seconds": None,
+        "findings": findings_to_dicts(findings),
+        "iterations": [{
+            "iteration": iteration,
+            "queries": state["queries"],
+            "new_findings": added,
+            "novelty": round(novelty, 3),
+            "elapsed_ms": _elapsed_ms(state["round_started"]),
+        }],
+        "usage": usage.snapshot(),
+        "elapsed": search_seconds + time.perf_counter() - step_started,
+    }
+    if iteration > 1 and novelty < config.RESEARCH_MIN_NOVELTY:
+        update["stop_reason"] = "low_novelty"
+    return update
+
+
+def review(state: ResearchState) -> Dict[str, Any]:
+    """Decide whether another round is worth it and, if so, which follow-up queries to run"""
+    if state.get("stop_reason"):
+        return {}
+    if state["round"] >= config.MAX_RESEARCH_ITERATIONS:
+        return {"stop_reason": "max_iterations"}
+
+    # Budget counts the whole run, including time and calls before any resume
+    # but not the time the run was stopped
+    step_started = time.perf_counter()
+    budget = ResearchBudget.from_config(UsageTracker.from_snapshot(state.get("usage") or {}))
+    budget.started = step_started - (state.get("elapsed") or 0.0)
+    exhausted = budget.exhausted()
+    if exhausted:
+        return {"stop_reason": exhausted}
+
+    started = time.time()
+    usage = UsageTracker()
+    findings = findings_from_dicts(state.get("findings") or [])
+    follow_ups = get_agent_registry().get_research_agent().find_gaps(
+        state["query"], findings, config.RESEARCH_FOLLOWUP_QUERIES, usage=usage
+    )
+    elapsed = time.perf_counter() - step_started
+    if not follow_ups:
+        return {"stop_reason": "no_gaps", "usage": usage.snapshot(), "elapsed": elapsed}
+    return {
+        "round": state["round"] + 1, "round_started": started, "queries": follow_ups,
+        "usage": usage.snapshot(), "elapsed": elapsed,
+    }
+
+
+def draft(state: ResearchState) -> Dict[str, Any]:
+    """Draft the answer, streaming tokens to the caller when the run is streamed"""
+    query = state["query"]
+    findings = findings_from_dicts(state.get("findings") or [])
+    logger.info(f"Research stopped after {len(state.get('iterations') or [])} rounds: {state.get('stop_reason')}")
+    agent = get_agent_registry().get_drafting_agent()
+    usage = UsageTracker()
+
+    if not get_config()["configurable"].get("stream"):
+        return {"draft": agent.draft_answer(query, findings, usage=usage), "usage": usage.snapshot()}
+
+    write = get_stream_writer()
+    write(("findings_ready", {
+        "findings": findings,
+        "iterations": state.get("iterations") or [],
+        "stop_reason": state.get("stop_reason"),
+    }))
+    parts = []
+    for text in agent.stream_answer(query, findings, usage=usage):
+        parts.append(text)
+        write(("draft_token", {"text": text}))
+    return {"draft": "".join(parts), "usage": usage.snapshot()}
+
+
+def _fan_out(state: ResearchState):
+    """Route to one search branch per query, or straight to review when there is nothing to search"""
+    if not state.get("queries"):
+        return "review"
+    return [Send("search", {"search_query": q}) for q in state["queries"]]
+
+
+def _after_review(state: ResearchState):
+    if state.get("stop_reason"):
+        return "draft"
+    return [Send("search", {"search_query": q}) for q in state["queries"]]
+
+
+def build_graph(checkpointer=None):
+    """
+    Build and compile the research state graph
+
+    Args:
+        checkpointer: LangGraph checkpointer to save state after every step
+
+    Returns:
+        The compiled graph
+    """
+    graph = StateGraph(ResearchState)
+    graph.add_node("plan", plan)
+    graph.add_node("search", search)
+    graph.add_node("synthesize", synthesize)
+    graph.add_node("review", review)
+    graph.add_node("draft", draft)
+    graph.add_edge(START, "plan")
+    graph.add_conditional_edges("plan", _fan_out, ["search", "review"])
+    graph.add_edge("search", "synthesize")
+    graph.add_edge("synthesize", "review")
+    graph.add_conditional_edges("review", _after_review, ["search", "draft"])
+    graph.add_edge("draft", END)
+    return graph.compile(checkpointer=checkpointer)
+
+
+def _make_checkpointer():
+    """
+    SQLite checkpointer at config.WORKFLOW_CHECKPOINT_PATH
+
+    Raises:
+        RuntimeError: If langgraph-checkpoint-sqlite is not installed, since
+            runs could then not be resumed after a restart
+    """
+    try:
+        from langgraph.checkpoint.sqlite import SqliteSaver
+    except ImportError as e:
+        raise RuntimeError(
+            "langgraph-checkpoint-sqlite is required for resumable research runs; install the project dependencies"
+        ) from e
+
+    directory = os.path.dirname(config.WORKFLOW_CHECKPOINT_PATH)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    conn = sqlite3.connect(config.WORKFLOW_CHECKPOINT_PATH, check_same_thread=False)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    return SqliteSaver(conn)
+
+
+_RUNS_SCHEMA = """
+CREATE TABLE IF NOT EXISTS run_activity (
+    thread_id TEXT PRIMARY KEY,
+    updated_at REAL NOT NULL
+)
+"""
+
+_graph = None
+_checkpointer = None
+_runs = None
+_graph_lock = threading.Lock()
+_last_prune = 0.0
+_PRUNE_INTERVAL = 3600
+
+
+def get_research_graph():
+    """
+    Return the process-wide compiled research graph and its checkpointer
+
+    Returns:
+        Tuple of (compiled graph, checkpointer)
+    """
+    global _graph, _checkpointer
+    if _graph is None:
+        with _graph_lock:
+            if _graph is None:
+                _checkpointer = _make_checkpointer()
+                _graph = build_graph(_checkpointer)
+    return _graph, _checkpointer
+
+
+def _run_activity() -> SQLiteConnectionFactory:
+    """Connections to the table recording when each run last started or resumed"""
+    global _runs
+    if _runs is None:
+        with _graph_lock:
+            if _runs is None:
+                runs = SQLiteConnectionFactory(config.WORKFLOW_CHECKPOINT_PATH)
+                runs.connect().execute(_RUNS_SCHEMA)
+                _runs = runs
+    return _runs
+
+
+def run_config(run_id: str, stream: bool = False) -> Dict[str, Any]:
+    """LangGraph config for a run: its checkpoint thread, branch concurrency and step limit"""
+    return {
+        "configurable": {"thread_id": run_id, "stream": stream},
+        "max_concurrency": config.RESEARCH_FANOUT_MAX_WORKERS,
+        # plan + 3 steps per round + draft, with headroom
+        "recursion_limit": 3 * config.MAX_RESEARCH_ITERATIONS + 10,
+    }
+
+
+def prepare_resume(run_id: str) -> Optional[str]:
+    """
+    Check whether a run stopped before finishing and get it ready to continue
+
+    A run whose first round of searches all failed stops in synthesize with
+    only failed responses saved; those searches are re-queued so resuming
+    retries them rather than failing on the saved errors again.
+
+    Returns:
+        The run's query if it can be resumed, otherwise None
+    """
+    graph, _ = get_research_graph()
+    run = run_config(run_id)
+    snapshot = graph.get_state(run)
+    if not snapshot.values or not snapshot.next:
+        return None
+    responses = snapshot.values.get("responses") or []
+    if snapshot.next == ("synthesize",) and responses and all(
+        r.get("error") and not r.get("results") for r in responses
+    ):
+        graph.update_state(run, {"responses": None}, as_node="plan")
+    return snapshot.values["query"]
+
+
+def initial_state(query: str) -> ResearchState:
+    """Input for a fresh run"""
+    return {"query": query, "usage": {}}
+
+
+def track_run(run_id: str) -> None:
+    """
+    Record that a run is starting or resuming, so its checkpoints are kept
+    for another config.WORKFLOW_CHECKPOINT_TTL_SECONDS
+    """
+    _run_activity().connect().execute(
+        "INSERT INTO run_activity (thread_id, updated_at) VALUES (?, ?) "
+        "ON CONFLICT(thread_id) DO UPDATE SET updated_at = excluded.updated_at",
+        (run_id, time.time()),
+    )
+    _maybe_prune()
+
+
+def finish(run_id: str) -> None:
+    """Drop the checkpoints of a completed run"""
+    _, checkpointer = get_research_graph()
+    try:
+        checkpointer.delete_thread(run_id)
+        _run_activity().connect().execute("DELETE FROM run_activity WHERE thread_id = ?", (run_id,))
+    except Exception as e:
+        logger.warning(f"Could not delete checkpoints for run {run_id}: {str(e)}")
+
+
+def prune_checkpoints(max_age_seconds: int) -> int:
+    """
+    Delete the checkpoints of runs not started or resumed for ``max_age_seconds``
+
+    Failed runs that are never resumed would otherwise stay in the
+    checkpoint database forever. Checkpointed runs with no recorded
+    activity (saved before activity was tracked) are given a full TTL
+    from now.
+
+    Returns:
+        Number of runs deleted
+    """
+    _, checkpointer = get_research_graph()
+    conn = _run_activity().connect()
+    now = time.time()
+    try:
+        conn.execute(
+            "INSERT OR IGNORE INTO run_activity (thread_id, updated_at) "
+            "SELECT DISTINCT thread_id, ? FROM checkpoints",
+            (now,),
+        )
+    except sqlite3.OperationalError:
+        # The checkpointer creates its tables on first use
+        pass
+
+    expired = [row[0] for row in conn.execute(
+        "SELECT thread_id FROM run_activity WHERE updated_at < ?", (now - max_age_seconds,)
+    )]
+    for run_id in expired:
+        checkpointer.delete_thread(run_id)
+        conn.execute("DELETE FROM run_activity WHERE thread_id = ?", (run_id,))
+    return len(expired)
+
+
+def _maybe_prune() -> None:
+    """Delete expired checkpoints, at most once per prune interval"""
+    global _last_prune
+    now = time.time()
+    if now - _last_prune < _PRUNE_INTERVAL:
+        return
+    _last_prune = now
+    try:
+        removed = prune_checkpoints(config.WORKFLOW_CHECKPOINT_TTL_SECONDS)
+    except Exception as e:
+        logger.warning(f"Failed to prune old research checkpoints: {str(e)}")
+        return
+    if removed:
+        logger.info(f"Pruned checkpoints of {removed} abandoned research runs")
@@ -0,0 +1,221 @@
+"""
+Pipelined research workflow: draft sections while later research still runs
+
+Each search query is searched and synthesized on its own branch. Findings
+stream out of the synthesis as each one parses and are merged right away;
+once a branch has collected a few new ones they are handed to the drafting
+agent as a section, so early sections are drafted while later searches,
+syntheses and follow-up rounds are still running. When research stops, the sections are assembled
+locally (citations renumbered, sources listed) instead of waiting for one
+final drafting call over all findings.
+
+Pipelined runs are not checkpointed; the graph workflow
+(workflows/research_graph.py) is the one to use when runs must be resumable.
+"""
+import contextvars
+import logging
+import queue
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List
+
+from agents.drafting_agent import assemble_sections
+from agents.registry import get_agent_registry
+from utils.schema import Finding
+from utils.usage import UsageTracker
+from workflows.research_workflow import ResearchBudget, merge_findings, finding_novelty
+import config
+
+logger = logging.getLogger(__name__)
+
+
+def _research_branch(agent, query: str, branch: int, search_query: str, usage: UsageTracker,
+                     events: "queue.Queue") -> None:
+    """
+    Search one query and stream its synthesized findings to ``events``
+
+    Each finding is put as ``(branch, finding, None)`` as soon as it parses;
+    the branch ends with ``(branch, None, error)``, the error being None on
+    success.
+    """
+    try:
+        response = agent.search_one(search_query, usage=usage)
+        if response.error and not response.results:
+            raise RuntimeError(response.error)
+        for finding in agent.iter_synthesis(query, response, usage=usage):
+            events.put((branch, finding, None))
+    except Exception as e:
+        events.put((branch, None, e))
+        return
+    events.put((branch, None, None))
+
+
+def _elapsed_ms(since: float) -> float:
+    return round((time.perf_counter() - since) * 1000, 1)
+
+
+def run_pipelined_research(query: str) -> Dict[str, Any]:
+    """
+    Research a query and draft its answer with the stages overlapped
+
+    Rounds, stop reasons and budgets follow the sequential workflow. The
+    first round always fans out into sub-queries, since each one feeds its
+    own section. If any section fails to draft, the whole answer is drafted
+    from all findings the sequential way instead.
+
+    Args:
+        query: The research question
+
+    Returns:
+        Dictionary with 'query', 'findings', 'draft', per-round 'iterations',
+        'stop_reason', 'usage' counters, 'elapsed_ms', 'run_id' (None) and
+        'pipeline' timings: 'sections', 'research_ms', 'draft_wait_ms' (time
+        spent waiting for sections after research stopped) and 'fallback'
+    """
+    logger.info(f"Starting pipelined research workflow for query: {query}")
+    start = time.perf_counter()
+    usage = UsageTracker()
+    budget = ResearchBudget.from_config(usage)
+    registry = get_agent_registry()
+    research_agent = registry.get_research_agent()
+    drafting_agent = registry.get_drafting_agent()
+
+    findings: List[Finding] = []
+    iterations = []
+    sections = []
+    stop_reason = None
+
+    with ThreadPoolExecutor(max_workers=max(1, config.RESEARCH_FANOUT_MAX_WORKERS),
+                            thread_name_prefix="pipeline-research") as research_pool, \
+         ThreadPoolExecutor(max_workers=max(1, config.RESEARCH_PIPELINE_DRAFT_WORKERS),
+                            thread_name_prefix="pipeline-draft") as draft_pool:
+
+        def draft_section(focus: str, section_findings: List[Finding]) -> None:
+            # Branches run in copies of the caller's context so their spans reach the caller's trace
+            future = draft_pool.submit(contextvars.copy_context().run, drafting_agent.draft_section,
+                                       query, focus, section_findings, usage)
+            sections.append((focus, future))
+
+        round_started = time.perf_counter()
+        local = research_agent.local_lookup(query, usage=usage)
+        if local is not None:
+            findings = list(local)
+            # A copy, since later rounds keep appending to findings while the section drafts
+            draft_section(query, list(findings))
+            iterations.append({
+                "iteration": 1, "queries": [query], "new_findings": len(findings),
+                "novelty": 1.0, "elapsed_ms": _elapsed_ms(round_started),
+            })
+            queries = []
+        else:
+            queries = research_agent.generate_sub_queries(query, config.RESEARCH_FANOUT_SUB_QUERIES, usage=usage)
+            logger.info(f"Pipelining research into {len(queries)} searches")
+
+        iteration = 1
+        while True:
+            if queries:
+                previous = list(findings)
+                synthesized = []
+                errors = []
+                events: "queue.Queue" = queue.Queue()
+                for branch, search_query in enumerate(queries):
+                    research_pool.submit(contextvars.copy_context().run, _research_branch,
+                                         research_agent, query, branch, search_query, usage, events)
+                # New findings per branch not yet handed to a section
+                collected = [[] for _ in queries]
+                running = len(queries)
+                while running:
+                    branch, finding, error = events.get()
+                    if finding is not None:
+                        synthesized.append(finding)
+                        if merge_findings(findings, [finding]):
+                            collected[branch].append(finding)
+                            if len(collected[branch]) >= config.RESEARCH_PIPELINE_SECTION_FINDINGS:
+                                draft_section(queries[branch], collected[branch])
+                                collected[branch] = []
+                        continue
+                    running -= 1
+                    if error is not None:
+                        logger.warning(f"Search branch '{queries[branch]}' failed: {str(error)}")
+                        errors.append(str(error))
+                    if collected[branch]:
+                        draft_section(queries[branch], collected[branch])
+                        collected[branch] = []
+
+                if errors and not synthesized:
+                    if iteration == 1:
+                        raise RuntimeError(f"Research failed: {'; '.join(errors)}")
+                    logger.warning(f"Follow-up searches failed, keeping findings so far: {'; '.join(errors)}")
+                    stop_reason = "search_error"
+                    break
+
+                novelty = 1.0 if iteration == 1 else finding_novelty(previous, synthesized)
+                added = len(findings) - len(previous)
+                logger.info(f"Research round {iteration} added {added} findings (novelty {novelty:.2f})")
+                iterations.append({
+                    "iteration": iteration,
+                    "queries": queries,
+                    "new_findings": added,
+                    "novelty": round(novelty, 3),
+                    "elapsed_ms": _elapsed_ms(round_started),
+                })
+                if iteration > 1 and novelty < config.RESEARCH_MIN_NOVELTY:
+                    stop_reason = "low_novelty"
+                    break
+
+            if iteration >= config.MAX_RESEARCH_ITERATIONS:
+                stop_reason = "max_iterations"
+                break
+            stop_reason = budget.exhausted()
+            if stop_reason:
+                break
+            round_started = time.perf_counter()
+            queries = research_agent.find_gaps(query, findings, config.RESEARCH_FOLLOWUP_QUERIES, usage=usage)
+            if not queries:
+                stop_reason = "no_gaps"
+                break
+            iteration += 1
+
+        logger.info(f"Research stopped after {len(iterations)} rounds: {stop_reason}")
+        research_ms = _elapsed_ms(start)
+        waiting = time.perf_counter()
+        drafted = []
+        fallback = False
+        for focus, future in sections:
+            try:
+                text, citations = future.result()
+            except Exception as e:
+                logger.warning(f"Section '{focus}' failed, drafting the whole answer instead: {str(e)}")
+                fallback = True
+                continue
+            drafted.append((focus, text, citations))
+        draft_wait_ms = _elapsed_ms(waiting)
+        # Keep a branch's sections together, in the order the branches first produced one
+        order = {}
+        for focus, _, _ in drafted:
+            order.setdefault(focus, len(order))
+        drafted.sort(key=lambda section: order[section[0]])
+
+    if fallback or not drafted:
+        draft = drafting_agent.draft_answer(query, findings, usage=usage)
+    else:
+        # Like a regular draft, the answer has no title; save_draft adds one
+        draft = assemble_sections(query, drafted, findings, title=False)
+
+    logger.info(f"Pipelined draft assembled from {len(drafted)} sections")
+    return {
+        "query": query,
+        "findings": findings,
+        "draft": draft,
+        "iterations": iterations,
+        "stop_reason": stop_reason,
+        "usage": usage.snapshot(),
+        "elapsed_ms": _elapsed_ms(start),
+        "run_id": None,
+        "pipeline": {
+            "sections": len(drafted),
+            "research_ms": research_ms,
+            "draft_wait_ms": draft_wait_ms,
+            "fallback": fallback or not drafted,
+        },
+    }
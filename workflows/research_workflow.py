@@ -1,42 +1,308 @@
 """
-Simplified research workflow orchestration
+Research workflow orchestration
+
+The research and drafting steps run as a LangGraph state graph
+(workflows/research_graph.py, imported on first run) with checkpoints, so a
+failed run can be resumed, or, in pipelined mode, with drafting overlapped
+with research (workflows/research_pipeline.py); this module adds the
+semantic cache and request coalescing around them.
 """
 import logging
-from typing import List, Dict, Any, Tuple
+import re
+import time
+import uuid
+from typing import List, Dict, Any, Iterator, Optional, Tuple
 
-from agents.research_agent import ResearchAgent
-from agents.drafting_agent import DraftingAgent
+from utils.semantic_cache import get_semantic_cache
+from utils.singleflight import get_singleflight
+from utils.text_utils import normalize_query
+from utils.schema import Finding, findings_from_dicts
+from utils.usage import UsageTracker
+import config
 
 logger = logging.getLogger(__name__)
 
-def run_research_workflow(query: str) -> Tuple[List[Dict[str, Any]], str]:
+_WORD_RE = re.compile(r"[a-z0-9]+")
+
+
+class RunQueryMismatchError(ValueError):
+    """Raised when a run ID names an unfinished run for a different query"""
+
+
+class ResearchBudget:
     """
-    Run the complete research workflow for a query
-    
+    Wall-clock, token and API-call limits for one research run
+    """
+
+    def __init__(self, usage: UsageTracker, time_seconds: float, max_tokens: int, max_api_calls: int):
+        self.usage = usage
+        self.time_seconds = time_seconds
+        self.max_tokens = max_tokens
+        self.max_api_calls = max_api_calls
+        self.started = time.perf_counter()
+
+    @classmethod
+    def from_config(cls, usage: UsageTracker) -> "ResearchBudget":
+        """Create a budget from the configured limits"""
+        return cls(
+            usage,
+            time_seconds=config.RESEARCH_TIME_BUDGET_SECONDS,
+            max_tokens=config.RESEARCH_TOKEN_BUDGET,
+            max_api_calls=config.RESEARCH_API_CALL_BUDGET,
+        )
+
+    @property
+    def elapsed(self) -> float:
+        """Seconds since the run started"""
+        return time.perf_counter() - self.started
+
+    def exhausted(self) -> Optional[str]:
+        """
+        Check whether any limit has been reached
+
+        Returns:
+            The stop reason, or None while budget remains
+        """
+        if self.elapsed >= self.time_seconds:
+            return "time_budget"
+        if self.usage.total_tokens >= self.max_tokens:
+            return "token_budget"
+        if self.usage.api_calls >= self.max_api_calls:
+            return "api_call_budget"
+        return None
+
+
+def _words(findings: List[Finding]) -> set:
+    """Collect the distinct words used in a list of findings"""
+    words = set()
+    for finding in findings:
+        words.update(_WORD_RE.findall(finding.content.lower()))
+    return words
+
+
+def finding_novelty(findings: List[Finding], new_findings: List[Finding]) -> float:
+    """Share of the new findings' words not seen in the earlier findings"""
+    new_words = _words(new_findings)
+    if not new_words:
+        return 0.0
+    return len(new_words - _words(findings)) / len(new_words)
+
+
+def merge_findings(findings: List[Finding], new_findings: List[Finding]) -> int:
+    """
+    Append findings that aren't already present
+
+    Returns:
+        Number of findings added
+    """
+    seen = {(f.source_url, f.content) for f in findings}
+    added = 0
+    for finding in new_findings:
+        key = (finding.source_url, finding.content)
+        if key in seen:
+            continue
+        seen.add(key)
+        findings.append(finding)
+        added += 1
+    return added
+
+
+def run_research_workflow_detailed(query: str, use_cache: bool = True, run_id: Optional[str] = None,
+                                   pipelined: Optional[bool] = None) -> Dict[str, Any]:
+    """
+    Run the complete research workflow and report how the run went
+
     Args:
         query: The research question
-        
+        use_cache: Serve paraphrases of recent queries from the semantic cache
+        run_id: Checkpoint ID for the run; if a run with this ID stopped
+            before finishing, it is resumed from its last completed step
+        pipelined: Draft sections while research is still running instead of
+            checkpointing the run (defaults to config.RESEARCH_PIPELINE_ENABLED)
+
     Returns:
-        Tuple containing (research findings, drafted answer)
+        Dictionary with 'query', 'findings', 'draft', per-round 'iterations',
+        'stop_reason', 'usage' counters, 'elapsed_ms', 'run_id' and 'cache'
+        details, plus 'pipeline' timings for pipelined runs
     """
+    if pipelined is None:
+        pipelined = config.RESEARCH_PIPELINE_ENABLED
+    cache = get_semantic_cache() if use_cache else None
+    if cache is not None:
+        cached = cache.lookup(query)
+        if cached is not None:
+            result, similarity, matched_query = cached
+            logger.info(f"Semantic cache hit for '{query}' (matched '{matched_query}', similarity {similarity:.3f})")
+            result["query"] = query
+            result["cache"] = {"hit": True, "similarity": round(similarity, 4), "matched_query": matched_query}
+            return result
+
+    # Duplicate queries arriving while one is running wait for and share its result
+    # (copied, since followers may still be copying the shared result). A run
+    # with an ID only shares with callers of that same run.
+    if pipelined:
+        result = dict(get_singleflight("workflow").do(f"pipelined:{normalize_query(query)}", _run_pipelined, query))
+    else:
+        key = normalize_query(query) if run_id is None else f"run:{run_id}:{normalize_query(query)}"
+        result = dict(get_singleflight("workflow").do(key, _run_research_workflow, query, run_id))
+    if cache is not None:
+        cache.store(query, result)
+    result["cache"] = {"hit": False}
+    return result
+
+
+def resume_research_workflow(run_id: str) -> Dict[str, Any]:
+    """
+    Resume a run that failed or was interrupted, from its last completed step
+
+    Args:
+        run_id: The run's checkpoint ID (reported in the error of the failed run)
+
+    Returns:
+        Same as run_research_workflow_detailed
+
+    Raises:
+        RuntimeError: If there is no unfinished run with this ID, or it fails again
+    """
+    from workflows.research_graph import prepare_resume
+
+    query = prepare_resume(run_id)
+    if query is None:
+        raise RuntimeError(f"No unfinished research run with ID {run_id}")
+    result = _run_research_workflow(query, run_id)
+    result["cache"] = {"hit": False}
+    return result
+
+
+def _start_run(query: str, run_id: Optional[str]) -> Tuple[str, Optional[Dict[str, Any]]]:
+    """
+    Pick the checkpoint ID and graph input for a run
+
+    Returns:
+        Tuple of (run ID, graph input); the input is None when resuming
+
+    Raises:
+        RunQueryMismatchError: If the run ID names an unfinished run for a
+            different query, whose result must not be returned for this one
+    """
+    from workflows.research_graph import initial_state, prepare_resume, track_run
+
+    if run_id is None:
+        run_id = uuid.uuid4().hex
+        track_run(run_id)
+        return run_id, initial_state(query)
+    resumable = prepare_resume(run_id)
+    if resumable is not None:
+        if normalize_query(resumable) != normalize_query(query):
+            raise RunQueryMismatchError(f"Run {run_id} is for a different query: {resumable}")
+        logger.info(f"Resuming research run {run_id} from its last checkpoint")
+        track_run(run_id)
+        return run_id, None
+    track_run(run_id)
+    return run_id, initial_state(query)
+
+
+def _result(state: Dict[str, Any], run_id: str, start: float) -> Dict[str, Any]:
+    """Build the workflow result from a finished run's state"""
+    return {
+        "query": state["query"],
+        "findings": findings_from_dicts(state.get("findings") or []),
+        "draft": state["draft"],
+        "iterations": state.get("iterations") or [],
+        "stop_reason": state.get("stop_reason"),
+        "usage": UsageTracker.from_snapshot(state.get("usage") or {}).snapshot(),
+        "elapsed_ms": round((time.perf_counter() - start) * 1000, 1),
+        "run_id": run_id,
+    }
+
+
+def _run_research_workflow(query: str, run_id: Optional[str] = None) -> Dict[str, Any]:
+    """Run (or resume) the research graph for one query"""
+    from workflows.research_graph import finish, get_research_graph, run_config
+
     logger.info(f"Starting research workflow for query: {query}")
-    
+    start = time.perf_counter()
+    run_id, inputs = _start_run(query, run_id)
+
     try:
-        # Initialize agents
-        research_agent = ResearchAgent()
-        drafting_agent = DraftingAgent()
-        
-        # Step 1: Research phase
-        logger.info("Executing research step")
-        findings = research_agent.research(query)
-        logger.info(f"Research completed with {len(findings)} findings")
-        
-        # Step 2: Drafting phase
-        logger.info("Executing drafting step")
-        draft = drafting_agent.draft_answer(query, findings)
-        logger.info("Draft completed successfully")
-        
-        return findings, draft
+        graph, _ = get_research_graph()
+        state = graph.invoke(inputs, run_config(run_id))
     except Exception as e:
-        logger.error(f"Error in research workflow: {str(e)}")
+        logger.error(f"Error in research workflow (run {run_id}): {str(e)}")
+        raise RuntimeError(f"Research workflow failed (resumable as run {run_id}): {str(e)}")
+
+    finish(run_id)
+    logger.info("Draft completed successfully")
+    return _result(state, run_id, start)
+
+
+def _run_pipelined(query: str) -> Dict[str, Any]:
+    """Run the pipelined workflow for one query"""
+    from workflows.research_pipeline import run_pipelined_research
+
+    try:
+        return run_pipelined_research(query)
+    except Exception as e:
+        logger.error(f"Error in pipelined research workflow: {str(e)}")
         raise RuntimeError(f"Research workflow failed: {str(e)}")
+
+
+def run_research_workflow(query: str, use_cache: bool = True) -> Tuple[List[Finding], str]:
+    """
+    Run the complete research workflow for a query
+
+    Args:
+        query: The research question
+        use_cache: Serve paraphrases of recent queries from the semantic cache
+
+    Returns:
+        Tuple containing (research findings, drafted answer)
+    """
+    result = run_research_workflow_detailed(query, use_cache=use_cache)
+    return result["findings"], result["draft"]
+
+
+def stream_research_workflow(query: str, run_id: Optional[str] = None) -> Iterator[Tuple[str, Dict[str, Any]]]:
+    """
+    Run the research workflow, yielding events as each stage completes
+
+    Events are ``(name, data)`` pairs: ``search_started`` right away,
+    ``findings_ready`` once research finishes, one ``draft_token`` per chunk
+    streamed by the drafting LLM, and finally ``draft_complete`` with the
+    full draft and run statistics.
+
+    Args:
+        query: The research question
+        run_id: Checkpoint ID; an unfinished run with this ID is resumed
+
+    Yields:
+        Tuples of (event name, event data)
+    """
+    from workflows.research_graph import finish, get_research_graph, run_config
+
+    logger.info(f"Starting streamed research workflow for query: {query}")
+    start = time.perf_counter()
+    run_id, inputs = _start_run(query, run_id)
+
+    try:
+        yield "search_started", {"query": query, "run_id": run_id}
+
+        graph, _ = get_research_graph()
+        state = None
+        for mode, chunk in graph.stream(inputs, run_config(run_id, stream=True), stream_mode=["custom", "values"]):
+            if mode == "custom":
+                yield chunk
+            else:
+                state = chunk
+
+        result = _result(state, run_id, start)
+        finish(run_id)
+        yield "draft_complete", {
+            "draft": result["draft"],
+            "usage": result["usage"],
+            "elapsed_ms": result["elapsed_ms"],
+            "run_id": run_id,
+        }
+    except Exception as e:
+        logger.error(f"Error in research workflow (run {run_id}): {str(e)}")
+        raise RuntimeError(f"Research workflow failed (resumable as run {run_id}): {str(e)}")